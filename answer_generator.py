@@ -1,7 +1,10 @@
-from typing import List, Dict, Tuple
-from openai import OpenAI
-import streamlit as st
+import time
+from typing import List, Dict, Iterator, Optional, Tuple
 import os
+from utils.lru_cache import LRUCache
+from utils.semantic_answer_cache import SemanticAnswerCache
+from processors.context_packer import ContextPacker
+from utils.metrics import metrics
 
 from dotenv import load_dotenv
 load_dotenv(override=True)
@@ -14,18 +17,33 @@ class AnswerGenerator:
         "gpt-3.5-turbo": {"input": 0.0005, "output": 0.0015},
     }
 
-    def __init__(self, model: str = "gpt-4o", temperature: float = 0.3, max_tokens: int = 512):
+    def __init__(self, model: str = "gpt-4o", temperature: float = 0.3, max_tokens: int = 512,
+                 rewrite_cache_size: int = 1024, rewrite_cache_ttl: Optional[float] = 3600,
+                 base_url: Optional[str] = None, answer_cache: Optional[SemanticAnswerCache] = None,
+                 max_context_tokens: Optional[int] = 3000):
+        """
+        :param rewrite_cache_size: Rewritten queries kept in memory, so repeated queries skip the API call
+        :param rewrite_cache_ttl: Seconds before a cached rewrite expires (None disables expiry)
+        :param base_url: OpenAI-compatible API endpoint, e.g. a local server (defaults to OPENAI_BASE_URL or OpenAI)
+        :param answer_cache: Reuses answers to near-identical questions over the same sources
+        :param max_context_tokens: Token budget for the sources in the answer prompt (None disables the limit)
+        """
         self.model = model
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.api_key = os.getenv("OPENAI_API_KEY")
-        self.client = OpenAI()
+        from openai import OpenAI
+        self.client = OpenAI(base_url=base_url)
+        # Seconds from request to first streamed token of the last generate_stream call
+        self.last_time_to_first_token: Optional[float] = None
+        self.rewrite_cache = LRUCache(rewrite_cache_size, rewrite_cache_ttl)
+        self.answer_cache = answer_cache
+        self.context_packer = ContextPacker(max_context_tokens, model)
+        # Input tokens of the last answer request, as reported by the API when available
+        self.last_input_tokens: Optional[int] = None
 
     def build_prompt(self, query: str, results: List[Tuple[Dict, float]]) -> str:
-        context = "\n\n".join(
-            f"Source {i+1} ({meta['article_url']}):\n{meta['text']}" 
-            for i, (meta, _) in enumerate(results)
-        )
+        context = self.context_packer.format(self.context_packer.pack(results))
 
         return f"""
     Answer the following question using only the information from the sources below.
@@ -41,23 +59,101 @@ class AnswerGenerator:
     Avoid vague phrasing like "one study showed" — be specific when possible.
     """.strip()
 
+    def _answer_messages(self, prompt: str) -> List[Dict[str, str]]:
+        return [
+            {"role": "system", "content": "You are a helpful AI assistant that answers questions using retrieved documents."},
+            {"role": "user", "content": prompt}
+        ]
+
+    def count_input_tokens(self, prompt: str) -> int:
+        """
+        Exact input tokens of an answer request for `prompt`: both messages plus the
+        per-message framing tokens of the chat format.
+        """
+        messages = self._answer_messages(prompt)
+        return sum(3 + self.context_packer.count(m["role"]) + self.context_packer.count(m["content"])
+                   for m in messages) + 3
+
+    def _cached_answer(self, query: str, results: List[Tuple[Dict, float]]) -> Optional[str]:
+        if self.answer_cache is None:
+            return None
+        answer = self.answer_cache.get(query, results, self.model)
+        metrics.inc("answer_cache.hits" if answer is not None else "answer_cache.misses")
+        return answer
+
+    def _cache_answer(self, query: str, results: List[Tuple[Dict, float]], answer: str):
+        if self.answer_cache is not None and answer:
+            self.answer_cache.put(query, results, self.model, answer)
+
     def generate(self, query: str, results: List[Tuple[Dict, float]]) -> str:
+        cached = self._cached_answer(query, results)
+        if cached is not None:
+            return cached
+
         prompt = self.build_prompt(query, results)
 
         #self.show_cost_estimate(prompt, self.max_tokens)
 
-        response = self.client.chat.completions.create(model=self.model,
-        messages=[
-            {"role": "system", "content": "You are a helpful AI assistant that answers questions using retrieved documents."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=self.temperature,
-        max_tokens=self.max_tokens)
+        with metrics.timer("generator.answer"):
+            response = self.client.chat.completions.create(model=self.model,
+            messages=self._answer_messages(prompt),
+            temperature=self.temperature,
+            max_tokens=self.max_tokens)
+
+        self.last_input_tokens = response.usage.prompt_tokens if response.usage else self.count_input_tokens(prompt)
+        metrics.inc("generator.input_tokens", self.last_input_tokens)
+        if response.usage:
+            metrics.inc("generator.output_tokens", response.usage.completion_tokens)
+        answer = response.choices[0].message.content
+        self._cache_answer(query, results, answer)
+        return answer
+
+    def generate_stream(self, query: str, results: List[Tuple[Dict, float]]) -> Iterator[str]:
+        """
+        Streaming version of `generate`: yields pieces of the answer as the model produces them.
+        A cached answer is yielded whole; a streamed one is cached once it is complete.
+        """
+        started = time.perf_counter()
+        self.last_time_to_first_token = None
+        cached = self._cached_answer(query, results)
+        if cached is not None:
+            self.last_time_to_first_token = time.perf_counter() - started
+            yield cached
+            return
 
-        return response.choices[0].message.content
+        prompt = self.build_prompt(query, results)
+
+        stream = self.client.chat.completions.create(model=self.model,
+        messages=self._answer_messages(prompt),
+        temperature=self.temperature,
+        max_tokens=self.max_tokens,
+        stream=True,
+        stream_options={"include_usage": True})
+
+        self.last_input_tokens = self.count_input_tokens(prompt)
+        output_tokens = None
+        pieces = []
+        for chunk in stream:
+            if chunk.usage:
+                self.last_input_tokens = chunk.usage.prompt_tokens
+                output_tokens = chunk.usage.completion_tokens
+            if not chunk.choices or not chunk.choices[0].delta.content:
+                continue
+            if self.last_time_to_first_token is None:
+                self.last_time_to_first_token = time.perf_counter() - started
+                metrics.observe("generator.time_to_first_token", self.last_time_to_first_token)
+            pieces.append(chunk.choices[0].delta.content)
+            yield pieces[-1]
+        metrics.observe("generator.answer", time.perf_counter() - started)
+        metrics.inc("generator.input_tokens", self.last_input_tokens)
+        if output_tokens is not None:
+            metrics.inc("generator.output_tokens", output_tokens)
+        self._cache_answer(query, results, "".join(pieces))
 
     def show_cost_estimate(self, prompt: str, output_tokens: int):
-        input_tokens = len(prompt.split())  # approx; for real count use tiktoken
+        import streamlit as st
+
+        input_tokens = self.count_input_tokens(prompt)
         model_key = self.model.lower()
         pricing = self.MODEL_PRICING.get(model_key)
 
@@ -72,17 +168,24 @@ class AnswerGenerator:
         st.markdown(f"""
         **💸 Estimated Cost**
         - Model: `{self.model}`
-        - Input tokens: ~{input_tokens}
+        - Input tokens: {input_tokens}
         - Output tokens (max): {output_tokens}
         - Total estimated cost (USD): **${total_cost:.4f}** 
         - Total estimated cost (UAH): **₴{total_cost*41.52:.4f}**
 
         """)
 
-    def rewrite_query(self, query: str) -> str:
+    def rewrite_query(self, query: str, timeout: Optional[float] = None) -> str:
         """
         Use the LLM to improve/clarify the query for better retrieval.
+        Results are cached per model and query.
+
+        :param timeout: Seconds before the request is abandoned, without retries; by default
+                        the client's own timeout and retry policy apply
         """
+        return self.rewrite_cache.get_or_compute((self.model, query), lambda: self._rewrite_query(query, timeout))
+
+    def _rewrite_query(self, query: str, timeout: Optional[float] = None) -> str:
         prompt = f"""
             You are an AI assistant helping improve search queries for a document retrieval system.
             Given a user query, rewrite it to make it more specific, unambiguous, and aligned with technical or factual documents.
@@ -93,14 +196,16 @@ class AnswerGenerator:
             Rewritten query:
             """.strip()
 
-        response = self.client.chat.completions.create(
-            model=self.model,
-            messages=[
-                {"role": "system", "content": "You are a helpful assistant that rewrites vague user queries into clearer and more specific ones."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.2,
-            max_tokens=64,
-        )
+        client = self.client if timeout is None else self.client.with_options(timeout=timeout, max_retries=0)
+        with metrics.timer("generator.rewrite"):
+            response = client.chat.completions.create(
+                model=self.model,
+                messages=[
+                    {"role": "system", "content": "You are a helpful assistant that rewrites vague user queries into clearer and more specific ones."},
+                    {"role": "user", "content": prompt}
+                ],
+                temperature=0.2,
+                max_tokens=64,
+            )
 
         return response.choices[0].message.content.strip()
\ No newline at end of file
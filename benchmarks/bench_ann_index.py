@@ -0,0 +1,102 @@
+"""
+Recall@k versus query latency of the FaissChunkStore index types on synthetic
+normalized 384-d vectors, measured against an exact inner-product flat index.
+
+Run from the repository root:
+    python -m benchmarks.bench_ann_index --vectors 200000 --queries 1000 --k 10
+"""
+import argparse
+import time
+from typing import Dict, List
+
+import faiss
+import numpy as np
+
+from storage.faiss_index_factory import build_index, set_search_params
+
+
+def make_vectors(n: int, dim: int, clusters: int = 256, seed: int = 0) -> np.ndarray:
+    """Gaussian mixture around random centroids, normalized like sentence embeddings."""
+    rng = np.random.default_rng(seed)
+    centroids = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centroids[rng.integers(0, clusters, n)] + 0.6 * rng.standard_normal((n, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def recall_at_k(found: np.ndarray, truth: np.ndarray) -> float:
+    hits = sum(len(set(f) & set(t)) for f, t in zip(found, truth))
+    return hits / truth.size
+
+
+def measure(index: faiss.Index, queries: np.ndarray, truth: np.ndarray, k: int) -> Dict[str, float]:
+    latencies = []
+    found = np.empty_like(truth)
+    for i, q in enumerate(queries):
+        start = time.perf_counter()
+        _, I = index.search(q[None, :], k)
+        latencies.append(time.perf_counter() - start)
+        found[i] = I[0]
+    latencies_ms = np.array(latencies) * 1000
+
+    start = time.perf_counter()
+    index.search(queries, k)
+    batch_qps = len(queries) / (time.perf_counter() - start)
+
+    return {
+        "recall": recall_at_k(found, truth),
+        "p50_ms": float(np.percentile(latencies_ms, 50)),
+        "p95_ms": float(np.percentile(latencies_ms, 95)),
+        "batch_qps": batch_qps,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--threads", type=int, default=0, help="FAISS OpenMP threads (0 keeps the default)")
+    args = parser.parse_args()
+
+    if args.threads:
+        faiss.omp_set_num_threads(args.threads)
+
+    data = make_vectors(args.vectors, args.dim)
+    queries = make_vectors(args.queries, args.dim, seed=1)
+
+    exact = build_index(args.dim, "flat", "ip")
+    exact.add(data)
+    _, truth = exact.search(queries, args.k)
+
+    sweeps: List[tuple] = [
+        ("flat", {}, [{}]),
+        ("hnsw", {"hnsw_m": 32}, [{"ef_search": ef} for ef in (16, 32, 64, 128, 256)]),
+        ("ivf_flat", {"nlist": args.nlist}, [{"nprobe": p} for p in (1, 4, 16, 64)]),
+        ("ivf_pq", {"nlist": args.nlist, "pq_m": args.pq_m}, [{"nprobe": p} for p in (4, 16, 64)]),
+    ]
+
+    print(f"{args.vectors} vectors, {args.queries} queries, dim={args.dim}, recall@{args.k} vs exact IP search\n")
+    print(f"{'index':<10} {'params':<16} {'build s':>8} {'recall':>7} {'p50 ms':>8} {'p95 ms':>8} {'batch qps':>10}")
+
+    for index_type, options, search_params in sweeps:
+        index = build_index(args.dim, index_type, "ip", **options)
+        start = time.perf_counter()
+        if not index.is_trained:
+            index.train(data[:max(64 * args.nlist, 10_000)])
+        index.add(data)
+        build_s = time.perf_counter() - start
+
+        for params in search_params:
+            set_search_params(index, **params)
+            row = measure(index, queries, truth, args.k)
+            label = ",".join(f"{k}={v}" for k, v in params.items()) or "-"
+            print(f"{index_type:<10} {label:<16} {build_s:8.1f} {row['recall']:7.3f} "
+                  f"{row['p50_ms']:8.3f} {row['p95_ms']:8.3f} {row['batch_qps']:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
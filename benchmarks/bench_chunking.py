@@ -0,0 +1,78 @@
+"""
+Compares DocumentProcessor.chunk against the previous quadratic token counting
+(re-tokenizing the whole growing buffer after every block) on long synthetic issue pages.
+
+Run from the repository root:
+    python -m benchmarks.bench_chunking --pages 5 --blocks 400 --backends nltk hf tiktoken
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from processors.document_processor import DocumentProcessor
+from processors.token_counter import TokenCounter
+
+
+WORDS = (
+    "model training data agents inference benchmark open weights research language vision "
+    "transformer robotics startup chip dataset policy safety evaluation reasoning retrieval"
+).split()
+
+
+def make_issue_page(i: int, blocks: int, words_per_block: int, rng: random.Random) -> Dict:
+    return {
+        "url": f"https://example.com/the-batch/issue-{i}/",
+        "blocks": [
+            {"type": "text", "content": " ".join(rng.choice(WORDS) for _ in range(words_per_block)) + "."}
+            for _ in range(blocks)
+        ],
+    }
+
+
+def chunk_quadratic(processor: DocumentProcessor, doc: Dict) -> List[Dict]:
+    """The chunking loop as it was before running token totals: one full re-count per block."""
+    chunks, text_buf, chunk_id = [], "", 0
+    for block in doc["blocks"]:
+        text_buf += " " + block["content"]
+        if processor._count_tokens(text_buf) >= processor.max_tokens:
+            chunks.append(processor._make_chunk(doc, chunk_id, text_buf.strip(), None))
+            chunk_id += 1
+            text_buf = ""
+    if text_buf.strip():
+        chunks.append(processor._make_chunk(doc, chunk_id, text_buf.strip(), None))
+    return chunks
+
+
+def timed(fn, docs: List[Dict]) -> float:
+    start = time.perf_counter()
+    for doc in docs:
+        fn(doc)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=5)
+    parser.add_argument("--blocks", type=int, default=400, help="Text blocks per issue page")
+    parser.add_argument("--words-per-block", type=int, default=40)
+    parser.add_argument("--max-tokens", type=int, nargs="+", default=[200, 2000])
+    parser.add_argument("--backends", nargs="+", default=["nltk"], choices=TokenCounter.BACKENDS)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    docs = [make_issue_page(i, args.blocks, args.words_per_block, rng) for i in range(args.pages)]
+    print(f"{args.pages} pages x {args.blocks} blocks x {args.words_per_block} words\n")
+    print(f"{'backend':<10} {'max_tokens':>10} {'quadratic s':>12} {'running s':>10} {'speedup':>8}")
+
+    for backend in args.backends:
+        counter = TokenCounter(backend)
+        for max_tokens in args.max_tokens:
+            processor = DocumentProcessor(max_tokens=max_tokens, tokenizer=counter)
+            before = timed(lambda doc: chunk_quadratic(processor, doc), docs)
+            after = timed(lambda doc: processor.chunk(doc, ocr_texts={}), docs)
+            print(f"{backend:<10} {max_tokens:>10} {before:12.3f} {after:10.3f} {before / after:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
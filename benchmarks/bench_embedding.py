@@ -0,0 +1,84 @@
+"""
+Compares per-chunk and batched embedding throughput of ChunkEmbedder, and with --workers
+the throughput of multi-process encoding (ChunkEmbedder(encode_workers=N)).
+
+Run from the repository root:
+    python -m benchmarks.bench_embedding --chunks 512 --batch-sizes 16 64 128
+    python -m benchmarks.bench_embedding --chunks 8192 --batch-sizes 64 --workers 2 4 8
+"""
+import argparse
+import random
+import time
+from typing import Dict, List
+
+from embedding.embedder import ChunkEmbedder
+
+
+WORDS = (
+    "model training data agents inference benchmark open weights research language vision "
+    "transformer robotics startup chip dataset policy safety evaluation reasoning retrieval"
+).split()
+
+
+def make_chunks(n: int, words_per_chunk: int = 150, seed: int = 0) -> List[Dict]:
+    rng = random.Random(seed)
+    return [
+        {
+            "article_url": f"https://example.com/the-batch/article-{i // 8}/",
+            "chunk_id": i % 8,
+            "text": " ".join(rng.choice(WORDS) for _ in range(words_per_chunk)),
+            "image_url": None,
+            "type": "text",
+        }
+        for i in range(n)
+    ]
+
+
+def bench_per_chunk(embedder: ChunkEmbedder, chunks: List[Dict]) -> float:
+    start = time.perf_counter()
+    for chunk in chunks:
+        embedder.embed_chunk(chunk)
+    return len(chunks) / (time.perf_counter() - start)
+
+
+def bench_batched(embedder: ChunkEmbedder, chunks: List[Dict], batch_size: int) -> float:
+    start = time.perf_counter()
+    embedder.embed_chunks(chunks, batch_size=batch_size)
+    return len(chunks) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chunks", type=int, default=512)
+    parser.add_argument("--words-per-chunk", type=int, default=150)
+    parser.add_argument("--batch-sizes", type=int, nargs="+", default=[16, 64, 128])
+    parser.add_argument("--workers", type=int, nargs="*", default=[], help="Encode worker process counts to compare")
+    parser.add_argument("--threads-per-worker", type=int, help="Defaults to CPU count // workers")
+    args = parser.parse_args()
+
+    embedder = ChunkEmbedder()
+    chunks = make_chunks(args.chunks, args.words_per_chunk)
+
+    # Warm up the model so the first timed run does not pay for lazy initialization
+    embedder.embed_chunks(chunks[:8])
+
+    baseline = bench_per_chunk(embedder, chunks)
+    print(f"{'per-chunk':>12}: {baseline:8.1f} chunks/sec")
+
+    for batch_size in args.batch_sizes:
+        rate = bench_batched(embedder, chunks, batch_size)
+        print(f"{'batch=' + str(batch_size):>12}: {rate:8.1f} chunks/sec ({rate / baseline:.1f}x)")
+
+    batch_size = max(args.batch_sizes)
+    for workers in args.workers:
+        pooled = ChunkEmbedder(batch_size=batch_size, encode_workers=workers, threads_per_worker=args.threads_per_worker)
+        try:
+            pooled.embed_chunks(chunks[:8])
+            rate = bench_batched(pooled, chunks, batch_size)
+        finally:
+            pooled.close()
+        print(f"{f'{workers} procs':>12}: {rate:8.1f} chunks/sec ({rate / baseline:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
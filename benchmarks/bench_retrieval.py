@@ -0,0 +1,301 @@
+"""
+End-to-end retrieval benchmark on a synthetic The-Batch-like corpus, at several corpus
+sizes (in chunks). For each size it chunks, embeds and indexes the corpus into a fresh
+FaissChunkStore, BM25 and entity index in a temporary directory, then runs queries
+through QueryEngine. Reported per size:
+    - ingest throughput per stage (chunk, embed, entities, index) and save time
+    - resident memory after the build and the size of the indexes on disk
+    - single-query latency p50/p95/p99, per QueryEngine stage, and query_batch throughput
+
+Runs offline by default: embeddings come from a deterministic hashing embedder, entities
+from a name matcher and OCR text is synthetic. `--embedder model` and `--extractor spacy`
+use the real ChunkEmbedder and EntityExtractor instead.
+
+Results are written as JSON (see --output); pass an earlier file to --compare to print the
+change of every headline number against it.
+
+Run from the repository root:
+    python -m benchmarks.bench_retrieval --scales 1000 10000 100000 --queries 500
+    python -m benchmarks.bench_retrieval --scales 10000 --index-type hnsw --compare benchmarks/results/<earlier>.json
+"""
+import argparse
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.synthetic_corpus import (
+    StubEmbedder, StubEntityExtractor, WhitespaceTokenizer, iter_articles, make_queries, ocr_texts,
+)
+from processors.document_processor import DocumentProcessor
+from processors.token_counter import TokenCounter
+from query_engine import QueryEngine
+from storage.bm25_index import BM25Index
+from storage.entity_index import EntityIndex
+from storage.faiss_chunk_store import FaissChunkStore
+from utils.metrics import metrics
+
+
+def rss_mb() -> float:
+    """Current resident set size; falls back to the peak where /proc is not available."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def disk_mb(path: str) -> float:
+    return sum(os.path.getsize(os.path.join(root, name))
+               for root, _, names in os.walk(path) for name in names) / 2**20
+
+
+def percentiles_ms(seconds: List[float]) -> Dict[str, float]:
+    ms = np.array(seconds) * 1000
+    return {f"p{q}_ms": float(np.percentile(ms, q)) for q in (50, 95, 99)}
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def build(args, scale: Optional[int], workdir: str, embedder, extractor, processor: DocumentProcessor,
+          articles: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Ingests `scale` chunks, or all chunks of the first `articles` articles when scale is None;
+    returns the indexes and the ingest stats.
+    """
+    store = FaissChunkStore(
+        dim=len(embedder.embed_text("dimension probe")),
+        index_path=os.path.join(workdir, "faiss_index.bin"),
+        metadata_path=os.path.join(workdir, "metadata.arrow"),
+        index_type=args.index_type, metric=args.metric,
+        nlist=args.nlist, pq_m=args.pq_m, hnsw_m=args.hnsw_m,
+    )
+    bm25 = BM25Index(os.path.join(workdir, "bm25_index"))
+    entity_index = EntityIndex(os.path.join(workdir, "entity_index"))
+    seconds = {"chunk": 0.0, "embed": 0.0, "entities": 0.0, "index": 0.0}
+
+    def ingest(chunks: List[Dict]):
+        start = time.perf_counter()
+        vectors = embedder.embed_chunks(chunks, batch_size=args.batch_size)
+        seconds["embed"] += time.perf_counter() - start
+
+        # Same path as BatchDataPipeline._index_new_rows: add_batch skips duplicate chunks,
+        # so the sparse indexes get the text of the rows it kept, read back from the store
+        start = time.perf_counter()
+        row_ids = store.add_batch(vectors, chunks)
+        texts = [row["text"] for row in store.get_rows(row_ids)]
+        seconds["index"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        entities = extractor.extract_many(texts)
+        seconds["entities"] += time.perf_counter() - start
+
+        start = time.perf_counter()
+        entity_index.add_many(row_ids, entities)
+        bm25.add_many(row_ids, texts)
+        seconds["index"] += time.perf_counter() - start
+
+    def done(total: int) -> bool:
+        return scale is not None and total >= scale
+
+    rss_before = rss_mb()
+    ingested, pending, total = 0, [], 0
+    for article in iter_articles(articles, blocks=args.blocks, words_per_block=args.words_per_block):
+        start = time.perf_counter()
+        chunks = processor.chunk(article, ocr_texts=ocr_texts(article))
+        if scale is not None:
+            chunks = chunks[:scale - total]
+        seconds["chunk"] += time.perf_counter() - start
+        ingested += 1
+        total += len(chunks)
+        pending += chunks
+        if len(pending) >= args.batch_size or done(total):
+            ingest(pending)
+            pending = []
+        if done(total):
+            break
+    if pending:
+        ingest(pending)
+
+    start = time.perf_counter()
+    store.save()
+    bm25.save()
+    entity_index.save()
+    save_s = time.perf_counter() - start
+
+    ingest_s = sum(seconds.values())
+    return {
+        "store": store, "bm25": bm25, "entity_index": entity_index,
+        "stats": {
+            "chunks": store.ntotal,
+            "articles": ingested,
+            "ingest": {
+                "chunks_per_sec": store.ntotal / ingest_s,
+                **{f"{stage}_s": s for stage, s in seconds.items()},
+                "save_s": save_s,
+                "index_build_s": seconds["index"] + save_s,
+            },
+            "memory": {
+                "rss_mb": rss_mb(),
+                "rss_delta_mb": rss_mb() - rss_before,
+                "disk_mb": disk_mb(workdir),
+            },
+        },
+    }
+
+
+def measure_queries(args, engine: QueryEngine) -> Dict[str, Any]:
+    queries = [text for text, _, _ in make_queries(args.warmup + args.queries + args.batch_queries)]
+    warmup = queries[:args.warmup]
+    single = queries[args.warmup:args.warmup + args.queries]
+    batched = queries[args.warmup + args.queries:]
+
+    for query in warmup:
+        engine.query(query, top_k=args.top_k)
+
+    metrics.reset()
+    latencies = []
+    for query in single:
+        start = time.perf_counter()
+        engine.query(query, top_k=args.top_k)
+        latencies.append(time.perf_counter() - start)
+    stages = {
+        name: {"p50_ms": h["p50"] * 1000, "p95_ms": h["p95"] * 1000, "p99_ms": h["p99"] * 1000}
+        for name, h in sorted(metrics.snapshot()["histograms"].items()) if name.startswith("query.")
+    }
+
+    batch_qps = None
+    if batched:
+        start = time.perf_counter()
+        for i in range(0, len(batched), args.query_batch_size):
+            engine.query_batch(batched[i:i + args.query_batch_size], top_k=args.top_k)
+        batch_qps = len(batched) / (time.perf_counter() - start)
+
+    return {**percentiles_ms(latencies), "qps": len(single) / sum(latencies),
+            "batch_qps": batch_qps, "stages": stages}
+
+
+HEADLINES = [
+    ("ingest", "chunks_per_sec", True), ("ingest", "index_build_s", False), ("memory", "rss_mb", False),
+    ("query", "p50_ms", False), ("query", "p95_ms", False), ("query", "p99_ms", False), ("query", "batch_qps", True),
+]
+
+
+def compare(results: List[Dict], baseline_path: str):
+    with open(baseline_path) as f:
+        baseline = {row["scale"]: row for row in json.load(f)["results"]}
+    print(f"\nChange against {baseline_path} (+ is better)")
+    for row in results:
+        old = baseline.get(row["scale"])
+        if old is None:
+            continue
+        changes = []
+        for section, key, higher_is_better in HEADLINES:
+            before, after = old[section].get(key), row[section].get(key)
+            if before and after:
+                change = (after - before) / before * (1 if higher_is_better else -1)
+                changes.append(f"{key} {change:+.0%}")
+        print(f"{row['scale']:>9}: " + ", ".join(changes))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scales", type=int, nargs="+", default=[1000, 10_000],
+                        help="Corpus sizes in chunks, e.g. 1000 10000 100000 1000000")
+    parser.add_argument("--embedder", choices=["stub", "model"], default="stub")
+    parser.add_argument("--extractor", choices=["stub", "spacy"], default="stub")
+    parser.add_argument("--tokenizer", choices=["whitespace", *TokenCounter.BACKENDS], default="whitespace")
+    parser.add_argument("--max-tokens", type=int, default=200, help="DocumentProcessor.max_tokens")
+    parser.add_argument("--blocks", type=int, default=12, help="Blocks per article, every 4th an image")
+    parser.add_argument("--words-per-block", type=int, default=40)
+    parser.add_argument("--batch-size", type=int, default=256, help="Chunks per embed/index batch")
+    parser.add_argument("--index-type", default="flat")
+    parser.add_argument("--metric", choices=["l2", "ip"], default="l2")
+    parser.add_argument("--nlist", type=int, default=1024)
+    parser.add_argument("--pq-m", type=int, default=48)
+    parser.add_argument("--hnsw-m", type=int, default=32)
+    parser.add_argument("--no-bm25", action="store_true", help="Query with dense retrieval only")
+    parser.add_argument("--rerank-pool", type=int, default=50)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--queries", type=int, default=300, help="Timed single queries per scale")
+    parser.add_argument("--warmup", type=int, default=20)
+    parser.add_argument("--batch-queries", type=int, default=256, help="Queries sent through query_batch")
+    parser.add_argument("--query-batch-size", type=int, default=32)
+    parser.add_argument("--output", help="Results file (default: benchmarks/results/retrieval-<UTC time>.json)")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    args = parser.parse_args()
+
+    if args.embedder == "stub":
+        embedder = StubEmbedder()
+    else:
+        from embedding.embedder import ChunkEmbedder
+        embedder = ChunkEmbedder()
+    if args.extractor == "stub":
+        extractor = StubEntityExtractor()
+    else:
+        from processors.entity_extractor import EntityExtractor
+        extractor = EntityExtractor()
+    tokenizer = TokenCounter.wrap(WhitespaceTokenizer()) if args.tokenizer == "whitespace" else args.tokenizer
+    processor = DocumentProcessor(max_tokens=args.max_tokens, tokenizer=tokenizer)
+
+    print(f"{args.index_type}/{args.metric} index, {args.embedder} embedder, "
+          f"{'dense only' if args.no_bm25 else 'dense + BM25'}, top_k={args.top_k}, rerank_pool={args.rerank_pool}\n")
+    print(f"{'chunks':>9} {'chunks/s':>9} {'build s':>8} {'rss MB':>8} {'disk MB':>8} "
+          f"{'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7} {'batch qps':>10}")
+
+    results = []
+    for scale in args.scales:
+        with tempfile.TemporaryDirectory(prefix="bench_retrieval_") as workdir:
+            built = build(args, scale, workdir, embedder, extractor, processor)
+            engine = QueryEngine(built["store"], embedder, entity_index=built["entity_index"],
+                                 rerank_pool=args.rerank_pool, bm25_index=None if args.no_bm25 else built["bm25"],
+                                 entity_extractor=extractor)
+            row = {"scale": scale, **built["stats"], "query": measure_queries(args, engine)}
+            if engine._sparse_executor is not None:
+                engine._sparse_executor.shutdown()
+        results.append(row)
+
+        ingest, memory, query = row["ingest"], row["memory"], row["query"]
+        print(f"{row['chunks']:>9} {ingest['chunks_per_sec']:9.0f} {ingest['index_build_s']:8.2f} "
+              f"{memory['rss_mb']:8.0f} {memory['disk_mb']:8.1f} {query['p50_ms']:7.2f} {query['p95_ms']:7.2f} "
+              f"{query['p99_ms']:7.2f} {query['batch_qps'] or 0:10.0f}")
+
+    output = args.output or os.path.join(
+        "benchmarks", "results", f"retrieval-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.json"
+    )
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump({
+            "meta": {
+                "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                "commit": git_commit(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "args": vars(args),
+            },
+            "results": results,
+        }, f, indent=2)
+    print(f"\nResults written to {output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
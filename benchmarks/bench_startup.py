@@ -0,0 +1,69 @@
+"""
+Measures cold-start cost of the entry points in fresh interpreters: the time to import
+each module (with `python -X importtime`) and the heaviest packages it pulls in.
+
+Importing main.py or data_loading.py would start loading models, so the app is measured
+through `resources` (everything main.py imports) and the pipeline through its module
+import; show_loaded_stats.py is run end to end.
+
+Run from the repository root:
+    python -m benchmarks.bench_startup --runs 3
+"""
+import argparse
+import re
+import subprocess
+import sys
+import time
+from typing import Dict, List, Tuple
+
+TARGETS = {
+    "main.py (resources)": ["-c", "import resources"],
+    "data_loading.py": ["-c", "import data_loading"],
+    "show_loaded_stats.py": ["show_loaded_stats.py"],
+}
+
+LOCAL_PACKAGES = {
+    "answer_generator", "data_loading", "embedding", "model_server", "processors", "query_engine",
+    "resources", "retrieval_orchestrator", "scrapers", "storage", "utils",
+}
+
+IMPORTTIME_RE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+
+def run(args: List[str]) -> Tuple[float, str]:
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, "-X", "importtime", *args], capture_output=True, text=True)
+    elapsed = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(args)} failed:\n{proc.stderr[-2000:]}")
+    return elapsed, proc.stderr
+
+
+def heaviest_packages(importtime_log: str, top: int) -> List[Tuple[str, float]]:
+    """
+    Cumulative import time of each third-party package. Every module appears in the log
+    once, at its first import, so a package's own line covers all of its submodules.
+    """
+    totals: Dict[str, float] = {}
+    for _, cumulative_us, _, module in IMPORTTIME_RE.findall(importtime_log):
+        if "." in module or module in sys.stdlib_module_names or module.startswith("_") or module in LOCAL_PACKAGES:
+            continue
+        totals[module] = int(cumulative_us) / 1e6
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3, help="Fresh interpreters per target; the best run is reported")
+    parser.add_argument("--top", type=int, default=5, help="Heaviest packages listed per target")
+    args = parser.parse_args()
+
+    for name, target in TARGETS.items():
+        runs = [run(target) for _ in range(args.runs)]
+        wall, log = min(runs, key=lambda r: r[0])
+        packages = ", ".join(f"{pkg} {seconds:.2f}s" for pkg, seconds in heaviest_packages(log, args.top))
+        print(f"{name:<22} {wall:6.2f}s   heaviest: {packages}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Measures user-visible answer latency of AnswerGenerator.generate (full completion) against
+generate_stream (time to first token) using a local fake OpenAI-compatible server that
+emits one token every --token-delay seconds. No API key or network access is needed.
+
+Run from the repository root:
+    python -m benchmarks.bench_streaming --tokens 200 --token-delay 0.02
+"""
+import argparse
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def make_handler(tokens: int, first_token_delay: float, token_delay: float):
+    class FakeChatCompletions(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+            pieces = [f"token{i} " for i in range(tokens)]
+            base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body["model"]}
+
+            if not body.get("stream"):
+                time.sleep(first_token_delay + token_delay * tokens)
+                payload = {**base, "object": "chat.completion", "choices": [{
+                    "index": 0, "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": "".join(pieces)},
+                }]}
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                return
+
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            time.sleep(first_token_delay)
+            for piece in pieces:
+                chunk = {**base, "object": "chat.completion.chunk", "choices": [{
+                    "index": 0, "finish_reason": None, "delta": {"content": piece},
+                }]}
+                self.wfile.write(f"data: {json.dumps(chunk)}\n\n".encode())
+                self.wfile.flush()
+                time.sleep(token_delay)
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return FakeChatCompletions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=200, help="Tokens in each fake answer")
+    parser.add_argument("--first-token-delay", type=float, default=0.3, help="Seconds of fake prompt processing")
+    parser.add_argument("--token-delay", type=float, default=0.02, help="Seconds between streamed tokens")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(args.tokens, args.first_token_delay, args.token_delay))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.setdefault("OPENAI_API_KEY", "bench")
+
+    from answer_generator import AnswerGenerator
+    generator = AnswerGenerator(base_url=f"http://127.0.0.1:{server.server_port}/v1")
+    results = [({"article_url": "https://example.com/a", "text": "Example source text."}, 0.0)]
+
+    print(f"{args.tokens} tokens, {args.first_token_delay}s to first token, {args.token_delay}s per token\n")
+    print(f"{'run':>3} {'blocking s':>11} {'stream TTFT s':>14} {'stream total s':>15}")
+    for run in range(args.runs):
+        start = time.perf_counter()
+        blocking_answer = generator.generate("What is new?", results)
+        blocking = time.perf_counter() - start
+
+        start = time.perf_counter()
+        streamed_answer = "".join(generator.generate_stream("What is new?", results))
+        total = time.perf_counter() - start
+        assert streamed_answer == blocking_answer
+        print(f"{run:>3} {blocking:11.3f} {generator.last_time_to_first_token:14.3f} {total:15.3f}")
+
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,259 @@
+"""
+Replays a query set through QueryEngine and reports retrieval quality (recall@k, MRR,
+hit rate) next to per-query latency, for one engine configuration or an A/B pair, so a
+tuning change that is faster but retrieves worse shows up.
+
+Query sets are JSON Lines, one query per line:
+    {"query": "What did Nvidia say about export rules?", "article_urls": ["https://..."]}
+The text may also be under "question" or "title", and the expected articles under a single
+"article_url". Queries without expected articles only count toward latency.
+
+A configuration is a comma-separated list of key=value pairs:
+    store:  index_path, metadata_path, bm25_path, entity_index_path, nprobe, ef_search
+    engine: rerank_pool, boost_weight, fusion, dense_weight, rrf_k, bm25, entities (true/false)
+Configurations with a different index type or chunk size need their own index files,
+built by an ingest run and selected with the path keys.
+
+With --synthetic N, each configuration instead gets a fresh index over the first N synthetic
+articles (see benchmarks/synthetic_corpus.py), built according to index_type, metric, nlist,
+pq_m, hnsw_m and max_tokens (chunk size). Without --queries the synthetic query set is used;
+the articles relevant to each of its queries are known.
+
+Run from the repository root:
+    python -m benchmarks.eval_retrieval --queries eval/queries.jsonl --a "rerank_pool=50" --b "rerank_pool=200,boost_weight=0.2"
+    python -m benchmarks.eval_retrieval --synthetic 2000 --a "index_type=flat" --b "index_type=hnsw,ef_search=16"
+    python -m benchmarks.eval_retrieval --synthetic 2000 --a "max_tokens=200" --b "max_tokens=400"
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from benchmarks.bench_retrieval import build
+from benchmarks.synthetic_corpus import (
+    StubEmbedder, StubEntityExtractor, WhitespaceTokenizer, make_queries, relevant_urls,
+)
+from processors.document_processor import DocumentProcessor
+from processors.token_counter import TokenCounter
+from query_engine import QueryEngine
+from storage.bm25_index import BM25Index
+from storage.entity_index import EntityIndex
+from storage.faiss_chunk_store import FaissChunkStore
+
+
+STORE_KEYS = {"index_path", "metadata_path", "bm25_path", "entity_index_path", "nprobe", "ef_search"}
+BUILD_KEYS = {"index_type", "metric", "nlist", "pq_m", "hnsw_m", "max_tokens"}
+ENGINE_KEYS = {"rerank_pool", "boost_weight", "fusion", "dense_weight", "rrf_k", "bm25", "entities"}
+
+# Synthetic index build settings; a configuration overrides the BUILD_KEYS among them
+BUILD_DEFAULTS = {"index_type": "flat", "metric": "l2", "nlist": 1024, "pq_m": 48, "hnsw_m": 32,
+                  "max_tokens": 200, "batch_size": 256, "blocks": 12, "words_per_block": 40}
+
+
+def parse_config(text: str) -> Dict[str, Any]:
+    """'rerank_pool=200,fusion=weighted' -> {"rerank_pool": 200, "fusion": "weighted"}"""
+    config = {}
+    for pair in filter(None, (p.strip() for p in text.split(","))):
+        key, sep, value = pair.partition("=")
+        if not sep or key not in STORE_KEYS | BUILD_KEYS | ENGINE_KEYS:
+            raise argparse.ArgumentTypeError(f"Invalid configuration entry '{pair}'")
+        try:
+            config[key] = json.loads(value)
+        except json.JSONDecodeError:
+            config[key] = value
+    return config
+
+
+def load_queries(path: str) -> List[Dict[str, Any]]:
+    queries = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line_no, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            text = record.get("query") or record.get("question") or record.get("title")
+            if not text:
+                print(f"Skipping line {line_no} of {path}: no query text")
+                continue
+            expected = record.get("article_urls") or ([record["article_url"]] if record.get("article_url") else [])
+            queries.append({"query": text, "expected": expected})
+    return queries
+
+
+def synthetic_queries(n: int, articles: int) -> List[Dict[str, Any]]:
+    return [{"query": text, "expected": relevant_urls(topic, entity, articles)}
+            for text, topic, entity in make_queries(n)]
+
+
+def make_engine(config: Dict[str, Any], store: FaissChunkStore, bm25: Optional[BM25Index],
+                entity_index: Optional[EntityIndex], embedder, extractor) -> QueryEngine:
+    store.set_search_params(nprobe=config.get("nprobe"), ef_search=config.get("ef_search"))
+    options = {key: config[key] for key in ("boost_weight", "fusion", "dense_weight", "rrf_k") if key in config}
+    return QueryEngine(
+        store, embedder,
+        entity_index=entity_index if config.get("entities", True) else None,
+        bm25_index=bm25 if config.get("bm25", True) else None,
+        rerank_pool=config.get("rerank_pool", 50),
+        entity_extractor=extractor,
+        **options,
+    )
+
+
+def open_engine(config: Dict[str, Any], embedder, extractor) -> QueryEngine:
+    """Engine over indexes on disk (data/ by default)."""
+    store = FaissChunkStore(
+        dim=len(embedder.embed_text("dimension probe")),
+        index_path=config.get("index_path", "data/faiss_index.bin"),
+        metadata_path=config.get("metadata_path", "data/metadata.arrow"),
+    )
+    bm25 = BM25Index(config.get("bm25_path", "data/bm25_index"))
+    entity_index = EntityIndex(config.get("entity_index_path", "data/entity_index"))
+    return make_engine(config, store, bm25, entity_index, embedder, extractor)
+
+
+def build_engine(config: Dict[str, Any], articles: int, workdir: str, embedder, extractor) -> QueryEngine:
+    """Engine over a fresh index of the first `articles` synthetic articles."""
+    settings = argparse.Namespace(**{**BUILD_DEFAULTS, **{k: v for k, v in config.items() if k in BUILD_KEYS}})
+    os.makedirs(workdir, exist_ok=True)
+    processor = DocumentProcessor(max_tokens=settings.max_tokens, tokenizer=TokenCounter.wrap(WhitespaceTokenizer()))
+    built = build(settings, None, workdir, embedder, extractor, processor, articles=articles)
+    return make_engine(config, built["store"], built["bm25"], built["entity_index"], embedder, extractor)
+
+
+def score(results: List[Tuple[Dict, float]], expected: List[str]) -> Tuple[float, float]:
+    """Recall and reciprocal rank of the expected articles among the retrieved articles, in rank order."""
+    urls = list(dict.fromkeys(meta["article_url"] for meta, _ in results))
+    expected = set(expected)
+    found = [rank for rank, url in enumerate(urls, 1) if url in expected]
+    return len(found) / len(expected), (1.0 / found[0] if found else 0.0)
+
+
+def evaluate(engine: QueryEngine, queries: List[Dict[str, Any]], k: int, batch_size: int,
+             warmup: int) -> List[Dict[str, Any]]:
+    """
+    Runs every query once and returns one record per query. With batch_size > 1 queries go
+    through query_batch and each one is charged an equal share of its batch's time.
+    """
+    for query in queries[:warmup]:
+        engine.query(query["query"], top_k=k)
+    for cache in (engine.result_cache, engine.embedding_cache, engine.entity_cache):
+        cache.clear()
+
+    records = []
+    for i in range(0, len(queries), batch_size):
+        batch = queries[i:i + batch_size]
+        start = time.perf_counter()
+        if batch_size > 1:
+            results = engine.query_batch([q["query"] for q in batch], top_k=k)
+        else:
+            results = [engine.query(batch[0]["query"], top_k=k)]
+        latency = (time.perf_counter() - start) / len(batch)
+
+        for query, result in zip(batch, results):
+            record = {"query": query["query"], "latency_ms": latency * 1000,
+                      "urls": list(dict.fromkeys(meta["article_url"] for meta, _ in result["results"]))}
+            if query["expected"]:
+                record["recall"], record["reciprocal_rank"] = score(result["results"], query["expected"])
+            records.append(record)
+    return records
+
+
+def summarize(records: List[Dict[str, Any]]) -> Dict[str, Any]:
+    judged = [r for r in records if "recall" in r]
+    latencies = np.array([r["latency_ms"] for r in records])
+    summary = {
+        "queries": len(records),
+        "judged": len(judged),
+        "p50_ms": float(np.percentile(latencies, 50)),
+        "p95_ms": float(np.percentile(latencies, 95)),
+        "p99_ms": float(np.percentile(latencies, 99)),
+        "qps": 1000 * len(records) / latencies.sum(),
+    }
+    if judged:
+        summary["recall"] = float(np.mean([r["recall"] for r in judged]))
+        summary["mrr"] = float(np.mean([r["reciprocal_rank"] for r in judged]))
+        summary["hit_rate"] = float(np.mean([r["reciprocal_rank"] > 0 for r in judged]))
+    return summary
+
+
+def print_summary(name: str, summary: Dict[str, Any]):
+    quality = "".join(f" {summary[key]:8.3f}" if key in summary else f" {'-':>8}" for key in ("recall", "mrr", "hit_rate"))
+    print(f"{name:<6}{quality} {summary['p50_ms']:8.2f} {summary['p95_ms']:8.2f} "
+          f"{summary['p99_ms']:8.2f} {summary['qps']:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", help="JSONL query set (required unless --synthetic)")
+    parser.add_argument("--a", type=parse_config, default={}, help="Configuration A (key=value,...)")
+    parser.add_argument("--b", type=parse_config, help="Configuration B, compared against A")
+    parser.add_argument("--synthetic", type=int, metavar="ARTICLES",
+                        help="Evaluate on fresh indexes over this many synthetic articles")
+    parser.add_argument("--synthetic-queries", type=int, default=300, help="Size of the synthetic query set")
+    parser.add_argument("--embedder", choices=["stub", "model"], help="Defaults to stub with --synthetic, else model")
+    parser.add_argument("--k", type=int, default=10, help="Results retrieved per query (the k of recall@k)")
+    parser.add_argument("--batch-size", type=int, default=1, help="Queries per query_batch call (1 uses query)")
+    parser.add_argument("--warmup", type=int, default=5, help="Untimed queries run first; caches are cleared after")
+    parser.add_argument("--output", help="Write summaries and per-query records to this JSON file")
+    args = parser.parse_args()
+
+    if not args.queries and not args.synthetic:
+        parser.error("--queries is required unless --synthetic is given")
+
+    if (args.embedder or ("stub" if args.synthetic else "model")) == "stub":
+        embedder = StubEmbedder()
+    else:
+        from embedding.embedder import ChunkEmbedder
+        embedder = ChunkEmbedder()
+    if args.synthetic:
+        extractor = StubEntityExtractor()
+    else:
+        from processors.entity_extractor import EntityExtractor
+        extractor = EntityExtractor()
+
+    queries = load_queries(args.queries) if args.queries else synthetic_queries(args.synthetic_queries, args.synthetic)
+    configs = {"A": args.a, **({"B": args.b} if args.b is not None else {})}
+
+    summaries, records = {}, {}
+    with tempfile.TemporaryDirectory(prefix="eval_retrieval_") as workdir:
+        for name, config in configs.items():
+            if args.synthetic:
+                engine = build_engine(config, args.synthetic, os.path.join(workdir, name), embedder, extractor)
+            else:
+                engine = open_engine(config, embedder, extractor)
+            records[name] = evaluate(engine, queries, args.k, args.batch_size, args.warmup)
+            summaries[name] = summarize(records[name])
+
+    print(f"\n{len(queries)} queries ({summaries['A']['judged']} with expected articles), k={args.k}")
+    for name, config in configs.items():
+        print(f"  {name}: {', '.join(f'{k}={v}' for k, v in config.items()) or 'defaults'}")
+    print(f"\n{'':<6} {'recall':>8} {'mrr':>8} {'hit rate':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'qps':>8}")
+    for name, summary in summaries.items():
+        print_summary(name, summary)
+
+    if "B" in summaries:
+        a, b = summaries["A"], summaries["B"]
+        deltas = {key: b[key] - a[key] for key in a if key in b and key not in ("queries", "judged")}
+        print(f"{'B - A':<6}" + "".join(f" {deltas[key]:+8.3f}" if key in deltas else f" {'-':>8}"
+                                        for key in ("recall", "mrr", "hit_rate", "p50_ms", "p95_ms", "p99_ms", "qps")))
+        # Per query, recall decides and reciprocal rank breaks ties
+        judged = [((ra["recall"], ra["reciprocal_rank"]), (rb["recall"], rb["reciprocal_rank"]))
+                  for ra, rb in zip(records["A"], records["B"]) if "recall" in ra]
+        worse = sum(qb < qa for qa, qb in judged)
+        better = sum(qb > qa for qa, qb in judged)
+        if judged:
+            print(f"\nB ranks the expected articles worse on {worse} and better on {better} of {len(judged)} queries")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump({"k": args.k, "configs": configs, "summaries": summaries, "records": records}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
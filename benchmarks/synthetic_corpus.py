@@ -0,0 +1,173 @@
+"""
+Deterministic synthetic stand-ins for benchmarks that must run offline: The-Batch-like
+articles with text and image blocks, OCR text for their images, queries, and stub
+embedder and entity extractor implementations with the interfaces of ChunkEmbedder and
+EntityExtractor.
+
+Everything is seeded, so the same arguments always produce the same corpus and vectors.
+"""
+import random
+import re
+import zlib
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+
+WORDS = (
+    "model training data agents inference benchmark open weights research language vision "
+    "transformer robotics startup chip dataset policy safety evaluation reasoning retrieval "
+    "compute cluster latency release paper team users product api developers cost accuracy"
+).split()
+
+TOPICS = {
+    "chips": "gpu accelerator silicon foundry wafer datacenter export".split(),
+    "robotics": "humanoid manipulation gripper locomotion actuator warehouse".split(),
+    "healthcare": "diagnosis radiology clinical patients drug protein".split(),
+    "regulation": "lawmakers compliance copyright liability senate oversight".split(),
+    "agents": "planning tools browser workflow autonomy memory".split(),
+    "vision": "segmentation diffusion video pixels camera detection".split(),
+    "speech": "voice transcription audio synthesis accent dubbing".split(),
+    "education": "students tutoring curriculum teachers grading homework".split(),
+}
+
+ENTITIES = [
+    "OpenAI", "Anthropic", "Google", "Meta", "DeepSeek", "Nvidia", "Mistral", "Microsoft",
+    "Alibaba", "Amazon", "Apple", "Tesla", "Baidu", "Cohere", "Samsung", "Intel",
+]
+
+
+def article_topic(i: int) -> str:
+    return list(TOPICS)[i % len(TOPICS)]
+
+
+def article_entity(i: int) -> str:
+    return ENTITIES[(i // len(TOPICS)) % len(ENTITIES)]
+
+
+def article_url(i: int) -> str:
+    return f"https://example.com/the-batch/{article_topic(i)}-{i}/"
+
+
+def relevant_urls(topic: str, entity: str, articles: int) -> List[str]:
+    """URLs of the first `articles` articles about `topic` that mention `entity`."""
+    return [article_url(i) for i in range(articles) if article_topic(i) == topic and article_entity(i) == entity]
+
+
+def make_article(i: int, blocks: int = 12, words_per_block: int = 40, image_every: int = 4,
+                 seed: int = 0) -> Dict:
+    """
+    Article i in the raw format produced by the scrapers. Its text mixes general AI
+    vocabulary with the words of one topic and mentions of one entity.
+    """
+    rng = random.Random(seed * 1_000_003 + i)
+    topic, entity = article_topic(i), article_entity(i)
+    vocabulary = WORDS + TOPICS[topic] * 3
+
+    content = []
+    for b in range(blocks):
+        if image_every and b % image_every == image_every - 1:
+            content.append({"type": "image", "url": f"https://example.com/images/{i}-{b}.png"})
+            continue
+        words = [rng.choice(vocabulary) for _ in range(words_per_block)]
+        words[rng.randrange(words_per_block)] = entity
+        content.append({"type": "text", "content": " ".join(words) + "."})
+
+    return {
+        "url": article_url(i),
+        "title": f"{entity} {topic} update {i}",
+        "description": f"{entity} news about {topic}",
+        "tags": [topic],
+        "blocks": content,
+    }
+
+
+def ocr_texts(article: Dict) -> Dict[str, str]:
+    """Stand-in OCR output for an article's images, so chunking never downloads anything."""
+    caption = article["description"]
+    return {block["url"]: f"Chart: {caption}" for block in article["blocks"] if block["type"] == "image"}
+
+
+def iter_articles(count: Optional[int] = None, **options) -> Iterator[Dict]:
+    """Articles 0, 1, 2, ... (endless when count is None)."""
+    i = 0
+    while count is None or i < count:
+        yield make_article(i, **options)
+        i += 1
+
+
+def make_queries(n: int, seed: int = 1) -> List[Tuple[str, str, str]]:
+    """
+    n distinct (query text, topic, entity) triples; each query names an entity, three
+    words of a topic and one general word, like "Nvidia gpu foundry export latency".
+    """
+    rng = random.Random(seed)
+    queries, seen = [], set()
+    while len(queries) < n:
+        topic, entity = rng.choice(list(TOPICS)), rng.choice(ENTITIES)
+        text = " ".join([entity, *rng.sample(TOPICS[topic], 3), rng.choice(WORDS)])
+        if text in seen:
+            continue
+        seen.add(text)
+        queries.append((text, topic, entity))
+    return queries
+
+
+class StubEmbedder:
+    """
+    Deterministic hashing embedder with the ChunkEmbedder interface: each lowercased
+    token maps to a fixed random vector and a text is the normalized sum of its tokens'
+    vectors. Texts sharing words get similar vectors, so retrieval results are meaningful.
+    """
+
+    TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+    def __init__(self, dim: int = 384, buckets: int = 1 << 14, seed: int = 0):
+        self.dim = dim
+        self.buckets = buckets
+        self.projection = np.random.default_rng(seed).standard_normal((buckets, dim)).astype(np.float32)
+        self._bucket_ids: Dict[str, int] = {}
+
+    def _bucket(self, token: str) -> int:
+        bucket = self._bucket_ids.get(token)
+        if bucket is None:
+            bucket = self._bucket_ids[token] = zlib.crc32(token.encode()) % self.buckets
+        return bucket
+
+    def embed_text(self, text: str) -> np.ndarray:
+        return self.embed_texts([text])[0]
+
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            ids = [self._bucket(t) for t in self.TOKEN_RE.findall(text.lower())]
+            if ids:
+                vectors[row] = self.projection[ids].sum(axis=0)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.maximum(norms, 1e-12)
+
+    def embed_chunks(self, chunks: List[Dict], batch_size: Optional[int] = None) -> np.ndarray:
+        return self.embed_texts([chunk["text"] for chunk in chunks])
+
+
+class StubEntityExtractor:
+    """EntityExtractor stand-in that finds the known synthetic entity names, without spaCy."""
+
+    nlp = None  # no spaCy pipeline behind it
+
+    def __init__(self, entities: List[str] = ENTITIES):
+        self.pattern = re.compile(r"\b(" + "|".join(map(re.escape, entities)) + r")\b")
+
+    def extract(self, text: str) -> List[str]:
+        return list(dict.fromkeys(self.pattern.findall(text)))
+
+    def extract_many(self, texts: List[str]) -> List[List[str]]:
+        return [self.extract(text) for text in texts]
+
+
+class WhitespaceTokenizer:
+    """Token counting without NLTK data or model downloads, for TokenCounter.wrap."""
+
+    @staticmethod
+    def encode(text: str) -> List[str]:
+        return text.split()
@@ -1,14 +1,23 @@
+import asyncio
 import os
-import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional
 import streamlit as st
 from scrapers.sitemap_loader import SitemapLoader, URLFilter
-from scrapers.article_scrapper import ArticleScraper
+from scrapers.article_scrapper import parse_article_html
+from scrapers.async_fetcher import AsyncFetcher, BlockingFetcher
 from scrapers.issue_article_scrapper import IssueArticleScraper
 from embedding.embedder import ChunkEmbedder
 from storage.parsed_article_store import ParsedArticleStore
 from storage.faiss_chunk_store import FaissChunkStore
+from storage.entity_index import EntityIndex
+from storage.bm25_index import BM25Index
 from processors.document_processor import DocumentProcessor
+from processors.entity_extractor import EntityExtractor
 from utils.logger import setup_logger
+from utils.metrics import metrics
+from utils.staged_pipeline import Stage, StagedPipeline
 
 
 class BatchDataPipeline:
@@ -23,20 +32,51 @@ class BatchDataPipeline:
 
     def __init__(self,
                  sitemap_url: str = "https://www.deeplearning.ai/sitemap.xml",
-                 parsed_store_path: str = 'data/parsed_articles.json',
-                 faiss_dim: int = 384):
+                 parsed_store_path: str = 'data/parsed_articles.jsonl',
+                 faiss_dim: int = 384,
+                 faiss_options: Optional[Dict[str, Any]] = None,
+                 embedding_cache_dir: Optional[str] = "cache/embeddings",
+                 entity_index_path: str = "data/entity_index",
+                 bm25_index_path: str = "data/bm25_index",
+                 embed_workers: int = 0,
+                 threads_per_embed_worker: Optional[int] = None):
+        """
+        :param faiss_options: Extra FaissChunkStore arguments, e.g. {"index_type": "hnsw", "metric": "ip"}.
+                              The store is opened in append-only mode unless overridden here.
+        :param embedding_cache_dir: Persistent embedding cache, so rebuilding the index only
+                                    encodes chunks whose text changed (None disables it)
+        :param entity_index_path: Directory of the entity -> chunk id index used for query boosting
+        :param bm25_index_path: Directory of the BM25 index used for hybrid retrieval
+        :param embed_workers: Encode chunk texts in this many worker processes instead of this one,
+                              each running `threads_per_embed_worker` torch threads (CPU-only ingest)
+        """
         self.logger = setup_logger(self.__class__.__name__)
         self.sitemap_url = sitemap_url
         self.store = ParsedArticleStore(parsed_store_path)
-        self.faiss_store = FaissChunkStore(dim=faiss_dim)
-        self.embedder = ChunkEmbedder()
+        self.faiss_store = FaissChunkStore(dim=faiss_dim, **{"append_only": True, **(faiss_options or {})})
+        self.embedder = ChunkEmbedder(cache_dir=embedding_cache_dir, encode_workers=embed_workers,
+                                      threads_per_worker=threads_per_embed_worker)
         self.document_processor = DocumentProcessor(max_tokens=200)
+        self.entity_extractor = EntityExtractor()
+        self.entity_index = EntityIndex(entity_index_path)
+        self.bm25_index = BM25Index(bm25_index_path)
 
-    def parse_and_store_articles(self, limit: int = 4000):
+    def parse_and_store_articles(self, limit: int = 4000, concurrency: int = 16,
+                                 per_host_rate: float = 5.0, parse_workers: int = 4):
         """
-        Downloads articles from sitemap, parses content, and stores in local JSON.
+        Downloads articles from sitemap, parses content, and stores in local JSON Lines.
         Avoids duplicates already saved.
+
+        Pages are fetched concurrently by AsyncFetcher and parsed in a process pool of
+        `parse_workers` while further downloads are in flight.
         """
+        pending = self._unparsed_urls(limit)
+        fetcher = AsyncFetcher(concurrency=concurrency, per_host_rate=per_host_rate)
+        with ProcessPoolExecutor(max_workers=parse_workers) as pool:
+            asyncio.run(self._fetch_and_parse(pending, fetcher, pool))
+
+    def _unparsed_urls(self, limit: int) -> List[str]:
+        """Issue and article URLs from the sitemap that are not in the parsed store yet."""
         loader = SitemapLoader(self.sitemap_url)
         all_urls = loader.get_all_urls()
 
@@ -45,14 +85,17 @@ class BatchDataPipeline:
         issue_urls = filterer.get_issue_urls()[:limit]
 
         all_targets = issue_urls + article_urls
-        already_loaded = {a['url'] for a in self.store.load()}
+        return [url for url in all_targets if url not in self.store]
 
-        for url in all_targets:
-            if url in already_loaded:
-                continue
+    async def _fetch_and_parse(self, urls: List[str], fetcher: AsyncFetcher, pool: ProcessPoolExecutor):
+        loop = asyncio.get_running_loop()
 
-            scraper = ArticleScraper(url)
-            parsed_article = scraper.parse()
+        async def parse(url: str, html: bytes):
+            try:
+                parsed_article = await loop.run_in_executor(pool, parse_article_html, url, html)
+            except Exception as e:
+                self.logger.warning(f"Failed to parse {url}: {e}")
+                return
 
             if parsed_article:
                 self.store.add_article(parsed_article)
@@ -60,35 +103,180 @@ class BatchDataPipeline:
                 st.text(f"Parsed: {url}")
                 self.logger.info(f"Parsed article: {url}")
 
-            time.sleep(0.3)  
+        parse_tasks = []
+        async for url, html in fetcher.iter_fetch(urls):
+            if html is not None:
+                parse_tasks.append(asyncio.create_task(parse(url, html)))
+        await asyncio.gather(*parse_tasks)
 
-    def embed_and_index_articles(self):
+    def embed_and_index_articles(self, articles_per_batch: int = 32, batch_size: int = 64):
         """
         Embeds parsed articles and stores vectors in FAISS.
         Skips already embedded URLs.
+
+        Articles are chunked in groups of `articles_per_batch`, and all chunks of a group
+        are encoded together with `batch_size` texts per model call. Each group is flushed
+        as a store segment, so an interrupted run resumes after the last completed group.
+        Entities of every new chunk are extracted once here and added to the entity index,
+        and chunk text is added to the BM25 index; both are saved with every group.
         """
-        articles = self.store.load()
+        self._index_missing_rows()
+
         embedded_urls = set(self.faiss_store.get_all_urls())
+        pending = [url for url in self.store.urls() if url not in embedded_urls]
 
-        self.logger.info(f"Embedding {len(articles)} articles...")
+        self.logger.info(f"Embedding {len(pending)} of {len(self.store)} articles...")
 
-        for article in articles:
-            if article['url'] in embedded_urls:
-                continue
+        # Shuts down the OCR process pool chunk_many starts, also when a batch fails
+        with self.document_processor.ocr:
+            for start in range(0, len(pending), articles_per_batch):
+                batch = [self.store.get(url) for url in pending[start:start + articles_per_batch]]
+                chunks = self.document_processor.chunk_many(batch)
+
+                embeddings = self.embedder.embed_chunks(chunks, batch_size=batch_size)
+                self._index_new_rows(self.faiss_store.add_batch(embeddings, chunks))
+
+                self.faiss_store.save()
+                self.entity_index.save()
+                self.bm25_index.save()
+                st.text(f"Embedded {start + len(batch)}/{len(pending)} articles")
+                self.logger.info(f"Added {len(chunks)} chunks from {len(batch)} articles")
+
+        if self.faiss_store.manifest.segments and not self.faiss_store.awaiting_training:
+            self.faiss_store.compact()
+
+    def run_streaming(self, limit: int = 4000, concurrency: int = 16, per_host_rate: float = 5.0,
+                      parse_workers: int = 4, ocr_workers: int = 2, chunk_workers: int = 2,
+                      articles_per_batch: int = 32, batch_size: int = 64, queue_size: int = 64,
+                      report_every: float = 5.0) -> Dict[str, Dict[str, Any]]:
+        """
+        Runs scraping and indexing as one streaming pipeline instead of two passes:
+
+            fetch -> parse -> OCR -> chunk -> embed (batched) -> index write
+
+        Each stage runs in its own threads (parsing and OCR hand work to process pools)
+        and is connected to the next by a queue of `queue_size` items, so a slow stage
+        holds back the ones before it instead of buffering without limit, and the
+        embedding model keeps working while pages are still downloading.
+        Articles already parsed but not yet embedded enter the pipeline at the OCR stage.
+        Returns per-stage stats: items in/out, throughput, utilization and queue depth.
+        Raises PipelineError if any article was dropped after a failure; everything else
+        is indexed, and the next run retries the dropped articles.
+        """
+        self._index_missing_rows()
+        embedded_urls = set(self.faiss_store.get_all_urls())
+        unembedded = [url for url in self.store.urls() if url not in embedded_urls]
+        unparsed = self._unparsed_urls(limit)
+        self.logger.info(f"Streaming {len(unparsed)} new pages and {len(unembedded)} parsed articles")
+
+        store_lock = threading.Lock()
+        ocr = self.document_processor.ocr
 
-            chunks = self.document_processor.chunk(article)
-            for chunk in chunks:
-                st.json(chunk)
-                embedding = self.embedder.embed_chunk(chunk)
-                self.faiss_store.add(embedding, metadata=chunk)
+        with BlockingFetcher(AsyncFetcher(concurrency=concurrency, per_host_rate=per_host_rate)) as fetcher, \
+                ProcessPoolExecutor(max_workers=parse_workers) as parse_pool, ocr:
 
-            self.faiss_store.save()
-            self.logger.info(f"Added {len(chunks)} chunks from {article['url']}")
+            def fetch(url: str):
+                html = fetcher.fetch(url)
+                return [(url, html)] if html is not None else []
+
+            def parse(page):
+                article = parse_pool.submit(parse_article_html, *page).result()
+                if not article:
+                    return []
+                with store_lock:
+                    self.store.add_article(article)
+                    self.store.save()
+                return [article]
+
+            def run_ocr(article: Dict):
+                texts = ocr.extract_and_clean_many(
+                    block["url"] for block in article["blocks"] if block["type"] == "image"
+                )
+                return [(article, texts)]
+
+            def chunk(item):
+                article, ocr_texts = item
+                chunks = self.document_processor.chunk(article, ocr_texts=ocr_texts)
+                return [chunks] if chunks else []
+
+            def embed(articles: List[List[Dict]]):
+                chunks = [chunk for article_chunks in articles for chunk in article_chunks]
+                return [(chunks, self.embedder.embed_chunks(chunks, batch_size=batch_size))]
+
+            def write(item):
+                chunks, embeddings = item
+                self._index_new_rows(self.faiss_store.add_batch(embeddings, chunks))
+                self.faiss_store.save()
+                self.entity_index.save()
+                self.bm25_index.save()
+                return []
+
+            pipeline = StagedPipeline([
+                Stage("fetch", fetch, workers=concurrency, queue_size=queue_size),
+                Stage("parse", parse, workers=parse_workers, queue_size=queue_size),
+                Stage("ocr", run_ocr, workers=ocr_workers, queue_size=queue_size),
+                Stage("chunk", chunk, workers=chunk_workers, queue_size=queue_size),
+                Stage("embed", embed, queue_size=queue_size, batch_size=articles_per_batch),
+                Stage("index", write, queue_size=2),
+            ])
+
+            def feed_urls(p: StagedPipeline):
+                for url in unparsed:
+                    p.put("fetch", url)
+
+            def feed_parsed(p: StagedPipeline):
+                for url in unembedded:
+                    # The parse stage appends through the same file handle
+                    with store_lock:
+                        article = self.store.get(url)
+                    p.put("ocr", article)
+
+            def report(p: StagedPipeline):
+                st.text(p.format_stats())
+                self.logger.info(p.format_stats())
+
+            stats = pipeline.run([feed_urls, feed_parsed], on_progress=report, report_every=report_every)
+
+        if self.faiss_store.manifest.segments and not self.faiss_store.awaiting_training:
+            self.faiss_store.compact()
+        return stats
+
+    def _index_new_rows(self, row_ids: List[int]):
+        """
+        Adds chunks just added to the FAISS store to the entity and BM25 indexes. add_batch
+        skips duplicate chunks and returns ids only for the rows it kept, so the text is read
+        back from the store rather than zipped against the input chunks.
+        """
+        texts = [row["text"] for row in self.faiss_store.get_rows(row_ids)]
+        self.entity_index.add_many(row_ids, self.entity_extractor.extract_many(texts))
+        self.bm25_index.add_many(row_ids, texts)
+
+    def _index_missing_rows(self, batch_size: int = 1024):
+        """
+        Adds stored chunks the entity and BM25 indexes have not seen yet, e.g. after an
+        upgrade or an interrupted run. Chunk text is read from the store in batches.
+        """
+        for name, index, add in (
+            ("entity", self.entity_index,
+             lambda ids, texts: self.entity_index.add_many(ids, self.entity_extractor.extract_many(texts))),
+            ("BM25", self.bm25_index, self.bm25_index.add_many),
+        ):
+            missing = range(index.covered_rows, self.faiss_store.ntotal)
+            if not missing:
+                continue
+            self.logger.info(f"Adding {len(missing)} indexed chunks to the {name} index...")
+            for start in range(missing.start, missing.stop, batch_size):
+                row_ids = list(range(start, min(start + batch_size, missing.stop)))
+                add(row_ids, [row["text"] for row in self.faiss_store.get_rows(row_ids)])
+            index.save()
 
 
 if __name__ == "__main__":
-    pipeline = BatchDataPipeline()
+    # RAG_EMBED_WORKERS > 0 spreads text encoding over that many processes on many-core CPU boxes
+    pipeline = BatchDataPipeline(embed_workers=int(os.getenv("RAG_EMBED_WORKERS", "0")))
 
-    # Run both stages
-    pipeline.parse_and_store_articles()
-    pipeline.embed_and_index_articles()
\ No newline at end of file
+    # Crawl, parse, chunk, embed and index in one streaming run
+    pipeline.run_streaming()
+    pipeline.embedder.close()
+    pipeline.store.close()
+    metrics.write_json("logs/ingest_metrics.json")
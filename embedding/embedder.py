@@ -1,53 +1,211 @@
 import numpy as np
-from typing import Optional, List, Dict
-from sentence_transformers import SentenceTransformer
-from PIL import Image
+from typing import TYPE_CHECKING, Callable, Optional, List, Dict
 from io import BytesIO
-import requests
+from embedding.embedding_cache import EmbeddingCache
+from embedding.encode_pool import EncodePool
+from utils.image_cache import ImageCache
+from utils.metrics import metrics
+
+if TYPE_CHECKING:
+    from PIL import Image
 
 
 class ChunkEmbedder:
     """
-    Embeds a single chunk with optional image.
+    Embeds chunks with optional images, one at a time or in batches.
     """
     def __init__(self,
                  text_model_name: str = 'sentence-transformers/multi-qa-MiniLM-L6-cos-v1',
                  image_model_name: str = 'sentence-transformers/clip-ViT-B-32',
-                 use_image: bool = False):
+                 use_image: bool = False,
+                 batch_size: int = 64,
+                 image_cache: Optional[ImageCache] = None,
+                 cache_dir: Optional[str] = None,
+                 cache_dtype: str = "float16",
+                 encode_workers: int = 0,
+                 threads_per_worker: Optional[int] = None):
+        """
+        :param batch_size: Default number of inputs per model call in the batched path
+        :param image_cache: Shared image cache, so images already downloaded for OCR are reused
+        :param cache_dir: Enables a persistent embedding cache in this directory, so only
+                          texts and images not seen before are sent to the models
+        :param cache_dtype: On-disk precision of cached vectors ("float16" or "float32")
+        :param encode_workers: Encode texts in this many worker processes (see EncodePool);
+                               0 encodes in this process. Call close() to stop them. If the
+                               workers fail, encoding falls back to this process.
+        :param threads_per_worker: Torch threads per encode worker (defaults to usable CPUs // workers)
+        """
+        # Imported here: sentence_transformers pulls in torch, which dominates startup time
+        from sentence_transformers import SentenceTransformer
+
         self.text_model = SentenceTransformer(text_model_name)
         self.use_image = use_image
+        self.batch_size = batch_size
+        self.image_cache = image_cache or (ImageCache() if use_image else None)
+        self.text_cache: Optional[EmbeddingCache] = None
+        self.image_embedding_cache: Optional[EmbeddingCache] = None
+        self.encode_pool: Optional[EncodePool] = None
+
+        if encode_workers:
+            self.encode_pool = EncodePool(
+                text_model_name, self.text_model.get_sentence_embedding_dimension(), workers=encode_workers,
+                threads_per_worker=threads_per_worker, batch_size=batch_size,
+            )
+
+        if cache_dir:
+            self.text_cache = EmbeddingCache(
+                cache_dir, text_model_name, self.text_model.get_sentence_embedding_dimension(), cache_dtype
+            )
 
         if use_image:
             self.image_model = SentenceTransformer(image_model_name)
+            if cache_dir:
+                self.image_embedding_cache = EmbeddingCache(
+                    cache_dir, image_model_name, self.image_model.get_sentence_embedding_dimension(), cache_dtype
+                )
 
     def embed_text(self, text: str) -> np.ndarray:
-        return self.text_model.encode(text, normalize_embeddings=True)
+        return self.embed_texts([text])[0]
+
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Encodes many texts with batched model calls. Returns a (len(texts), dim) float32 matrix.
+        """
+        def encode(missing: List[str]) -> List[np.ndarray]:
+            metrics.inc("embedder.texts_encoded", len(missing))
+            with metrics.timer("embedder.encode_text"):
+                if self.encode_pool is not None:
+                    try:
+                        return list(self.encode_pool.encode(missing))
+                    except (RuntimeError, TimeoutError) as e:
+                        # Keep ingesting on the in-process model rather than dropping batches
+                        print(f"[Encode Error] Encode workers failed, encoding in this process from now on: {e}")
+                        self.close()
+                return list(self.text_model.encode(
+                    missing,
+                    batch_size=batch_size or self.batch_size,
+                    normalize_embeddings=True,
+                    convert_to_numpy=True,
+                ).astype(np.float32, copy=False))
+
+        if not texts:
+            return np.empty((0, self.text_model.get_sentence_embedding_dimension()), dtype=np.float32)
+        cache = self.text_cache
+        keys = [cache.key("text", cache.normalize_text(t)) for t in texts] if cache else None
+        return np.stack(self._cached(cache, keys, texts, encode))
+
+    def close(self):
+        """Stops the encode worker processes, if any."""
+        if self.encode_pool is not None:
+            self.encode_pool.close()
+            self.encode_pool = None
 
     def embed_image(self, url: str) -> Optional[np.ndarray]:
-        try:
-            response = requests.get(url, timeout=5)
-            img = Image.open(BytesIO(response.content)).convert("RGB")
-            return self.image_model.encode(img, normalize_embeddings=True)
-        except Exception as e:
-            print(f"[Image Error] Failed to load image from {url}: {e}")
-            return None
+        return self.embed_images([url])[0]
+
+    def embed_images(self, urls: List[str], batch_size: Optional[int] = None) -> List[Optional[np.ndarray]]:
+        """
+        Downloads and encodes images in batches. Entries for images that failed to load are None.
+        """
+        def encode(missing: List[str]) -> List[Optional[np.ndarray]]:
+            images = [self._load_image(url) for url in missing]
+            loaded = [i for i, img in enumerate(images) if img is not None]
+
+            vectors: List[Optional[np.ndarray]] = [None] * len(missing)
+            if not loaded:
+                return vectors
+
+            metrics.inc("embedder.images_encoded", len(loaded))
+            with metrics.timer("embedder.encode_image"):
+                encoded = self.image_model.encode(
+                    [images[i] for i in loaded],
+                    batch_size=batch_size or self.batch_size,
+                    normalize_embeddings=True,
+                    convert_to_numpy=True,
+                )
+            for row, i in enumerate(loaded):
+                vectors[i] = encoded[row]
+            return vectors
+
+        cache = self.image_embedding_cache
+        keys = [cache.key("image", url) for url in urls] if cache else None
+        return self._cached(cache, keys, urls, encode)
+
+    @staticmethod
+    def _cached(cache: Optional[EmbeddingCache], keys: Optional[List[bytes]], inputs: List,
+                encode: Callable[[List], List[Optional[np.ndarray]]]) -> List[Optional[np.ndarray]]:
+        """
+        Serves inputs from the embedding cache and encodes only the misses, storing them.
+        Inputs that fail to encode (None) are not cached.
+        """
+        if cache is None:
+            return encode(inputs)
+
+        vectors = cache.get_many(keys)
+        missing = [i for i, vec in enumerate(vectors) if vec is None]
+        metrics.inc("embedding_cache.hits", len(vectors) - len(missing))
+        metrics.inc("embedding_cache.misses", len(missing))
+        if not missing:
+            return vectors
+
+        encoded = encode([inputs[i] for i in missing])
+        done = [(i, vec) for i, vec in zip(missing, encoded) if vec is not None]
+        if done:
+            rounded = cache.round_trip(np.stack([vec for _, vec in done]))
+            cache.put_many([keys[i] for i, _ in done], rounded)
+            for (i, _), vec in zip(done, rounded):
+                vectors[i] = vec
+        return vectors
 
     def embed_chunk(self, chunk: Dict) -> np.ndarray:
         text_vec = self.embed_text(chunk["text"])
 
-        if self.use_image and chunk.get("type") == "text+image" and chunk.get("image_url"):
+        if self._has_image(chunk):
             image_vec = self.embed_image(chunk["image_url"])
             if image_vec is not None:
                 return self.fuse_embeddings(text_vec, [image_vec])
 
         return text_vec
 
+    def embed_chunks(self, chunks: List[Dict], batch_size: Optional[int] = None) -> np.ndarray:
+        """
+        Batched equivalent of embed_chunk: encodes all chunk texts in batches of `batch_size`,
+        then fuses image vectors into the rows of chunks that have an image.
+        Returns a (len(chunks), dim) float32 matrix in chunk order.
+        """
+        vectors = self.embed_texts([chunk["text"] for chunk in chunks], batch_size=batch_size)
+
+        image_rows = [i for i, chunk in enumerate(chunks) if self._has_image(chunk)]
+        if image_rows:
+            image_vecs = self.embed_images([chunks[i]["image_url"] for i in image_rows], batch_size=batch_size)
+            fused_rows = [i for i, vec in zip(image_rows, image_vecs) if vec is not None]
+            if fused_rows:
+                image_matrix = np.stack([vec for vec in image_vecs if vec is not None])
+                vectors[fused_rows] = 0.7 * vectors[fused_rows] + 0.3 * image_matrix
+
+        return vectors
+
     def fuse_embeddings(self, text_vec: np.ndarray, image_vecs: List[np.ndarray]) -> np.ndarray:
         if not image_vecs:
             return text_vec
         image_avg = np.mean(image_vecs, axis=0)
         return 0.7 * text_vec + 0.3 * image_avg
-    
+
+    def _has_image(self, chunk: Dict) -> bool:
+        return self.use_image and chunk.get("type") == "text+image" and bool(chunk.get("image_url"))
+
+    def _load_image(self, url: str) -> Optional["Image.Image"]:
+        from PIL import Image
+
+        content = self.image_cache.get_bytes(url)
+        if content is None:
+            return None
+        try:
+            return Image.open(BytesIO(content)).convert("RGB")
+        except Exception as e:
+            print(f"[Image Error] Failed to load image from {url}: {e}")
+            return None
+
 
 # embedder = ChunkEmbedder()
 # embedding = embedder.embed_chunk({
@@ -62,4 +220,4 @@ class ChunkEmbedder:
 #     "Data Points"
 #     ]
 # })
-# print(embedding)
\ No newline at end of file
+# print(embedding)
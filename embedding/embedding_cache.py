@@ -0,0 +1,114 @@
+import hashlib
+import os
+import re
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+class EmbeddingCache:
+    """
+    Persistent cache of embeddings for one model.
+
+    Vectors are appended to a flat `vectors.bin` file (float16 by default) and read back
+    through a memory map; `keys.bin` holds one 16-byte key per row in the same order.
+    Keys hash the model name together with the input, so one directory per model is
+    enough and changing the model never returns stale vectors.
+    """
+
+    KEY_BYTES = 16
+
+    def __init__(self, cache_dir: str, model_name: str, dim: int, dtype: str = "float16"):
+        """
+        :param cache_dir: Root cache directory; a subdirectory per model is created inside it
+        :param dim: Embedding dimensionality of the model
+        :param dtype: On-disk dtype, "float16" (half the size) or "float32" (exact)
+        """
+        self.model_name = model_name
+        self.dim = dim
+        self.dtype = np.dtype(dtype)
+        self.directory = os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+        self.vectors_path = os.path.join(self.directory, f"vectors-{dim}-{self.dtype.name}.bin")
+        self.keys_path = os.path.join(self.directory, f"keys-{dim}-{self.dtype.name}.bin")
+        self.rows: Dict[bytes, int] = {}
+        self._vectors: Optional[np.memmap] = None
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(self.directory, exist_ok=True)
+        self._load()
+
+    def key(self, kind: str, content: str) -> bytes:
+        """
+        Cache key for an input: `kind` is "text" or "image", `content` the normalized
+        text or the image URL.
+        """
+        content_hash = hashlib.sha256(content.encode("utf-8")).digest()
+        return hashlib.blake2b(
+            self.model_name.encode("utf-8") + b"\0" + kind.encode("ascii") + b"\0" + content_hash,
+            digest_size=self.KEY_BYTES,
+        ).digest()
+
+    @staticmethod
+    def normalize_text(text: str) -> str:
+        return " ".join(text.split())
+
+    def _row_bytes(self) -> int:
+        return self.dim * self.dtype.itemsize
+
+    def _load(self):
+        keys_size = os.path.getsize(self.keys_path) if os.path.exists(self.keys_path) else 0
+        vectors_size = os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0
+        count = min(keys_size // self.KEY_BYTES, vectors_size // self._row_bytes())
+
+        # An interrupted append can leave a partial row in either file; cut both back to
+        # the rows that were completely written.
+        for path, size in ((self.keys_path, count * self.KEY_BYTES), (self.vectors_path, count * self._row_bytes())):
+            if os.path.exists(path) and os.path.getsize(path) != size:
+                os.truncate(path, size)
+
+        if count:
+            with open(self.keys_path, "rb") as f:
+                keys = f.read()
+            self.rows = {keys[i * self.KEY_BYTES:(i + 1) * self.KEY_BYTES]: i for i in range(count)}
+        self._vectors = None
+
+    def _matrix(self) -> np.memmap:
+        if self._vectors is None or len(self._vectors) < len(self.rows):
+            self._vectors = np.memmap(self.vectors_path, dtype=self.dtype, mode="r", shape=(len(self.rows), self.dim))
+        return self._vectors
+
+    def get_many(self, keys: Sequence[bytes]) -> List[Optional[np.ndarray]]:
+        """Returns a float32 vector per key, or None for keys not in the cache."""
+        found = [self.rows.get(k) for k in keys]
+        hit_rows = [row for row in found if row is not None]
+        self.hits += len(hit_rows)
+        self.misses += len(found) - len(hit_rows)
+        if not hit_rows:
+            return [None] * len(keys)
+
+        vectors = iter(np.asarray(self._matrix()[hit_rows], dtype=np.float32))
+        return [next(vectors) if row is not None else None for row in found]
+
+    def put_many(self, keys: Sequence[bytes], vectors: np.ndarray):
+        """Appends new vectors; keys already present are skipped."""
+        new = {}
+        for key, vector in zip(keys, vectors):
+            if key not in self.rows and key not in new:
+                new[key] = vector
+        if not new:
+            return
+
+        with open(self.vectors_path, "ab") as f:
+            f.write(np.asarray(list(new.values()), dtype=self.dtype).tobytes())
+        with open(self.keys_path, "ab") as f:
+            f.write(b"".join(new))
+        for key in new:
+            self.rows[key] = len(self.rows)
+
+    def round_trip(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Rounds freshly computed vectors to the on-disk precision, so results do not depend
+        on whether they came from the model or from the cache.
+        """
+        return np.asarray(vectors, dtype=self.dtype).astype(np.float32)
@@ -0,0 +1,211 @@
+import multiprocessing as mp
+import os
+import queue
+import threading
+from multiprocessing import shared_memory
+from typing import List, Optional
+
+import numpy as np
+
+
+def _encode_worker(model_name: str, threads: int, cpus: Optional[List[int]],
+                   tasks: "mp.Queue", done: "mp.Queue"):
+    """
+    Worker process: loads its own copy of the model with a fixed thread count, then encodes
+    task shards and writes the vectors straight into the shared output buffer.
+    """
+    # Thread pools are sized when torch and the BLAS libraries load, so this comes first
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ["TOKENIZERS_PARALLELISM"] = "false"
+    if cpus and hasattr(os, "sched_setaffinity"):
+        try:
+            os.sched_setaffinity(0, cpus)
+        except OSError:
+            pass  # pinning is an optimization; run unpinned if the cpuset refuses it
+
+    try:
+        import torch
+        from sentence_transformers import SentenceTransformer
+
+        torch.set_num_threads(threads)
+        model = SentenceTransformer(model_name, device="cpu")
+    except Exception as e:
+        done.put(("failed", None, f"could not load {model_name}: {e!r}"))
+        return
+    done.put(("ready", None, None))
+
+    buffer: Optional[shared_memory.SharedMemory] = None
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job, buffer_name, capacity, start, texts, batch_size = task
+        try:
+            if buffer is None or buffer.name != buffer_name:
+                if buffer is not None:
+                    buffer.close()
+                buffer = shared_memory.SharedMemory(name=buffer_name)
+            dim = model.get_sentence_embedding_dimension()
+            out = np.ndarray((capacity, dim), dtype=np.float32, buffer=buffer.buf)
+            out[start:start + len(texts)] = model.encode(
+                texts, batch_size=batch_size, normalize_embeddings=True, convert_to_numpy=True
+            )
+            del out  # release the view before the buffer can be closed
+            done.put(("done", job, len(texts)))
+        except Exception as e:
+            done.put(("error", job, repr(e)))
+    if buffer is not None:
+        buffer.close()
+
+
+class EncodePool:
+    """
+    Encodes texts with a SentenceTransformer in several worker processes, so tokenization,
+    pooling and normalization are not serialized by the GIL of a single process.
+
+    Each call is split into shards of `shard_size` texts that workers pick up as they become
+    free. Vectors are written by the workers into one shared-memory buffer at their row
+    offsets, so results come back in input order without being pickled through a queue.
+    Every worker runs `threads_per_worker` intra-op threads and, where the OS supports it,
+    is pinned to that many cores of its own.
+
+    A worker that dies or stops answering closes the pool: that call and every later one
+    raise RuntimeError instead of waiting for workers that are gone.
+    """
+
+    def __init__(self, model_name: str, dim: int, workers: int = 2, threads_per_worker: Optional[int] = None,
+                 shard_size: int = 256, batch_size: int = 64, pin_cpus: bool = True,
+                 start_timeout: float = 300.0):
+        """
+        :param dim: Output dimension of the model
+        :param threads_per_worker: Torch/BLAS threads per worker (defaults to the CPUs this
+                                   process may run on // workers)
+        :param shard_size: Texts per task handed to a worker
+        :param batch_size: Texts per model forward pass inside a worker
+        :param pin_cpus: Pin each worker to its own `threads_per_worker` of those CPUs
+        :param start_timeout: Seconds to wait for the workers to load the model
+        """
+        # The CPUs this process may use, which under a container cpuset or taskset can be
+        # fewer than os.cpu_count() and need not start at 0
+        if hasattr(os, "sched_getaffinity"):
+            cpus = sorted(os.sched_getaffinity(0))
+        else:
+            cpus = list(range(os.cpu_count() or 1))
+        self.dim = dim
+        self.workers = workers
+        self.threads_per_worker = threads_per_worker or max(1, len(cpus) // workers)
+        self.shard_size = shard_size
+        self.batch_size = batch_size
+        self._buffer: Optional[shared_memory.SharedMemory] = None
+        self._capacity = 0
+        self._jobs = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # spawn: forking a process that has already loaded torch is not safe
+        context = mp.get_context("spawn")
+        self._tasks = context.Queue()
+        self._done = context.Queue()
+        self._processes = []
+        for i in range(workers):
+            first, last = i * self.threads_per_worker, (i + 1) * self.threads_per_worker
+            pinned = cpus[first:last] if pin_cpus and last <= len(cpus) else None
+            process = context.Process(
+                target=_encode_worker, args=(model_name, self.threads_per_worker, pinned, self._tasks, self._done),
+                name=f"encode-{i}", daemon=True,
+            )
+            process.start()
+            self._processes.append(process)
+
+        for _ in range(workers):
+            status, _, message = self._next_message(timeout=start_timeout)
+            if status != "ready":
+                self.close()
+                raise RuntimeError(f"Encode worker failed to start: {message}")
+
+    def _next_message(self, timeout: float):
+        """Next worker message; raises if a worker died instead of answering."""
+        waited = 0.0
+        while True:
+            try:
+                return self._done.get(timeout=1.0)
+            except queue.Empty:
+                waited += 1.0
+                dead = [p.name for p in self._processes if not p.is_alive()]
+                if dead:
+                    raise RuntimeError(f"Encode workers exited unexpectedly: {', '.join(dead)}")
+                if waited >= timeout:
+                    raise TimeoutError(f"No answer from encode workers after {timeout:.0f}s")
+
+    def _ensure_capacity(self, rows: int):
+        if rows <= self._capacity:
+            return
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer.unlink()
+        self._capacity = max(rows, 2 * self._capacity)
+        self._buffer = shared_memory.SharedMemory(create=True, size=self._capacity * self.dim * 4)
+
+    def encode(self, texts: List[str], timeout: float = 600.0) -> np.ndarray:
+        """Returns a (len(texts), dim) float32 matrix of normalized embeddings, in input order."""
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("EncodePool is closed")
+            dead = [p.name for p in self._processes if not p.is_alive()]
+            if dead:
+                self.close()
+                raise RuntimeError(f"Encode workers exited unexpectedly: {', '.join(dead)}")
+            if not texts:
+                return np.empty((0, self.dim), dtype=np.float32)
+            return self._encode(texts, timeout)
+
+    def _encode(self, texts: List[str], timeout: float) -> np.ndarray:
+        self._ensure_capacity(len(texts))
+        self._jobs += 1
+        job = self._jobs
+        shards = range(0, len(texts), self.shard_size)
+        for start in shards:
+            self._tasks.put((job, self._buffer.name, self._capacity, start,
+                             texts[start:start + self.shard_size], self.batch_size))
+
+        errors = []
+        remaining = len(shards)
+        try:
+            while remaining:
+                status, message_job, message = self._next_message(timeout)
+                if message_job != job:
+                    continue
+                remaining -= 1
+                if status == "error":
+                    errors.append(message)
+        except (RuntimeError, TimeoutError):
+            # Shards still in flight would write into the buffer of the next call
+            self.close()
+            raise
+        if errors:
+            raise RuntimeError(f"Encoding failed in {len(errors)} shard(s): {errors[0]}")
+
+        out = np.ndarray((self._capacity, self.dim), dtype=np.float32, buffer=self._buffer.buf)
+        return out[:len(texts)].copy()
+
+    def close(self):
+        self._closed = True
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=10)
+            if process.is_alive():
+                process.terminate()
+        self._processes = []
+        if self._buffer is not None:
+            self._buffer.close()
+            self._buffer.unlink()
+            self._buffer = None
+            self._capacity = 0
+
+    def __enter__(self) -> "EncodePool":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -1,18 +1,16 @@
-from query_engine import QueryEngine
-from answer_generator import AnswerGenerator
-from storage.faiss_chunk_store import FaissChunkStore
-from embedding.embedder import ChunkEmbedder
+from resources import get_generator, get_orchestrator, start_metrics_server
+from utils.metrics import metrics
 import streamlit as st
 
-store = FaissChunkStore(dim=384)
-embedder = ChunkEmbedder()
-engine = QueryEngine(store, embedder)
-generator = AnswerGenerator()
-
 st.set_page_config(
     page_title="RAG system",  
 )
 
+# Models and indexes are loaded once per process and shared by all sessions and reruns
+generator = get_generator()
+orchestrator = get_orchestrator()
+start_metrics_server()
+
 st.markdown("""
     <style>
     .stButton>button {
@@ -31,10 +29,12 @@ def query_input_fragment():
     col1, col2 = st.columns([5, 2])
     query = col1.text_input("Enter your query")
     if col2.button("Run", key='run_pressed'):
-        rewritten_query = generator.rewrite_query(query)
-        st.session_state["rewritten_query"] = rewritten_query
-        result = engine.query(rewritten_query)
-        st.session_state["retrieval_result"] = result
+        # Retrieval on the original query overlaps the rewrite round-trip
+        run = orchestrator.run(query)
+        st.session_state["rewritten_query"] = run["rewritten_query"]
+        st.session_state["retrieval_result"] = run["result"]
+        st.session_state["timings"] = run["timings"]
+        st.session_state["breakdown"] = run["breakdown"]
         st.session_state["query_text"] = query
         st.rerun()
 
@@ -50,6 +50,8 @@ def results_fragment():
 
     st.markdown(f"**Original query:** {original_query}")
     st.markdown(f"**Rewritten query (optimized for more effective retrieval):** _{rewritten_query}_")
+    timings = st.session_state.get("timings", {})
+    st.caption(" · ".join(f"{stage}: {seconds * 1000:.0f} ms" for stage, seconds in timings.items()))
 
     top_k_results = result["results"][:5]
 
@@ -67,25 +69,49 @@ def results_fragment():
     prompt = generator.build_prompt(rewritten_query, top_k_results)
 
     st.text(' ')
-    with st.expander('Full prompt', expanded=False):
+    with st.expander(f'Full prompt ({generator.count_input_tokens(prompt)} input tokens)', expanded=False):
         st.code(prompt)
 
     st.text(' ')
     #generator.show_cost_estimate(prompt, generator.max_tokens)
 
     if st.button("Generate Answer", key="generate_button"):
-        with st.spinner("Generating answer..."):
-            answer = generator.generate(original_query, top_k_results)
-            st.success("✅ Answer")
-            with st.container(border=True):
-                st.text(answer)
+        st.success("✅ Answer")
+        with st.container(border=True):
+            # Tokens are rendered as they arrive, so the wait is only the time to the first token
+            st.write_stream(generator.generate_stream(original_query, top_k_results))
             
 
+# Per-stage timings of the last query and process-wide latency percentiles
+def debug_panel():
+    st.sidebar.subheader("Debug")
+    if "breakdown" in st.session_state:
+        timings = st.session_state.get("timings", {})
+        st.sidebar.markdown("**Last query**")
+        for stage, timers in st.session_state["breakdown"].items():
+            st.sidebar.markdown(f"`{stage}` — {timings.get(stage, 0) * 1000:.0f} ms")
+            st.sidebar.table({name: f"{seconds * 1000:.1f} ms" for name, seconds in timers.items()})
+        if generator.last_time_to_first_token is not None:
+            st.sidebar.caption(f"Time to first token: {generator.last_time_to_first_token * 1000:.0f} ms")
+
+    snapshot = metrics.snapshot()
+    st.sidebar.markdown("**Latency (this process)**")
+    st.sidebar.table({
+        name: {"count": h["count"], "p50 ms": f"{h['p50'] * 1000:.1f}",
+               "p95 ms": f"{h['p95'] * 1000:.1f}", "p99 ms": f"{h['p99'] * 1000:.1f}"}
+        for name, h in sorted(snapshot["histograms"].items())
+    })
+    st.sidebar.markdown("**Counters**")
+    st.sidebar.table({name: {"value": value} for name, value in sorted(snapshot["counters"].items())})
+
+
 # 🚀 Main wrapper
 def main():
     st.title("🔍 Multimodal RAG Assistant")
     query_input_fragment()
     results_fragment()
+    if st.sidebar.checkbox("Show debug panel", value=False):
+        debug_panel()
 
 
 if __name__ == '__main__':
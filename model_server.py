@@ -0,0 +1,208 @@
+"""
+Local model-serving sidecar.
+
+Holds one ChunkEmbedder and one FaissChunkStore and serves embeddings and searches over a
+local socket, so several Streamlit processes share a single copy of the model weights and
+of the index instead of loading their own.
+
+Requests are pickled, so anyone able to connect could run code in the server. Clients
+must therefore authenticate with a shared secret from RAG_MODEL_SERVER_KEY, and neither
+side starts without one. Start it, then point the UI at it:
+    export RAG_MODEL_SERVER_KEY=$(python -c "import secrets; print(secrets.token_hex(32))")
+    python model_server.py --address 127.0.0.1:6060
+    RAG_MODEL_SERVER=127.0.0.1:6060 streamlit run main.py
+"""
+import argparse
+import os
+import threading
+import time
+from multiprocessing.connection import Client, Connection, Listener
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+from utils.logger import setup_logger
+
+
+def parse_address(address: str) -> Union[str, Tuple[str, int]]:
+    """"host:port" for TCP, anything else is a Unix socket path."""
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit():
+        return host, int(port)
+    return address
+
+
+def authkey_from_env() -> bytes:
+    """The shared secret in RAG_MODEL_SERVER_KEY; there is deliberately no default."""
+    key = os.getenv("RAG_MODEL_SERVER_KEY", "")
+    if not key:
+        raise RuntimeError("RAG_MODEL_SERVER_KEY must be set to a secret shared by the model server and its clients")
+    return key.encode()
+
+
+class ModelServer:
+    """
+    Serves the methods in METHODS to any number of clients, one thread per connection.
+    Requests are (method, args) tuples; replies are ("ok", result, state) or
+    ("error", message, state), where state is the store's current version and size.
+    """
+
+    METHODS = ("info", "embed_texts", "search_ids", "search_batch", "get_rows")
+
+    def __init__(self, store, embedder, address: str, authkey: bytes):
+        self.logger = setup_logger(self.__class__.__name__)
+        self.store = store
+        self.embedder = embedder
+        self.address = parse_address(address)
+        if not authkey:
+            raise ValueError("ModelServer requires an authkey")
+        self.authkey = authkey
+
+    def state(self) -> Dict[str, int]:
+        return {"version": self.store.version, "ntotal": self.store.ntotal}
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            **self.state(),
+            "metric": self.store.metric,
+            "higher_is_better": self.store.higher_is_better,
+        }
+
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        return self.embedder.embed_texts(texts, batch_size=batch_size)
+
+    def search_ids(self, query_vectors: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        return self.store.search_ids(query_vectors, k)
+
+    def search_batch(self, query_vectors: np.ndarray, k: int):
+        return self.store.search_batch(query_vectors, k)
+
+    def get_rows(self, ids: List[int]) -> List[Dict]:
+        return self.store.get_rows(ids)
+
+    def serve_forever(self):
+        with Listener(self.address, authkey=self.authkey) as listener:
+            self.logger.info(f"Serving {self.store.ntotal} chunks at {listener.address}")
+            while True:
+                try:
+                    conn = listener.accept()
+                except Exception as e:
+                    self.logger.warning(f"Rejected connection: {e}")
+                    continue
+                threading.Thread(target=self._handle, args=(conn,), daemon=True).start()
+
+    def _handle(self, conn: Connection):
+        with conn:
+            while True:
+                try:
+                    method, args = conn.recv()
+                except (EOFError, OSError):
+                    return
+                if method not in self.METHODS:
+                    conn.send(("error", f"Unknown method '{method}'", self.state()))
+                    continue
+                try:
+                    result = getattr(self, method)(*args)
+                except Exception as e:
+                    self.logger.warning(f"{method} failed: {e}")
+                    conn.send(("error", f"{type(e).__name__}: {e}", self.state()))
+                    continue
+                conn.send(("ok", result, self.state()))
+
+
+class ModelClient:
+    """
+    Thread-safe client for ModelServer; one connection shared by all callers.
+    `state` holds the store version and size from the latest reply, received at `state_time`.
+    """
+
+    def __init__(self, address: str, authkey: bytes):
+        if not authkey:
+            raise ValueError("ModelClient requires an authkey")
+        self.conn = Client(parse_address(address), authkey=authkey)
+        self._lock = threading.Lock()
+        self.state: Dict[str, int] = {}
+        self.state_time = float("-inf")
+
+    def call(self, method: str, *args):
+        with self._lock:
+            self.conn.send((method, args))
+            status, result, self.state = self.conn.recv()
+            self.state_time = time.monotonic()
+        if status != "ok":
+            raise RuntimeError(f"Model server error in {method}: {result}")
+        return result
+
+
+class RemoteEmbedder:
+    """Drop-in for ChunkEmbedder's query-side methods, served by a ModelServer."""
+
+    def __init__(self, client: ModelClient):
+        self.client = client
+
+    def embed_texts(self, texts: List[str], batch_size: Optional[int] = None) -> np.ndarray:
+        return self.client.call("embed_texts", list(texts), batch_size)
+
+    def embed_text(self, text: str) -> np.ndarray:
+        return self.embed_texts([text])[0]
+
+
+class RemoteChunkStore:
+    """
+    Drop-in for FaissChunkStore's read-side API, served by a ModelServer.
+
+    The metric is fixed for the life of a store and is fetched once. `version` and `ntotal`
+    come with every reply, so they only cost a round trip of their own when no call has
+    been made for `state_ttl` seconds.
+    """
+
+    def __init__(self, client: ModelClient, state_ttl: float = 1.0):
+        self.client = client
+        self.state_ttl = state_ttl
+        info = client.call("info")
+        self.metric: str = info["metric"]
+        self.higher_is_better: bool = info["higher_is_better"]
+
+    def _state(self, key: str) -> int:
+        if time.monotonic() - self.client.state_time > self.state_ttl:
+            self.client.call("info")
+        return self.client.state[key]
+
+    @property
+    def version(self) -> int:
+        return self._state("version")
+
+    @property
+    def ntotal(self) -> int:
+        return self._state("ntotal")
+
+    def search_ids(self, query_vectors: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        return self.client.call("search_ids", np.asarray(query_vectors, dtype=np.float32), k)
+
+    def search_batch(self, query_vectors: np.ndarray, k: int = 5) -> List[List[Tuple[Dict, float]]]:
+        return self.client.call("search_batch", np.asarray(query_vectors, dtype=np.float32), k)
+
+    def search(self, query_vector: np.ndarray, k: int = 5) -> List[Tuple[Dict, float]]:
+        return self.search_batch(np.asarray(query_vector)[None, :], k)[0]
+
+    def get_rows(self, ids: List[int]) -> List[Dict]:
+        return self.client.call("get_rows", list(ids))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--address", default="127.0.0.1:6060", help="host:port or a Unix socket path")
+    parser.add_argument("--dim", type=int, default=384)
+    args = parser.parse_args()
+    try:
+        authkey = authkey_from_env()
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    from embedding.embedder import ChunkEmbedder
+    from storage.faiss_chunk_store import FaissChunkStore
+    ModelServer(FaissChunkStore(dim=args.dim), ChunkEmbedder(), args.address, authkey).serve_forever()
+
+
+if __name__ == "__main__":
+    main()
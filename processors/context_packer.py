@@ -0,0 +1,94 @@
+from typing import Dict, List, Optional, Tuple
+from processors.token_counter import TokenCounter
+
+
+class ContextPacker:
+    """
+    Selects and formats retrieved chunks for the answer prompt within an input-token budget.
+
+    Chunks are taken in ranking order (best first) while they fit the budget; chunks that
+    repeat or are contained in an already selected chunk of the same article are dropped,
+    and selected chunks with consecutive chunk_ids of the same article are merged into one
+    source. Tokens are counted exactly with the model's tiktoken encoding.
+    """
+
+    def __init__(self, max_tokens: Optional[int] = 3000, model: str = "gpt-4o",
+                 counter: Optional[TokenCounter] = None):
+        """
+        :param max_tokens: Token budget for the formatted sources (None packs every chunk)
+        :param model: Chat model whose tiktoken encoding is used for counting
+        :param counter: Explicit TokenCounter, overriding the model's encoding
+        """
+        self.max_tokens = max_tokens
+        self.counter = counter or TokenCounter("tiktoken", encoding_name=self.encoding_name(model))
+
+    @staticmethod
+    def encoding_name(model: str) -> str:
+        from tiktoken.model import encoding_name_for_model
+        try:
+            return encoding_name_for_model(model)
+        except KeyError:
+            return "cl100k_base"
+
+    @staticmethod
+    def format_source(number: int, article_url: str, text: str) -> str:
+        return f"Source {number} ({article_url}):\n{text}"
+
+    def count(self, text: str) -> int:
+        return self.counter.count(text)
+
+    def pack(self, results: List[Tuple[Dict, float]]) -> List[Dict]:
+        """
+        Returns the packed sources, best first, as dicts with "article_url", "chunk_ids",
+        "text" and "score" (the score of the best ranked chunk in the source).
+        """
+        selected: List[Tuple[int, Dict, float]] = []
+        seen_texts: Dict[str, List[str]] = {}
+        used = 0
+        texts = [" ".join(meta["text"].split()) for meta, _ in results]
+        counts = self.counter.count_many([
+            self.format_source(len(results), meta["article_url"], meta["text"]) for meta, _ in results
+        ])
+
+        for rank, ((meta, score), text, tokens) in enumerate(zip(results, texts, counts)):
+            article_texts = seen_texts.setdefault(meta["article_url"], [])
+            if any(text in other for other in article_texts):
+                continue
+            if self.max_tokens is not None and used + tokens > self.max_tokens:
+                continue
+            article_texts.append(text)
+            selected.append((rank, meta, score))
+            used += tokens
+
+        return self._merge_adjacent(selected)
+
+    @staticmethod
+    def _merge_adjacent(selected: List[Tuple[int, Dict, float]]) -> List[Dict]:
+        by_article: Dict[str, List[Tuple[int, Dict, float]]] = {}
+        for item in selected:
+            by_article.setdefault(item[1]["article_url"], []).append(item)
+
+        sources = []
+        for article_url, items in by_article.items():
+            items.sort(key=lambda item: item[1]["chunk_id"])
+            run = [items[0]]
+            for item in items[1:]:
+                if item[1]["chunk_id"] == run[-1][1]["chunk_id"] + 1:
+                    run.append(item)
+                    continue
+                sources.append(run)
+                run = [item]
+            sources.append(run)
+
+        sources.sort(key=lambda run: min(rank for rank, _, _ in run))
+        return [{
+            "article_url": run[0][1]["article_url"],
+            "chunk_ids": [meta["chunk_id"] for _, meta, _ in run],
+            "text": "\n".join(meta["text"] for _, meta, _ in run),
+            "score": min(run, key=lambda item: item[0])[2],
+        } for run in sources]
+
+    def format(self, sources: List[Dict]) -> str:
+        return "\n\n".join(
+            self.format_source(i + 1, source["article_url"], source["text"]) for i, source in enumerate(sources)
+        )
@@ -1,20 +1,30 @@
 from typing import Dict, List, Optional
 from processors.ocr_processor import OCRProcessor  
 from urllib.parse import urlparse
-from nltk.tokenize import word_tokenize
-import pytesseract
-from PIL import Image
-from io import BytesIO
-import requests
+from processors.token_counter import TokenCounter, embedding_model_token_limit
+from utils.metrics import metrics
 
 class DocumentProcessor:
     def __init__(self, max_tokens: int = 200, tokenizer=None):
         """
         :param max_tokens: Maximum token length per chunk
-        :param tokenizer: Optional tokenizer (e.g., from HuggingFace); if None, fallback to nltk.word_tokenize
+        :param tokenizer: Optional tokenizer: a TokenCounter, a backend name ("nltk", "hf", "tiktoken")
+                          or any object with `encode(text)`; if None, fallback to nltk.word_tokenize.
+                          "hf" counts the embedding model's own wordpieces.
         """
         self.max_tokens = max_tokens
         self.tokenizer = tokenizer
+        if isinstance(tokenizer, TokenCounter):
+            self.counter = tokenizer
+        elif tokenizer is None or isinstance(tokenizer, str):
+            self.counter = TokenCounter(tokenizer or "nltk")
+        else:
+            self.counter = TokenCounter.wrap(tokenizer)
+        if tokenizer == "hf":
+            limit = embedding_model_token_limit()
+            if limit is not None and max_tokens > limit:
+                print(f"[Chunking] max_tokens={max_tokens} exceeds the embedding model limit of {limit} tokens; "
+                      f"chunk tails will be truncated at encode time.")
         self.ocr = OCRProcessor()
 
     def normalize(self, raw: Dict[str, any]) -> Dict[str, any]:
@@ -29,47 +39,79 @@ class DocumentProcessor:
             "blocks": raw["blocks"]
         }
 
-    def chunk(self, doc: Dict[str, any]) -> List[Dict[str, any]]:
+    def chunk_many(self, docs: List[Dict[str, any]]) -> List[Dict[str, any]]:
+        """
+        Chunks several documents, running OCR for all of their images as one parallel batch first.
+        """
+        ocr_texts = self.ocr.extract_and_clean_many(
+            block["url"] for doc in docs for block in doc["blocks"] if block["type"] == "image"
+        )
+        return [chunk for doc in docs for chunk in self.chunk(doc, ocr_texts=ocr_texts)]
+
+    def chunk(self, doc: Dict[str, any], ocr_texts: Optional[Dict[str, str]] = None) -> List[Dict[str, any]]:
         """
         Splits a normalized document into text or text+image chunks.
+
+        :param ocr_texts: Precomputed {image url: OCR text}; when omitted, OCR for all of the
+                          document's images runs in parallel before chunking.
         """
+        if ocr_texts is None:
+            ocr_texts = self.ocr.extract_and_clean_many(
+                block["url"] for block in doc["blocks"] if block["type"] == "image"
+            )
+
+        # Token counts per text block, computed in one batch; the buffer length is kept as a
+        # running total instead of re-tokenizing the whole buffer after every block
+        block_tokens = iter(self.counter.count_many(
+            [" " + block["content"] for block in doc["blocks"] if block["type"] == "text"]
+        ))
+
         chunks = []
         text_buf = ""
+        token_len = 0
+        total_tokens = 0
         chunk_id = 0
         last_image = None
 
         for block in doc["blocks"]:
             if block["type"] == "image":
                 last_image = block["url"]
-                ocr_text = self._run_ocr(last_image).strip()
+                ocr_text = ocr_texts[last_image] if last_image in ocr_texts else self._run_ocr(last_image)
+                ocr_text = ocr_text.strip()
                 
                 if ocr_text:
                     # Marker for image and its content
                     ocr_block = f"\n\n[ImageOCR:\n{ocr_text.strip()}]\n\n"
                     text_buf += " " + ocr_block
+                    token_len += self._count_tokens(ocr_block)
                 else:
-                    text_buf += f"\n[Image: {last_image}]\n"
+                    image_marker = f"\n[Image: {last_image}]\n"
+                    text_buf += image_marker
+                    token_len += self._count_tokens(image_marker)
                 
                 continue
 
             if block["type"] == "text":
                 text_buf += " " + block["content"]
-                token_len = self._count_tokens(text_buf)
+                token_len += next(block_tokens)
                 if token_len >= self.max_tokens:
                     chunks.append(self._make_chunk(doc, chunk_id, text_buf.strip(), last_image))
                     chunk_id += 1
+                    total_tokens += token_len
                     text_buf = ""
+                    token_len = 0
                     last_image = None
 
         if text_buf.strip():
             chunks.append(self._make_chunk(doc, chunk_id, text_buf.strip(), last_image))
+            total_tokens += token_len
 
+        metrics.inc("chunker.chunks", len(chunks))
+        metrics.inc("chunker.tokens", total_tokens)
         return chunks
 
     def _count_tokens(self, text: str) -> int:
-        if self.tokenizer:
-            return len(self.tokenizer.encode(text))
-        return len(word_tokenize(text))
+        return self.counter.count(text)
 
     def _make_chunk(
         self,
@@ -0,0 +1,35 @@
+import subprocess
+from typing import Iterable, List
+
+
+class EntityExtractor:
+    """
+    Extracts named entities used for retrieval boosting, for queries and for chunks at ingest time.
+    """
+
+    LABELS = {"ORG", "PERSON", "PRODUCT"}
+
+    def __init__(self, model_name: str = "en_core_web_sm", batch_size: int = 64):
+        """
+        :param batch_size: Texts per spaCy batch in extract_many
+        """
+        self.batch_size = batch_size
+        self.nlp = self._load_spacy_model(model_name)
+
+    def _load_spacy_model(self, model_name: str):
+        import spacy
+
+        try:
+            return spacy.load(model_name)
+        except OSError:
+            subprocess.run(["python", "-m", "spacy", "download", model_name], check=True)
+            return spacy.load(model_name)
+
+    def entities_from_doc(self, doc) -> List[str]:
+        return [ent.text for ent in doc.ents if ent.label_ in self.LABELS]
+
+    def extract(self, text: str) -> List[str]:
+        return self.entities_from_doc(self.nlp(text))
+
+    def extract_many(self, texts: Iterable[str]) -> List[List[str]]:
+        return [self.entities_from_doc(doc) for doc in self.nlp.pipe(texts, batch_size=self.batch_size)]
@@ -1,33 +1,92 @@
-import pytesseract
-from PIL import Image
-import requests
-from io import BytesIO
+import os
 import re
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+from utils.image_cache import ImageCache
+
+
+def _ocr_image_file(path: str) -> Optional[str]:
+    """
+    Runs OCR on a cached image file. Module-level so it can run in a process pool.
+    Returns None on failure so that errors are not cached as empty results.
+    """
+    import pytesseract
+    from PIL import Image
+
+    try:
+        with Image.open(path) as img:
+            return pytesseract.image_to_string(img.convert("RGB"))
+    except Exception as e:
+        print(f"[OCR Error] Could not extract text from {path}: {e}")
+        return None
 
 
 class OCRProcessor:
     """
     Handles OCR processing from image URLs and cleans extracted text.
+
+    Images are downloaded through a content-addressed ImageCache and raw OCR output is
+    cached on disk by image hash, so re-chunking an article neither re-downloads nor
+    re-OCRs its images. `extract_and_clean_many` OCRs a batch of images in a process pool.
     """
 
-    def __init__(self, timeout: int = 5):
+    def __init__(self,
+                 timeout: int = 5,
+                 image_cache: Optional[ImageCache] = None,
+                 cache_dir: str = "cache/ocr",
+                 max_workers: Optional[int] = None,
+                 download_workers: int = 8):
         """
         :param timeout: Timeout for image download requests.
+        :param image_cache: Shared image cache; one under cache/images is created if omitted.
+        :param cache_dir: Directory for cached OCR results, keyed by image content hash.
+        :param max_workers: Size of the OCR process pool (defaults to the CPU count).
+        :param download_workers: Threads used to download a batch of images.
         """
         self.timeout = timeout
+        self.image_cache = image_cache or ImageCache(timeout=timeout)
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.download_workers = download_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._pool_lock = threading.Lock()
+
+    def _result_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, f"{digest}.txt")
+
+    def _cached_result(self, digest: str) -> Optional[str]:
+        try:
+            with open(self._result_path(digest), "r", encoding="utf-8") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _store_result(self, digest: str, raw_text: str):
+        path = self._result_path(digest)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        with tempfile.NamedTemporaryFile("w", encoding="utf-8", dir=self.cache_dir, suffix=".tmp",
+                                         delete=False) as f:
+            f.write(raw_text)
+        os.replace(f.name, path)
 
     def extract_text_from_url(self, url: str) -> str:
         """
         Downloads an image from a URL and extracts raw OCR text.
         """
-        try:
-            response = requests.get(url, timeout=self.timeout)
-            img = Image.open(BytesIO(response.content)).convert("RGB")
-            return pytesseract.image_to_string(img)
-        except Exception as e:
-            print(f"[OCR Error] Could not extract text from {url}: {e}")
+        digest = self.image_cache.digest(url)
+        if digest is None:
             return ""
 
+        raw_text = self._cached_result(digest)
+        if raw_text is None:
+            raw_text = _ocr_image_file(self.image_cache.object_path(digest))
+            if raw_text is None:
+                return ""
+            self._store_result(digest, raw_text)
+        return raw_text
+
     def clean_text(self, text: str) -> str:
         """
         Cleans raw OCR text by removing artifacts, symbols, and normalizing whitespace.
@@ -51,4 +110,52 @@ class OCRProcessor:
         Full OCR pipeline: extract raw text from image and clean it.
         """
         raw_text = self.extract_text_from_url(url)
-        return self.clean_text(raw_text)
\ No newline at end of file
+        return self.clean_text(raw_text)
+
+    def extract_and_clean_many(self, urls: Iterable[str]) -> Dict[str, str]:
+        """
+        Batch OCR pipeline: downloads all images concurrently, OCRs the ones without a
+        cached result in the process pool and returns {url: cleaned text}.
+        """
+        urls = list(dict.fromkeys(urls))
+        if not urls:
+            return {}
+
+        with ThreadPoolExecutor(max_workers=self.download_workers) as downloads:
+            digests = dict(zip(urls, downloads.map(self.image_cache.digest, urls)))
+
+        raw_by_digest: Dict[str, str] = {}
+        missing = []
+        for digest in {d for d in digests.values() if d}:
+            cached = self._cached_result(digest)
+            if cached is None:
+                missing.append(digest)
+            else:
+                raw_by_digest[digest] = cached
+
+        if missing:
+            paths = [self.image_cache.object_path(d) for d in missing]
+            for digest, raw_text in zip(missing, self._get_pool().map(_ocr_image_file, paths)):
+                if raw_text is not None:
+                    self._store_result(digest, raw_text)
+                    raw_by_digest[digest] = raw_text
+
+        return {url: self.clean_text(raw_by_digest.get(digest, "")) for url, digest in digests.items()}
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._pool
+
+    def close(self):
+        """Shuts down the OCR process pool, if one was started."""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    def __enter__(self) -> "OCRProcessor":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,76 @@
+import json
+from typing import Callable, List, Optional
+
+
+class TokenCounter:
+    """
+    Counts tokens with one of several backends:
+        - "nltk": nltk.word_tokenize words (the original behaviour)
+        - "hf": a HuggingFace `tokenizers` tokenizer, e.g. the embedding model's own wordpieces
+        - "tiktoken": an OpenAI BPE encoding
+    Backends are imported on first use, so only the selected one has to be installed.
+    """
+
+    BACKENDS = ("nltk", "hf", "tiktoken")
+
+    def __init__(self,
+                 backend: str = "nltk",
+                 model_name: str = "sentence-transformers/multi-qa-MiniLM-L6-cos-v1",
+                 encoding_name: str = "cl100k_base"):
+        """
+        :param backend: One of BACKENDS
+        :param model_name: HuggingFace model whose tokenizer the "hf" backend loads
+        :param encoding_name: tiktoken encoding used by the "tiktoken" backend
+        """
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown tokenizer backend '{backend}', expected one of {self.BACKENDS}")
+        self.backend = backend
+        self._count_batch: Callable[[List[str]], List[int]]
+
+        if backend == "nltk":
+            from nltk.tokenize import word_tokenize
+            self._count_batch = lambda texts: [len(word_tokenize(t)) for t in texts]
+        elif backend == "hf":
+            from tokenizers import Tokenizer
+            tokenizer = Tokenizer.from_pretrained(model_name)
+            tokenizer.no_truncation()
+            tokenizer.no_padding()
+            self._count_batch = lambda texts: [
+                len(enc.ids) for enc in tokenizer.encode_batch(texts, add_special_tokens=False)
+            ]
+        else:
+            import tiktoken
+            encoding = tiktoken.get_encoding(encoding_name)
+            self._count_batch = lambda texts: [len(ids) for ids in encoding.encode_ordinary_batch(texts)]
+
+    @classmethod
+    def wrap(cls, tokenizer) -> "TokenCounter":
+        """
+        Adapts any object with an `encode(text)` method returning a token sequence.
+        """
+        counter = cls.__new__(cls)
+        counter.backend = "custom"
+        counter._count_batch = lambda texts: [len(tokenizer.encode(t)) for t in texts]
+        return counter
+
+    def count(self, text: str) -> int:
+        return self._count_batch([text])[0]
+
+    def count_many(self, texts: List[str]) -> List[int]:
+        if not texts:
+            return []
+        return self._count_batch(texts)
+
+
+def embedding_model_token_limit(model_name: str = "sentence-transformers/multi-qa-MiniLM-L6-cos-v1") -> Optional[int]:
+    """
+    Wordpieces the embedding model reads before truncating, excluding [CLS]/[SEP].
+    Reads only the model's sentence-transformers config; returns None if it is unavailable.
+    """
+    try:
+        from huggingface_hub import hf_hub_download
+        with open(hf_hub_download(model_name, "sentence_bert_config.json"), "r") as f:
+            return json.load(f)["max_seq_length"] - 2
+    except Exception as e:
+        print(f"[Tokenizer] Could not read max_seq_length of {model_name}: {e}")
+        return None
@@ -1,39 +1,246 @@
-import subprocess
-import spacy
-from typing import List, Dict, Any, Tuple
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional, Tuple
 from storage.faiss_chunk_store import FaissChunkStore
+from storage.entity_index import EntityIndex
+from storage.bm25_index import BM25Index
 from embedding.embedder import ChunkEmbedder
+from processors.entity_extractor import EntityExtractor
+from utils.lru_cache import LRUCache
+from utils.metrics import metrics
 
 class QueryEngine:
-    def __init__(self, store: FaissChunkStore, embedder: ChunkEmbedder, model_name: str = "en_core_web_sm"):
+    FUSION_MODES = ("rrf", "weighted")
+
+    def __init__(self, store: FaissChunkStore, embedder: ChunkEmbedder, model_name: str = "en_core_web_sm",
+                 cache_size: int = 1024, cache_ttl: Optional[float] = 3600,
+                 entity_index: Optional[EntityIndex] = None, boost_weight: float = 0.1,
+                 rerank_pool: Optional[int] = None, bm25_index: Optional[BM25Index] = None,
+                 fusion: str = "rrf", dense_weight: float = 0.5, rrf_k: int = 60,
+                 entity_extractor: Optional[EntityExtractor] = None):
+        """
+        :param cache_size: Entries kept in each of the query embedding, entity and result caches
+        :param cache_ttl: Seconds before a cached entry expires (None disables expiry)
+        :param entity_index: Entity -> chunk id index built at ingest time; results are
+                             boosted by the number of query entities their chunk mentions
+        :param boost_weight: Score bonus per matched entity. With RRF fusion it is scaled by
+                             1 / (rrf_k + 1), the fused score of a rank-1 hit in one list, so a
+                             match lifts a candidate a few ranks instead of outranking everything
+        :param rerank_pool: Candidates fetched from FAISS and reranked before keeping top_k
+                            (defaults to top_k)
+        :param bm25_index: Sparse index over chunk text; when given, dense and BM25 retrieval
+                           run in parallel and their candidates are fused
+        :param fusion: "rrf" (reciprocal rank fusion) or "weighted" (min-max normalized scores)
+        :param dense_weight: Weight of the dense scores in "weighted" fusion, BM25 gets the rest
+        :param rrf_k: Rank offset of reciprocal rank fusion
+        :param entity_extractor: Extracts query entities (defaults to spaCy's model_name)
+        """
+        if fusion not in self.FUSION_MODES:
+            raise ValueError(f"Unknown fusion mode '{fusion}', expected one of {self.FUSION_MODES}")
         self.store = store
         self.embedder = embedder
-        self.nlp = self._load_spacy_model(model_name)
-
-    def _load_spacy_model(self, model_name: str):
-        try:
-            return spacy.load(model_name)
-        except OSError:
-            subprocess.run(["python", "-m", "spacy", "download", model_name], check=True)
-            return spacy.load(model_name)
+        self.entity_extractor = entity_extractor or EntityExtractor(model_name)
+        self.nlp = self.entity_extractor.nlp
+        self.entity_index = entity_index
+        self.boost_weight = boost_weight
+        self.rerank_pool = rerank_pool
+        self.bm25_index = bm25_index
+        self.fusion = fusion
+        self.dense_weight = dense_weight
+        self.rrf_k = rrf_k
+        # BM25 runs on this thread while FAISS (which releases the GIL) searches on the caller's
+        self._sparse_executor = ThreadPoolExecutor(max_workers=1) if bm25_index is not None else None
+        self.embedding_cache = LRUCache(cache_size, cache_ttl)
+        self.entity_cache = LRUCache(cache_size, cache_ttl)
+        # Results depend on the store contents and are dropped whenever the store changes
+        self.result_cache = LRUCache(cache_size, cache_ttl)
+        self._store_version = store.version
 
     def _extract_entities(self, query: str) -> List[str]:
-        doc = self.nlp(query)
-        return [ent.text for ent in doc.ents if ent.label_ in {"ORG", "PERSON", "PRODUCT"}]
+        return self.entity_extractor.extract(query)
+
+    def _embed_query(self, query_text: str) -> np.ndarray:
+        return self.embedding_cache.get_or_compute(query_text, lambda: self.embedder.embed_text(query_text))
+
+    def _query_entities(self, query_text: str) -> List[str]:
+        return self.entity_cache.get_or_compute(query_text, lambda: self._extract_entities(query_text))
 
-    def _boost_score(self, score: float, meta: Dict[str, Any], entities: List[str], weight: float = 0.1) -> float:
-        match_bonus = sum(1 for entity in entities if entity.lower() in meta.get("chunk", "").lower())
-        return score - match_bonus * weight  # lower cosine distance is better
+    def _check_store_version(self):
+        if self.store.version != self._store_version:
+            self.result_cache.clear()
+            self._store_version = self.store.version
+
+    def cache_stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            "embedding": self.embedding_cache.stats(),
+            "entities": self.entity_cache.stats(),
+            "results": self.result_cache.stats(),
+        }
 
     def query(self, query_text: str, top_k: int = 10) -> Dict[str, Any]:
-        query_vector = self.embedder.embed_text(query_text)
-        raw_results: List[Tuple[Dict, float]] = self.store.search(query_vector, k=top_k)
-        entities = self._extract_entities(query_text)
-        reranked = sorted(raw_results, key=lambda x: self._boost_score(x[1], x[0], entities))
+        self._check_store_version()
+        cached = self.result_cache.get((query_text, top_k))
+        if cached is not None:
+            metrics.inc("query.result_cache_hits")
+            return self._copy_result(cached)
+        metrics.inc("query.result_cache_misses")
+
+        with metrics.timer("query.total"):
+            with metrics.timer("query.embed"):
+                query_vector = self._embed_query(query_text)
+            with metrics.timer("query.entities"):
+                entities = self._query_entities(query_text)
+            candidates, higher_is_better = self._retrieve(query_vector.reshape(1, -1), [query_text], self._pool_size(top_k))
+            with metrics.timer("query.rerank"):
+                ranked = self._rerank(*candidates[0], entities, top_k, higher_is_better)
+            raw_results = self._materialize([ranked])[0]
+            result = self._build_result(query_text, raw_results, entities)
+        self.result_cache.put((query_text, top_k), result)
+        return self._copy_result(result)
+
+    def query_batch(self, queries: List[str], top_k: int = 10) -> List[Dict[str, Any]]:
+        """
+        Batched equivalent of `query`: uncached queries are encoded in one model call,
+        searched with one FAISS call and run through spaCy with nlp.pipe.
+        Returns one result per query, in order, in the same format as `query`.
+        """
+        self._check_store_version()
+        results: List[Optional[Dict[str, Any]]] = [self.result_cache.get((q, top_k)) for q in queries]
+        pending = list(dict.fromkeys(q for q, r in zip(queries, results) if r is None))
+        metrics.inc("query.result_cache_hits", len(queries) - len(pending))
+        metrics.inc("query.result_cache_misses", len(pending))
+
+        if pending:
+            vectors = [self.embedding_cache.get(q) for q in pending]
+            to_encode = [q for q, v in zip(pending, vectors) if v is None]
+            if to_encode:
+                with metrics.timer("query.embed"):
+                    encoded = dict(zip(to_encode, self.embedder.embed_texts(to_encode)))
+                for q, vector in encoded.items():
+                    self.embedding_cache.put(q, vector)
+                vectors = [encoded[q] if v is None else v for q, v in zip(pending, vectors)]
+
+            entities = [self.entity_cache.get(q) for q in pending]
+            to_parse = [q for q, e in zip(pending, entities) if e is None]
+            if to_parse:
+                with metrics.timer("query.entities"):
+                    parsed = dict(zip(to_parse, self.entity_extractor.extract_many(to_parse)))
+                for q, ents in parsed.items():
+                    self.entity_cache.put(q, ents)
+                entities = [parsed[q] if e is None else e for q, e in zip(pending, entities)]
+
+            candidates, higher_is_better = self._retrieve(np.stack(vectors), pending, self._pool_size(top_k))
+            with metrics.timer("query.rerank"):
+                ranked = [self._rerank(ids, scores, ents, top_k, higher_is_better)
+                          for (ids, scores), ents in zip(candidates, entities)]
+            raw = self._materialize(ranked)
+            computed = {}
+            for q, raw_results, ents in zip(pending, raw, entities):
+                computed[q] = self._build_result(q, raw_results, ents)
+                self.result_cache.put((q, top_k), computed[q])
+            results = [computed[q] if r is None else r for q, r in zip(queries, results)]
+
+        return [self._copy_result(r) for r in results]
+
+    def _pool_size(self, top_k: int) -> int:
+        return max(top_k, self.rerank_pool or 0)
 
+    def _retrieve(self, query_vectors: np.ndarray, query_texts: List[str],
+                  pool: int) -> Tuple[List[Tuple[np.ndarray, np.ndarray]], bool]:
+        """
+        Candidate (ids, scores) per query, best first, and whether higher scores are better.
+        Without a BM25 index these are the FAISS results; otherwise the fused scores.
+        """
+        if self.bm25_index is None:
+            with metrics.timer("query.dense_search"):
+                D, I = self.store.search_ids(query_vectors, k=pool)
+            return list(zip(I, D)), self.store.higher_is_better
+
+        def sparse_search():
+            with metrics.timer("query.bm25_search"):
+                return [self.bm25_index.search(q, pool) for q in query_texts]
+
+        sparse = self._sparse_executor.submit(sparse_search)
+        with metrics.timer("query.dense_search"):
+            D, I = self.store.search_ids(query_vectors, k=pool)
+        with metrics.timer("query.fuse"):
+            sparse_results = sparse.result()  # includes any BM25 time not overlapped with FAISS
+            fused = [self._fuse(ids, scores, sparse_ids, sparse_scores)
+                     for ids, scores, (sparse_scores, sparse_ids) in zip(I, D, sparse_results)]
+        return fused, True
+
+    def _fuse(self, dense_ids: np.ndarray, dense_scores: np.ndarray,
+              sparse_ids: np.ndarray, sparse_scores: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        valid = dense_ids >= 0
+        dense_ids, dense_scores = dense_ids[valid], dense_scores[valid]
+        if not self.store.higher_is_better:
+            dense_scores = -dense_scores  # lower L2 distance is better
+
+        ids = np.union1d(dense_ids, sparse_ids)
+        fused = np.zeros(len(ids), dtype=np.float32)
+        if self.fusion == "rrf":
+            fused[np.searchsorted(ids, dense_ids)] += 1.0 / (self.rrf_k + np.arange(1, len(dense_ids) + 1))
+            fused[np.searchsorted(ids, sparse_ids)] += 1.0 / (self.rrf_k + np.arange(1, len(sparse_ids) + 1))
+        else:
+            fused[np.searchsorted(ids, dense_ids)] += self.dense_weight * self._min_max(dense_scores)
+            fused[np.searchsorted(ids, sparse_ids)] += (1 - self.dense_weight) * self._min_max(sparse_scores)
+
+        order = np.argsort(-fused, kind="stable")
+        return ids[order], fused[order]
+
+    @staticmethod
+    def _min_max(scores: np.ndarray) -> np.ndarray:
+        if not len(scores):
+            return scores
+        spread = scores.max() - scores.min()
+        if spread == 0:
+            return np.ones_like(scores)
+        return (scores - scores.min()) / spread
+
+    def _rerank(self, ids: np.ndarray, scores: np.ndarray, entities: List[str], top_k: int,
+                higher_is_better: bool) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Boosts candidates by the number of query entities their chunk mentions, looked up
+        in the entity index, and keeps the best top_k. Returned scores are the unboosted ones.
+        """
+        valid = (ids >= 0) & (ids < self.store.ntotal)
+        ids, scores = ids[valid], scores[valid]
+        if self.entity_index is None or not entities or not len(ids):
+            return ids[:top_k], scores[:top_k]
+
+        bonus = self.entity_index.match_counts(ids, entities) * self._entity_bonus()
+        if higher_is_better:
+            order = np.argsort(-(scores + bonus), kind="stable")  # similarity or fused score
+        else:
+            order = np.argsort(scores - bonus, kind="stable")  # lower L2 distance is better
+        order = order[:top_k]
+        return ids[order], scores[order]
+
+    def _entity_bonus(self) -> float:
+        """Bonus per matched entity, on the scale of the scores being reranked."""
+        if self.bm25_index is not None and self.fusion == "rrf":
+            return self.boost_weight / (self.rrf_k + 1)
+        return self.boost_weight
+
+    def _materialize(self, ranked: List[Tuple[np.ndarray, np.ndarray]]) -> List[List[Tuple[Dict, float]]]:
+        """Fetches metadata for the kept rows of every query, each distinct row once."""
+        unique_ids = sorted({int(i) for ids, _ in ranked for i in ids})
+        with metrics.timer("query.materialize"):
+            rows = dict(zip(unique_ids, self.store.get_rows(unique_ids)))
+        return [[(rows[int(i)], float(score)) for i, score in zip(ids, scores)] for ids, scores in ranked]
+
+    def _build_result(self, query_text: str, raw_results: List[Tuple[Dict, float]], entities: List[str]) -> Dict[str, Any]:
         return {
             "query": query_text,
             "entities": entities,
-            "results": reranked
+            "results": raw_results
+        }
+
+    @staticmethod
+    def _copy_result(result: Dict[str, Any]) -> Dict[str, Any]:
+        """A copy of a cached result that callers can modify without changing the cache."""
+        return {
+            **result,
+            "entities": list(result["entities"]),
+            "results": [(dict(row), score) for row, score in result["results"]],
         }
-    
\ No newline at end of file
@@ -0,0 +1,65 @@
+"""
+Process-wide singletons for the Streamlit app.
+
+Streamlit re-runs main.py on every interaction and for every session; the getters below
+are wrapped in st.cache_resource, so each model and index is loaded once per server
+process, on first use. When RAG_MODEL_SERVER is set, the embedder and the FAISS store are
+proxies to a shared model_server.py sidecar instead of local copies. When RAG_METRICS_PORT
+is set, the process metrics are served in Prometheus format on that port.
+"""
+import os
+from typing import Optional
+import streamlit as st
+from answer_generator import AnswerGenerator
+from model_server import ModelClient, RemoteChunkStore, RemoteEmbedder, authkey_from_env
+from query_engine import QueryEngine
+from retrieval_orchestrator import RetrievalOrchestrator
+from storage.bm25_index import BM25Index
+from storage.entity_index import EntityIndex
+from utils.metrics import metrics
+from utils.semantic_answer_cache import SemanticAnswerCache
+
+
+@st.cache_resource
+def get_model_client() -> Optional[ModelClient]:
+    address = os.getenv("RAG_MODEL_SERVER")
+    return ModelClient(address, authkey_from_env()) if address else None
+
+
+@st.cache_resource
+def get_store():
+    client = get_model_client()
+    if client is not None:
+        return RemoteChunkStore(client)
+    from storage.faiss_chunk_store import FaissChunkStore
+    return FaissChunkStore(dim=384)
+
+
+@st.cache_resource
+def get_embedder():
+    client = get_model_client()
+    if client is not None:
+        return RemoteEmbedder(client)
+    from embedding.embedder import ChunkEmbedder
+    return ChunkEmbedder()
+
+
+@st.cache_resource
+def get_engine() -> QueryEngine:
+    return QueryEngine(get_store(), get_embedder(), entity_index=EntityIndex(), rerank_pool=50, bm25_index=BM25Index())
+
+
+@st.cache_resource
+def get_generator() -> AnswerGenerator:
+    return AnswerGenerator(answer_cache=SemanticAnswerCache(get_embedder().embed_text))
+
+
+@st.cache_resource
+def get_orchestrator() -> RetrievalOrchestrator:
+    return RetrievalOrchestrator(get_engine(), get_generator())
+
+
+@st.cache_resource
+def start_metrics_server():
+    port = os.getenv("RAG_METRICS_PORT")
+    return metrics.serve(int(port)) if port else None
@@ -0,0 +1,111 @@
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from typing import Any, Callable, Dict, List, Tuple
+from query_engine import QueryEngine
+from answer_generator import AnswerGenerator
+from utils.logger import setup_logger
+from utils.metrics import metrics
+
+
+class RetrievalOrchestrator:
+    """
+    Runs query rewriting and retrieval concurrently instead of one after the other.
+
+    Retrieval on the original query starts right away, speculatively, while the LLM
+    rewrite is in flight. When the rewrite lands within `rewrite_timeout`, the rewritten
+    query is retrieved too and its results replace (or are merged with) the speculative
+    ones. On timeout or error the original query's results are used as they are.
+    """
+
+    MERGE_MODES = ("replace", "merge")
+    # Extra seconds a timed-out rewrite may run to still land in the rewrite cache for next time
+    REWRITE_GRACE = 2.0
+
+    def __init__(self, engine: QueryEngine, generator: AnswerGenerator,
+                 rewrite_timeout: float = 3.0, merge: str = "replace", rrf_k: int = 60):
+        """
+        :param rewrite_timeout: Seconds to wait for the rewrite before falling back to the original query
+        :param merge: "replace" keeps only the rewritten query's results, "merge" fuses both
+                      result lists with reciprocal rank fusion
+        :param rrf_k: Rank offset used by "merge"
+        """
+        if merge not in self.MERGE_MODES:
+            raise ValueError(f"Unknown merge mode '{merge}', expected one of {self.MERGE_MODES}")
+        self.logger = setup_logger(self.__class__.__name__)
+        self.engine = engine
+        self.generator = generator
+        self.rewrite_timeout = rewrite_timeout
+        self.merge = merge
+        self.rrf_k = rrf_k
+        self.executor = ThreadPoolExecutor(max_workers=4)
+        # Rewrites get their own threads so slow LLM calls never queue retrieval behind them
+        self.rewrite_executor = ThreadPoolExecutor(max_workers=4)
+
+    @staticmethod
+    def _timed(fn: Callable, *args) -> Tuple[Any, float, Dict[str, float]]:
+        """Calls fn and returns its value, the seconds it took and the metrics timers it ran."""
+        with metrics.collect() as breakdown:
+            start = time.perf_counter()
+            value = fn(*args)
+            elapsed = time.perf_counter() - start
+        return value, elapsed, breakdown
+
+    def run(self, query: str, top_k: int = 10) -> Dict[str, Any]:
+        """
+        Rewrites and retrieves `query`. Returns:
+            - "query": the original query
+            - "rewritten_query": the query the final results were retrieved for
+            - "rewrite_used": False when the rewrite timed out, failed or changed nothing
+            - "result": a QueryEngine.query result
+            - "timings": seconds spent per stage ("rewrite", "retrieval_original",
+              "retrieval_rewritten") and end to end ("total"); stages that did not finish are absent
+            - "breakdown": per finished stage, the seconds spent in each metrics timer it ran
+              (e.g. "query.embed", "query.dense_search")
+        """
+        start = time.perf_counter()
+        timings: Dict[str, float] = {}
+        breakdown: Dict[str, Dict[str, float]] = {}
+        rewrite = self.rewrite_executor.submit(self._timed, self.generator.rewrite_query, query,
+                                               self.rewrite_timeout + self.REWRITE_GRACE)
+        speculative = self.executor.submit(self._timed, self.engine.query, query, top_k)
+
+        rewritten = None
+        try:
+            rewritten, timings["rewrite"], breakdown["rewrite"] = rewrite.result(timeout=self.rewrite_timeout)
+        except TimeoutError:
+            # The rewrite keeps running for up to REWRITE_GRACE seconds and may still land in the rewrite cache
+            self.logger.warning(f"Query rewrite timed out after {self.rewrite_timeout}s, using the original query")
+        except Exception as e:
+            self.logger.warning(f"Query rewrite failed, using the original query: {e}")
+
+        original_result, timings["retrieval_original"], breakdown["retrieval_original"] = speculative.result()
+        if not rewritten or rewritten.strip() == query.strip():
+            result = original_result
+        else:
+            result, timings["retrieval_rewritten"], breakdown["retrieval_rewritten"] = self._timed(
+                self.engine.query, rewritten, top_k
+            )
+            if self.merge == "merge":
+                result = {**result, "results": self._fuse(result["results"], original_result["results"])[:top_k]}
+
+        timings["total"] = time.perf_counter() - start
+        metrics.observe("orchestrator.total", timings["total"])
+        return {
+            "query": query,
+            "rewritten_query": result["query"],
+            "rewrite_used": result is not original_result,
+            "result": result,
+            "timings": timings,
+            "breakdown": breakdown,
+        }
+
+    def _fuse(self, *rankings: List[Tuple[Dict, float]]) -> List[Tuple[Dict, float]]:
+        """Reciprocal rank fusion of result lists; each chunk keeps its entry from the first list containing it."""
+        fused: Dict[Tuple[str, int], float] = {}
+        entries: Dict[Tuple[str, int], Tuple[Dict, float]] = {}
+        for ranking in rankings:
+            for rank, (meta, score) in enumerate(ranking, 1):
+                key = (meta["article_url"], meta["chunk_id"])
+                fused[key] = fused.get(key, 0.0) + 1.0 / (self.rrf_k + rank)
+                entries.setdefault(key, (meta, score))
+        return [entries[key] for key in sorted(fused, key=fused.get, reverse=True)]
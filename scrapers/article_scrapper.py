@@ -1,6 +1,6 @@
 import requests
 from bs4 import BeautifulSoup
-from typing import List, Dict
+from typing import List, Dict, Optional
 from urllib.parse import urlparse, parse_qs, unquote
 import time
 
@@ -8,11 +8,14 @@ class ArticleScraper:
     HEADERS = {
         "User-Agent": "Mozilla/5.0 (compatible; RAGBot/1.0; +https://example.com/bot)"
     }
-    def __init__(self, url: str, max_retries: int = 3, retry_delay: float = 2.0):
+    def __init__(self, url: str, max_retries: int = 3, retry_delay: float = 2.0, html: Optional[bytes] = None):
+        """
+        :param html: Already downloaded page content (e.g. from AsyncFetcher); fetched from `url` when omitted
+        """
         self.url = url
         self.max_retries = max_retries
         self.retry_delay = retry_delay
-        self.soup = self._load_soup()
+        self.soup = BeautifulSoup(html, "html.parser") if html is not None else self._load_soup()
 
     def _load_soup(self) -> BeautifulSoup:
         for attempt in range(self.max_retries):
@@ -118,4 +121,10 @@ class ArticleScraper:
             "tags": self.get_tags(),
             "blocks": self.get_article_blocks()
         }
-    
\ No newline at end of file
+
+
+def parse_article_html(url: str, html: bytes) -> Dict[str, any]:
+    """
+    Parses already downloaded page content. Module-level so it can run in a process pool.
+    """
+    return ArticleScraper(url, html=html).parse()
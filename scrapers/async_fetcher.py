@@ -0,0 +1,172 @@
+import asyncio
+import random
+import threading
+import time
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+from urllib.parse import urlparse
+
+import aiohttp
+
+from utils.metrics import metrics
+
+
+class HostRateLimiter:
+    """
+    Spaces out request starts to the same host by at least 1 / rate seconds.
+    """
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def wait(self, url: str):
+        if not self.interval:
+            return
+        host = urlparse(url).netloc
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.interval
+        if slot > now:
+            await asyncio.sleep(slot - now)
+
+
+class AsyncFetcher:
+    """
+    Concurrent page downloader shared by ArticleScraper and IssueArticleScraper.
+
+    Uses one pooled aiohttp session, caps the number of requests in flight, rate-limits
+    each host separately and retries timeouts, connection errors, 429 and 5xx responses
+    with exponential backoff. Fetching returns raw page bytes; parsing is left to the
+    caller so it can run in a worker pool.
+    """
+    HEADERS = {
+        "User-Agent": "Mozilla/5.0 (compatible; RAGBot/1.0; +https://example.com/bot)"
+    }
+    RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+    def __init__(self,
+                 concurrency: int = 16,
+                 per_host_rate: float = 5.0,
+                 max_retries: int = 3,
+                 retry_backoff: float = 1.0,
+                 timeout: float = 10.0):
+        """
+        :param concurrency: Maximum number of requests in flight
+        :param per_host_rate: Maximum request starts per second per host (0 disables the limit)
+        :param max_retries: Attempts per URL before giving up
+        :param retry_backoff: Base delay in seconds, doubled after every failed attempt
+        :param timeout: Total timeout per request in seconds
+        """
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.timeout = aiohttp.ClientTimeout(total=timeout)
+        self.rate_limiter = HostRateLimiter(per_host_rate)
+
+    def _session(self) -> aiohttp.ClientSession:
+        connector = aiohttp.TCPConnector(limit=self.concurrency, ttl_dns_cache=300)
+        return aiohttp.ClientSession(connector=connector, headers=self.HEADERS, timeout=self.timeout)
+
+    async def fetch(self, session: aiohttp.ClientSession, url: str) -> Optional[bytes]:
+        """
+        Downloads one URL. Returns None once all attempts failed or on a non-retryable error status.
+        """
+        with metrics.timer("fetcher.fetch"):
+            body = await self._fetch(session, url)
+        if body is None:
+            metrics.inc("fetcher.failures")
+        else:
+            metrics.inc("fetcher.pages")
+            metrics.inc("fetcher.bytes", len(body))
+        return body
+
+    async def _fetch(self, session: aiohttp.ClientSession, url: str) -> Optional[bytes]:
+        for attempt in range(1, self.max_retries + 1):
+            await self.rate_limiter.wait(url)
+            try:
+                async with session.get(url) as response:
+                    if response.status < 400:
+                        return await response.read()
+                    if response.status not in self.RETRY_STATUSES:
+                        print(f"HTTP {response.status} for URL: {url}")
+                        return None
+                    print(f"[{attempt}/{self.max_retries}] HTTP {response.status} for URL: {url}")
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                print(f"[{attempt}/{self.max_retries}] Request failed: {e!r} for URL: {url}")
+
+            if attempt < self.max_retries:
+                metrics.inc("fetcher.retries")
+                delay = self.retry_backoff * 2 ** (attempt - 1)
+                await asyncio.sleep(delay * (1 + random.random() * 0.25))
+
+        print(f"Failed to load page after {self.max_retries} attempts: {url}")
+        return None
+
+    async def iter_fetch(self, urls: Iterable[str]) -> AsyncIterator[Tuple[str, Optional[bytes]]]:
+        """
+        Yields (url, body) pairs in completion order. Body is None for failed URLs.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self._session() as session:
+            async def bounded(url: str) -> Tuple[str, Optional[bytes]]:
+                async with semaphore:
+                    return url, await self.fetch(session, url)
+
+            tasks = [asyncio.create_task(bounded(url)) for url in urls]
+            try:
+                for next_done in asyncio.as_completed(tasks):
+                    yield await next_done
+            finally:
+                for task in tasks:
+                    task.cancel()
+
+    def fetch_all(self, urls: Iterable[str]) -> Dict[str, Optional[bytes]]:
+        """
+        Blocking helper: downloads all URLs concurrently and returns {url: body}.
+        """
+        async def collect():
+            return {url: body async for url, body in self.iter_fetch(urls)}
+
+        return asyncio.run(collect())
+
+
+class BlockingFetcher:
+    """
+    Blocking front end to an AsyncFetcher for thread-based pipelines.
+
+    One event loop with one pooled session runs in a background thread; `fetch(url)` may be
+    called from any number of worker threads, which share the connection cap, per-host
+    rate limits and retries of the wrapped fetcher.
+    """
+
+    def __init__(self, fetcher: AsyncFetcher):
+        self.fetcher = fetcher
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        self.session = self._run(self._open_session())
+
+    async def _open_session(self) -> aiohttp.ClientSession:
+        return self.fetcher._session()
+
+    def _run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    def fetch(self, url: str) -> Optional[bytes]:
+        return self._run(self.fetcher.fetch(self.session, url))
+
+    def close(self):
+        self._run(self.session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+    def __enter__(self) -> "BlockingFetcher":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
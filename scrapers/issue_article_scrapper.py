@@ -2,7 +2,7 @@ import requests
 from bs4 import BeautifulSoup
 from urllib.parse import urlparse, parse_qs, unquote, urljoin
 from urllib.parse import urljoin
-from typing import Dict, List
+from typing import Dict, List, Optional
 import time
 
 class IssueArticleScraper:
@@ -10,11 +10,14 @@ class IssueArticleScraper:
         "User-Agent": "Mozilla/5.0 (compatible; RAGBot/1.0; +https://example.com/bot)"
     }
 
-    def __init__(self, url: str, max_retries: int = 3, retry_delay: float = 2.0):
+    def __init__(self, url: str, max_retries: int = 3, retry_delay: float = 2.0, html: Optional[bytes] = None):
+        """
+        :param html: Already downloaded page content (e.g. from AsyncFetcher); fetched from `url` when omitted
+        """
         self.url = url
         self.max_retries = max_retries
         self.retry_delay = retry_delay
-        self.soup = self._load_soup()
+        self.soup = BeautifulSoup(html, "html.parser") if html is not None else self._load_soup()
 
     def _load_soup(self) -> BeautifulSoup:
         for attempt in range(1, self.max_retries + 1):
@@ -62,4 +65,11 @@ class IssueArticleScraper:
         return {
             "url": self.url,
             "blocks": self.get_article_blocks()
-        }
\ No newline at end of file
+        }
+
+
+def parse_issue_html(url: str, html: bytes) -> Dict[str, any]:
+    """
+    Parses already downloaded page content. Module-level so it can run in a process pool.
+    """
+    return IssueArticleScraper(url, html=html).parse()
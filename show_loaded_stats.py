@@ -1,15 +1,26 @@
-from storage.faiss_chunk_store import FaissChunkStore
+import os
+import pickle
+
+from storage.chunk_metadata_table import ChunkMetadataTable
 from storage.parsed_article_store import ParsedArticleStore
+from storage.segment_manifest import SegmentManifest, manifest_path_for
 
-parsed_storage = ParsedArticleStore('data/parsed_articles.json')
+parsed_storage = ParsedArticleStore('data/parsed_articles.jsonl', read_only=True)
 
-parsed_urls = list(set([a['url'] for a in parsed_storage.load()]))
+parsed_urls = parsed_storage.urls()
+parsed_storage.close()
 
 print(f'parsed articles: {len(parsed_urls)}')
 
-encoded_storage = FaissChunkStore(dim=384)
+# Only the metadata is needed to count URLs, so neither FAISS nor the index is loaded
+manifest = SegmentManifest(manifest_path_for('data/faiss_index.bin'))
+encoded_metadata = manifest.load().open_metadata() if manifest.exists else ChunkMetadataTable('data/metadata.arrow')
+if not len(encoded_metadata) and os.path.exists('data/metadata.pkl'):
+    # Stores written before the Arrow metadata kept it as a pickled list of dicts
+    with open('data/metadata.pkl', 'rb') as f:
+        encoded_metadata.append(pickle.load(f))
 
-encoded_urls = list(set(encoded_storage.get_all_urls()))
+encoded_urls = list(set(encoded_metadata.column("article_url")))
 
 print(f'encoded articles {len(encoded_urls)}')
 
@@ -0,0 +1,195 @@
+import json
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+
+class BM25Index:
+    """
+    Okapi BM25 index over chunk text, keyed by FaissChunkStore row ids.
+
+    The inverted index is stored in segments, each covering a contiguous range of rows in
+    CSR form: `offsets` delimits each term's slice of `doc_ids` / `tfs`, and `doc_lens`
+    holds the token count of every row. The arrays are memory-mapped on load, so only the
+    postings of the query terms are read. Added rows become searchable after `save()`.
+
+    `save()` writes the rows added since the previous save as a new segment, merged with
+    the trailing segments that are not much larger, so ingest can save after every batch
+    without rewriting the whole index. `terms.json` names the live segments and is
+    replaced last.
+    """
+
+    TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-.][a-z0-9]+)*")
+    ARRAYS = ("offsets", "doc_ids", "tfs", "doc_lens")
+    # A new segment absorbs trailing segments of at most this many times its size
+    MERGE_FACTOR = 2
+
+    def __init__(self, path: str = "data/bm25_index", k1: float = 1.2, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self.term_ids: Dict[str, int] = {}
+        # {array name: array} of each saved segment, in row order
+        self.segments: List[Dict[str, np.ndarray]] = []
+        self.doc_lens = np.zeros(0, dtype=np.int32)
+        self.total_len = 0
+        self._manifest: Dict[str, Any] = {"segments": [], "next_segment": 1}
+        self._pending_terms: List[int] = []
+        self._pending_docs: List[int] = []
+        self._pending_tfs: List[int] = []
+        self._pending_lens: List[int] = []
+
+        if os.path.exists(self._meta_path()):
+            self._load()
+
+    @classmethod
+    def tokenize(cls, text: str) -> List[str]:
+        return cls.TOKEN_RE.findall(text.lower())
+
+    @property
+    def covered_rows(self) -> int:
+        """Number of store rows already added; rows below it are covered by the index."""
+        return len(self.doc_lens) + len(self._pending_lens)
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "terms.json")
+
+    def _load(self):
+        with open(self._meta_path(), "r") as f:
+            meta = json.load(f)
+        if "segments" not in meta:
+            # Indexes written before segments kept one generation of the arrays
+            files = {name: f"{name}-{meta['generation']:06d}.npy" for name in self.ARRAYS}
+            meta["segments"] = [{"files": files, "size": None}]
+            meta["next_segment"] = 1
+        self.term_ids = {term: i for i, term in enumerate(meta["terms"])}
+        self.total_len = meta["total_len"]
+        self._manifest = {"segments": meta["segments"], "next_segment": meta["next_segment"]}
+        self.segments = []
+        for segment in meta["segments"]:
+            arrays = {name: np.load(os.path.join(self.path, file), mmap_mode=None if name == "offsets" else "r")
+                      for name, file in segment["files"].items()}
+            segment["size"] = len(arrays["doc_ids"])
+            self.segments.append(arrays)
+        self.doc_lens = (np.concatenate([seg["doc_lens"] for seg in self.segments])
+                         if self.segments else np.zeros(0, dtype=np.int32))
+
+    def add(self, row_id: int, text: str):
+        """Adds one row. Rows must be added in store order, starting at `covered_rows`."""
+        if row_id != self.covered_rows:
+            raise ValueError(f"Expected row {self.covered_rows}, got {row_id}")
+        tokens = self.tokenize(text)
+        for term, tf in Counter(tokens).items():
+            term_id = self.term_ids.setdefault(term, len(self.term_ids))
+            self._pending_terms.append(term_id)
+            self._pending_docs.append(row_id)
+            self._pending_tfs.append(tf)
+        self._pending_lens.append(len(tokens))
+
+    def add_many(self, row_ids: Sequence[int], texts: Sequence[str]):
+        for row_id, text in zip(row_ids, texts):
+            self.add(row_id, text)
+
+    def _postings(self, term_id: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Saved (doc ids, term frequencies) of a term across all segments."""
+        docs, tfs = [], []
+        for segment in self.segments:
+            offsets = segment["offsets"]
+            if term_id < len(offsets) - 1:
+                start, end = offsets[term_id], offsets[term_id + 1]
+                docs.append(segment["doc_ids"][start:end])
+                tfs.append(segment["tfs"][start:end])
+        if len(docs) == 1:
+            return np.asarray(docs[0]), np.asarray(tfs[0])
+        return np.concatenate(docs), np.concatenate(tfs)
+
+    def search(self, query: str, k: int = 10) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Returns (scores, row ids) of the best k rows for the query, best first.
+        Only the postings of the query terms are touched.
+        """
+        num_docs = len(self.doc_lens)
+        saved_terms = max((len(seg["offsets"]) - 1 for seg in self.segments), default=0)
+        term_ids = {self.term_ids[t] for t in self.tokenize(query) if self.term_ids.get(t, saved_terms) < saved_terms}
+        if not num_docs or not term_ids:
+            return np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64)
+
+        avg_len = self.total_len / num_docs
+        ids, contributions = [], []
+        for term_id in term_ids:
+            docs, tfs = self._postings(term_id)
+            idf = np.log1p((num_docs - len(docs) + 0.5) / (len(docs) + 0.5))
+            norm = self.k1 * (1 - self.b + self.b * self.doc_lens[docs] / avg_len)
+            ids.append(docs)
+            contributions.append(idf * tfs * (self.k1 + 1) / (tfs + norm))
+
+        unique_ids, inverse = np.unique(np.concatenate(ids), return_inverse=True)
+        scores = np.bincount(inverse, weights=np.concatenate(contributions)).astype(np.float32)
+        if len(scores) > k:
+            top = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top = np.arange(len(scores))
+        top = top[np.argsort(-scores[top], kind="stable")]
+        return scores[top], unique_ids[top]
+
+    def save(self):
+        """
+        Writes the rows added since the last save as a new segment, merged with the
+        trailing segments it outgrows. Segment files are synced before `terms.json` names
+        them, so an interrupted save leaves the previous state intact.
+        """
+        if not self._pending_lens and os.path.exists(self._meta_path()):
+            return
+
+        new_size = len(self._pending_docs)
+        merged = len(self.segments)
+        while merged and self._manifest["segments"][merged - 1]["size"] <= self.MERGE_FACTOR * new_size:
+            merged -= 1
+            new_size += self._manifest["segments"][merged]["size"]
+
+        # Older segments first, then new rows: rows only grow, so a stable sort by term
+        # keeps every term's postings sorted by row id
+        sources = self.segments[merged:]
+        terms = np.concatenate([np.repeat(np.arange(len(seg["offsets"]) - 1), np.diff(seg["offsets"]))
+                                for seg in sources] + [np.asarray(self._pending_terms, dtype=np.int64)])
+        order = np.argsort(terms, kind="stable")
+        offsets = np.zeros(len(self.term_ids) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(terms, minlength=len(self.term_ids)))
+        arrays = {
+            "offsets": offsets,
+            "doc_ids": np.concatenate([seg["doc_ids"] for seg in sources]
+                                      + [np.asarray(self._pending_docs, dtype=np.int64)])[order],
+            "tfs": np.concatenate([seg["tfs"] for seg in sources]
+                                  + [np.asarray(self._pending_tfs, dtype=np.float32)])[order],
+            "doc_lens": np.concatenate([seg["doc_lens"] for seg in sources]
+                                       + [np.asarray(self._pending_lens, dtype=np.int32)]),
+        }
+
+        os.makedirs(self.path, exist_ok=True)
+        number = self._manifest["next_segment"]
+        segment = {"files": {name: f"{name}-seg{number:06d}.npy" for name in arrays}, "size": len(order)}
+        for name, array in arrays.items():
+            with open(os.path.join(self.path, segment["files"][name]), "wb") as f:
+                np.save(f, array)
+                f.flush()
+                os.fsync(f.fileno())
+
+        stale = self._manifest["segments"][merged:]
+        meta = {"terms": list(self.term_ids), "total_len": self.total_len + sum(self._pending_lens),
+                "segments": self._manifest["segments"][:merged] + [segment], "next_segment": number + 1}
+        tmp_path = f"{self._meta_path()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._meta_path())
+
+        self._pending_terms, self._pending_docs, self._pending_tfs, self._pending_lens = [], [], [], []
+        self._load()
+        for old in stale:
+            for file in old["files"].values():
+                if os.path.exists(os.path.join(self.path, file)):
+                    os.remove(os.path.join(self.path, file))
@@ -0,0 +1,128 @@
+import json
+import os
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+
+import pyarrow as pa
+
+
+class ChunkMetadataTable:
+    """
+    Columnar chunk metadata stored as an Arrow IPC file and memory-mapped on load.
+
+    Opening the table only maps the file; rows are materialized as dicts when they are
+    requested through `take`, so a process serving queries keeps just the pages of the
+    rows it returned in memory. New rows are held in memory until `save`.
+    """
+
+    SCHEMA = pa.schema([
+        ("article_url", pa.string()),
+        ("chunk_id", pa.int64()),
+        ("text", pa.large_string()),
+        ("image_url", pa.string()),
+        ("type", pa.string()),
+        ("title", pa.string()),
+        ("description", pa.string()),
+        ("tags", pa.list_(pa.string())),
+        # JSON object holding any chunk keys not covered by the columns above
+        ("extra", pa.string()),
+    ])
+    COLUMNS = [name for name in SCHEMA.names if name != "extra"]
+
+    def __init__(self, path: str):
+        self.path = path
+        self._table: pa.Table = self.SCHEMA.empty_table()
+        self._pending: List[Dict[str, Any]] = []
+
+        if os.path.exists(path):
+            self._table = self._open(path)
+
+    @staticmethod
+    def _open(path: str) -> pa.Table:
+        with pa.memory_map(path, "r") as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def __len__(self) -> int:
+        return self._table.num_rows + len(self._pending)
+
+    def append(self, rows: Iterable[Dict[str, Any]]):
+        self._pending.extend(rows)
+
+    def take(self, ids: Sequence[int]) -> List[Dict[str, Any]]:
+        """
+        Materializes the rows at the given positions, in the given order.
+        """
+        stored = self._table.num_rows
+        stored_ids = [i for i in ids if i < stored]
+        stored_rows = iter(self._to_dicts(self._table.take(pa.array(stored_ids, pa.int64()))) if stored_ids else [])
+        return [next(stored_rows) if i < stored else self._pending[i - stored] for i in ids]
+
+    def column(self, name: str) -> List[Any]:
+        """
+        Returns one column for all rows. Only that column's buffers are read from disk.
+        """
+        return self._table.column(name).to_pylist() + [row.get(name) for row in self._pending]
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """Materializes every row. Avoid on large stores."""
+        return self.take(range(len(self)))
+
+    def save(self, path: Optional[str] = None):
+        """
+        Writes all rows to `path` (defaults to the table's own path) and re-maps the result.
+        The file is written next to the target and renamed into place, so readers never
+        observe a partially written table.
+        """
+        path = path or self.path
+        table = self._table
+        if self._pending:
+            table = pa.concat_tables([table, self._from_dicts(self._pending)])
+
+        self._write(table, path)
+        self.path = path
+        self._table = self._open(path)
+        self._pending = []
+
+    def save_pending(self, path: str) -> int:
+        """
+        Writes only the rows appended since the last save to `path` and maps them in
+        place of the in-memory copies. Returns the number of rows written.
+        """
+        if not self._pending:
+            return 0
+        written = len(self._pending)
+        self._write(self._from_dicts(self._pending), path)
+        self._pending = []
+        self.attach(path)
+        return written
+
+    def attach(self, path: str):
+        """Maps another table file and appends its rows after the stored ones."""
+        self._table = pa.concat_tables([self._table, self._open(path)])
+
+    def _write(self, table: pa.Table, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, self.SCHEMA) as writer:
+                writer.write_table(table)
+            sink.flush()
+            os.fsync(sink.fileno())
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def _from_dicts(cls, rows: List[Dict[str, Any]]) -> pa.Table:
+        columns = {name: [row.get(name) for row in rows] for name in cls.COLUMNS}
+        columns["extra"] = [
+            json.dumps(extra) if extra else None
+            for extra in ({k: v for k, v in row.items() if k not in cls.COLUMNS} for row in rows)
+        ]
+        return pa.Table.from_pydict(columns, schema=cls.SCHEMA)
+
+    @classmethod
+    def _to_dicts(cls, table: pa.Table) -> List[Dict[str, Any]]:
+        rows = table.to_pylist()
+        for row in rows:
+            extra = row.pop("extra")
+            if extra:
+                row.update(json.loads(extra))
+        return rows
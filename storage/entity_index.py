@@ -0,0 +1,167 @@
+import json
+import os
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Sequence, Tuple
+
+import numpy as np
+
+
+class EntityIndex:
+    """
+    Inverted index from lowercased entity names to the FaissChunkStore row ids of the
+    chunks mentioning them, kept next to the FAISS store.
+
+    Postings are stored in segments. Each segment holds one sorted int64 array per entity,
+    concatenated into a `postings-<n>.npy` file with an `offsets-<n>.npy` array, and is
+    memory-mapped on load. Boosting a candidate list is then one binary search per query
+    entity over NumPy arrays.
+
+    `save()` writes only the rows added since the previous save as a new segment, merging
+    it with the trailing segments that are not much larger, so ingest I/O stays
+    proportional to the rows added and the segment count logarithmic. `entities.json` is
+    the manifest: it names the live segments and is replaced last.
+    """
+
+    # A new segment absorbs trailing segments of at most this many times its size
+    MERGE_FACTOR = 2
+
+    def __init__(self, path: str = "data/entity_index"):
+        self.path = path
+        self.entity_ids: Dict[str, int] = {}
+        # (offsets, postings) of each saved segment, in row order
+        self.segments: List[Tuple[np.ndarray, np.ndarray]] = []
+        # Number of store rows already processed; rows below it are covered by the index
+        self.covered_rows = 0
+        self._manifest: Dict[str, Any] = {"segments": [], "next_segment": 1}
+        self._pending: Dict[str, List[int]] = defaultdict(list)
+
+        if os.path.exists(self._meta_path()):
+            self._load()
+
+    @staticmethod
+    def normalize(entity: str) -> str:
+        return " ".join(entity.lower().split())
+
+    def _meta_path(self) -> str:
+        return os.path.join(self.path, "entities.json")
+
+    def _load(self):
+        with open(self._meta_path(), "r") as f:
+            meta = json.load(f)
+        if "segments" not in meta:
+            # Indexes written before segments kept a single postings.npy / offsets.npy pair
+            meta["segments"] = [{"offsets": "offsets.npy", "postings": "postings.npy", "size": None}]
+            meta["next_segment"] = 1
+        self.entity_ids = {entity: i for i, entity in enumerate(meta["entities"])}
+        self.covered_rows = meta["covered_rows"]
+        self._manifest = {"segments": meta["segments"], "next_segment": meta["next_segment"]}
+        self.segments = []
+        for segment in meta["segments"]:
+            offsets = np.load(os.path.join(self.path, segment["offsets"]))
+            postings = np.load(os.path.join(self.path, segment["postings"]), mmap_mode="r")
+            segment["size"] = len(postings)
+            self.segments.append((offsets, postings))
+
+    def add(self, row_id: int, entities: Iterable[str]):
+        for entity in {self.normalize(e) for e in entities if e.strip()}:
+            self._pending[entity].append(row_id)
+        self.covered_rows = max(self.covered_rows, row_id + 1)
+
+    def add_many(self, row_ids: Sequence[int], entities: Sequence[Iterable[str]]):
+        for row_id, row_entities in zip(row_ids, entities):
+            self.add(row_id, row_entities)
+
+    def get_postings(self, entity: str) -> np.ndarray:
+        """Sorted row ids of chunks mentioning the entity (saved and pending)."""
+        entity = self.normalize(entity)
+        parts = []
+        entity_id = self.entity_ids.get(entity)
+        if entity_id is not None:
+            # Entities are only ever appended, so segments written earlier may not know it
+            parts = [postings[offsets[entity_id]:offsets[entity_id + 1]]
+                     for offsets, postings in self.segments if entity_id < len(offsets) - 1]
+        pending = self._pending.get(entity)
+        if pending:
+            parts.append(np.asarray(pending, dtype=np.int64))
+        if not parts:
+            return np.zeros(0, dtype=np.int64)
+        return parts[0] if len(parts) == 1 else np.unique(np.concatenate(parts))
+
+    def match_counts(self, candidate_ids: np.ndarray, entities: Sequence[str]) -> np.ndarray:
+        """
+        For each candidate row id, the number of query entities its chunk mentions.
+        """
+        candidate_ids = np.asarray(candidate_ids, dtype=np.int64)
+        counts = np.zeros(len(candidate_ids), dtype=np.float32)
+        for entity in {self.normalize(e) for e in entities}:
+            postings = self.get_postings(entity)
+            if not len(postings):
+                continue
+            positions = np.searchsorted(postings, candidate_ids)
+            counts += postings[np.minimum(positions, len(postings) - 1)] == candidate_ids
+        return counts
+
+    def save(self):
+        """
+        Writes the postings added since the last save as a new segment, merged with the
+        trailing segments it outgrows. Segment files are synced before `entities.json`
+        names them, so an interrupted save leaves the previous state intact.
+        """
+        if not self._pending:
+            self._write_meta(list(self.entity_ids), self._manifest)
+            return
+
+        for entity in self._pending:
+            self.entity_ids.setdefault(entity, len(self.entity_ids))
+        entities = list(self.entity_ids)
+
+        new_size = sum(len(rows) for rows in self._pending.values())
+        merged = len(self.segments)
+        while merged and self._manifest["segments"][merged - 1]["size"] <= self.MERGE_FACTOR * new_size:
+            merged -= 1
+            new_size += self._manifest["segments"][merged]["size"]
+
+        # (entity id, row id) pairs of the merged segments and the pending rows
+        entity_parts, row_parts = [], []
+        for offsets, postings in self.segments[merged:]:
+            entity_parts.append(np.repeat(np.arange(len(offsets) - 1), np.diff(offsets)))
+            row_parts.append(np.asarray(postings))
+        for entity, rows in self._pending.items():
+            entity_parts.append(np.full(len(rows), self.entity_ids[entity], dtype=np.int64))
+            row_parts.append(np.asarray(rows, dtype=np.int64))
+        entity_of = np.concatenate(entity_parts)
+        rows = np.concatenate(row_parts)
+        order = np.lexsort((rows, entity_of))
+        offsets = np.zeros(len(entities) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(entity_of, minlength=len(entities)))
+
+        os.makedirs(self.path, exist_ok=True)
+        number = self._manifest["next_segment"]
+        segment = {"offsets": f"offsets-{number:06d}.npy", "postings": f"postings-{number:06d}.npy",
+                   "size": len(rows)}
+        for name, array in ((segment["offsets"], offsets), (segment["postings"], rows[order])):
+            with open(os.path.join(self.path, name), "wb") as f:
+                np.save(f, array)
+                f.flush()
+                os.fsync(f.fileno())
+
+        stale = self._manifest["segments"][merged:]
+        manifest = {"segments": self._manifest["segments"][:merged] + [segment], "next_segment": number + 1}
+        self._write_meta(entities, manifest)
+
+        self._pending.clear()
+        self._load()
+        for old in stale:
+            for name in (old["offsets"], old["postings"]):
+                if os.path.exists(os.path.join(self.path, name)):
+                    os.remove(os.path.join(self.path, name))
+
+    def _write_meta(self, entities: List[str], manifest: Dict[str, Any]):
+        os.makedirs(self.path, exist_ok=True)
+        tmp_path = f"{self._meta_path()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"entities": entities, "covered_rows": self.covered_rows, **manifest}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._meta_path())
+        self._manifest = manifest
@@ -1,46 +1,335 @@
 import faiss
 import numpy as np
+import os
 import pickle
-from typing import List, Tuple
+from typing import Dict, List, Optional, Set, Tuple
+from storage.chunk_metadata_table import ChunkMetadataTable
+from storage.faiss_index_factory import build_index, metric_name, min_training_size, set_search_params
+from storage.segment_manifest import SegmentManifest, fsync_path, manifest_path_for
 
 
 class FaissChunkStore:
-    def __init__(self, dim: int, index_path: str = "data/faiss_index.bin", metadata_path: str = "data/metadata.pkl"):
+    def __init__(self,
+                 dim: int,
+                 index_path: str = "data/faiss_index.bin",
+                 metadata_path: str = "data/metadata.arrow",
+                 index_type: str = "flat",
+                 metric: str = "l2",
+                 nprobe: int = 16,
+                 ef_search: int = 64,
+                 train_size: Optional[int] = None,
+                 append_only: bool = False,
+                 compact_every: int = 32,
+                 **index_options):
+        """
+        :param index_type: "flat", "hnsw", "ivf_flat", "ivf_pq" or a raw faiss.index_factory string
+        :param metric: "l2" (scores are distances, lower is better) or "ip" (scores are
+                       inner products, higher is better; cosine for normalized vectors)
+        :param nprobe: Number of IVF lists visited per query
+        :param ef_search: HNSW candidate list size per query
+        :param train_size: Vectors to buffer before training an IVF/PQ index
+                           (defaults to 39 * nlist, FAISS's recommended minimum)
+        :param append_only: Make save() write only the chunks added since the last save as a
+                            new segment instead of rewriting the whole index and metadata
+        :param compact_every: Number of segments after which save() merges them into a new base
+        :param index_options: nlist, pq_m, pq_bits, hnsw_m for the index presets
+        An existing index on disk takes precedence over index_type and metric.
+        Chunk metadata lives in a memory-mapped Arrow file at metadata_path; a legacy
+        pickle with the same name and a .pkl suffix is converted on the next save().
+        Segments and their manifest are kept in a "<index name>_segments" directory.
+        """
         self.dim = dim
         self.index_path = index_path
         self.metadata_path = metadata_path
-        self.index = faiss.IndexFlatL2(dim)
-        self.metadata: List[str] = []
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.append_only = append_only
+        self.compact_every = compact_every
+        self.index = build_index(dim, index_type, metric, **index_options)
+        self.train_size = train_size or 39 * min_training_size(self.index)
+        self.metadata = ChunkMetadataTable(metadata_path)
+        self.manifest = SegmentManifest(manifest_path_for(index_path))
+        self._keys: Optional[Set[Tuple[str, int]]] = None
+        # Bumped whenever chunks are added, so query-side caches can tell their results are stale
+        self.version = 0
+        # Vectors waiting for an untrained IVF/PQ index to be trained, and an exact index
+        # over them so they are searchable in the meantime
+        self._untrained: List[np.ndarray] = []
+        self._untrained_index: Optional[faiss.Index] = None
+        # Vectors added since the last save, written out as the next segment
+        self._unsaved: List[np.ndarray] = []
 
         # Load if exists
         self._load()
+        set_search_params(self.index, nprobe=self.nprobe, ef_search=self.ef_search)
+
+    @staticmethod
+    def chunk_key(metadata: Dict) -> Tuple[str, int]:
+        """Dedup key of a chunk: its source article and position within it."""
+        return metadata["article_url"], metadata["chunk_id"]
+
+    @property
+    def metric(self) -> str:
+        return metric_name(self.index)
+
+    @property
+    def higher_is_better(self) -> bool:
+        """True when search scores are similarities rather than distances."""
+        return self.metric == "ip"
+
+    @property
+    def ntotal(self) -> int:
+        """Number of stored chunks, including ones buffered for index training."""
+        return len(self.metadata)
+
+    @property
+    def awaiting_training(self) -> bool:
+        """True while an IVF/PQ index buffers vectors until `train_size` of them exist."""
+        return bool(self._untrained)
+
+    @property
+    def keys(self) -> Set[Tuple[str, int]]:
+        """Dedup keys of all stored chunks, built on first use from the key columns only."""
+        if self._keys is None:
+            urls = self.metadata.column("article_url")
+            chunk_ids = self.metadata.column("chunk_id")
+            self._keys = set(zip(urls, chunk_ids))
+        return self._keys
 
     def add(self, embedding: np.ndarray, metadata: dict):
-        if metadata in self.metadata:
+        if not self.add_batch(np.asarray(embedding)[None, :], [metadata]):
             print(f"Chunk already exists. Skipping.")
+
+    def add_batch(self, embeddings: np.ndarray, metadatas: List[Dict]) -> List[int]:
+        """
+        Adds many chunks with a single FAISS call. Chunks whose key is already stored
+        (or repeated within the batch) are skipped.
+        Returns the row ids assigned to the chunks that were added.
+        """
+        embeddings = np.asarray(embeddings, dtype=np.float32)
+        if len(embeddings) != len(metadatas):
+            raise ValueError(f"Got {len(embeddings)} embeddings for {len(metadatas)} metadata rows")
+
+        keys = self.keys
+        keep = []
+        for i, metadata in enumerate(metadatas):
+            key = self.chunk_key(metadata)
+            if key in keys:
+                continue
+            keys.add(key)
+            keep.append(i)
+
+        if not keep:
+            return []
+
+        first_id = self.ntotal
+        vectors = np.ascontiguousarray(embeddings[keep])
+        self._add_vectors(vectors)
+        self._unsaved.append(vectors)
+        self.metadata.append(metadatas[i] for i in keep)
+        self.version += 1
+        return list(range(first_id, first_id + len(keep)))
+
+    def _add_vectors(self, vectors: np.ndarray):
+        if self.index.is_trained:
+            self.index.add(vectors)
+            return
+        self._untrained.append(vectors)
+        if sum(len(v) for v in self._untrained) >= self.train_size:
+            self.train()
             return
-        self.index.add(np.array([embedding], dtype=np.float32))
-        self.metadata.append(metadata)
+        if self._untrained_index is None:
+            self._untrained_index = faiss.IndexFlat(self.dim, self.index.metric_type)
+        self._untrained_index.add(vectors)
+
+    def train(self, sample: Optional[np.ndarray] = None):
+        """
+        Trains an IVF/PQ index and adds any vectors buffered while it was untrained.
+        Trains on `sample` when given, otherwise on the buffered vectors.
+        """
+        pending = np.concatenate(self._untrained) if self._untrained else np.empty((0, self.dim), np.float32)
+        if not self.index.is_trained:
+            training_set = pending if sample is None else np.asarray(sample, dtype=np.float32)
+            required = min_training_size(self.index)
+            if len(training_set) < required:
+                raise RuntimeError(
+                    f"Index needs at least {required} training vectors, got {len(training_set)}. "
+                    f"Add more chunks, pass a larger sample or use a smaller nlist."
+                )
+            self.index.train(np.ascontiguousarray(training_set))
+        if len(pending):
+            self.index.add(pending)
+        self._untrained = []
+        self._untrained_index = None
+
+    def set_search_params(self, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+        self.nprobe = nprobe or self.nprobe
+        self.ef_search = ef_search or self.ef_search
+        set_search_params(self.index, nprobe=self.nprobe, ef_search=self.ef_search)
 
-    def search(self, query_vector: np.ndarray, k: int = 5) -> List[Tuple[str, float]]:
-        D, I = self.index.search(np.array([query_vector], dtype=np.float32), k)
-        return [(self.metadata[i], float(D[0][j])) for j, i in enumerate(I[0]) if i < len(self.metadata)]
+    def search(self, query_vector: np.ndarray, k: int = 5) -> List[Tuple[Dict, float]]:
+        return self.search_batch(np.asarray(query_vector)[None, :], k)[0]
+
+    def search_batch(self, query_vectors: np.ndarray, k: int = 5) -> List[List[Tuple[Dict, float]]]:
+        """
+        Searches many queries with one FAISS call and materializes each distinct hit once.
+        Returns one (metadata, score) list per query row.
+        """
+        D, I = self.search_ids(query_vectors, k)
+        hits = [[(int(i), float(d)) for i, d in zip(ids, dists) if 0 <= i < self.ntotal] for ids, dists in zip(I, D)]
+        unique_ids = sorted({i for row in hits for i, _ in row})
+        rows = dict(zip(unique_ids, self.metadata.take(unique_ids)))
+        return [[(rows[i], score) for i, score in row] for row in hits]
+
+    def search_ids(self, query_vectors: np.ndarray, k: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Raw FAISS search over a (n, dim) query matrix: returns (scores, row ids), -1 for empty slots.
+        Never trains the index: vectors still buffered for training are scanned exactly and
+        merged with the results of the trained index.
+        """
+        query_vectors = np.ascontiguousarray(query_vectors, dtype=np.float32)
+        if self._untrained_index is None:
+            return self.index.search(query_vectors, k)
+
+        # Buffered vectors follow the rows already in the index
+        D, I = self._untrained_index.search(query_vectors, k)
+        I = np.where(I >= 0, I + self.index.ntotal, -1)
+        if self.index.ntotal:
+            D_index, I_index = self.index.search(query_vectors, k)
+            D, I = np.hstack([D_index, D]), np.hstack([I_index, I])
+            order = np.argsort(-D if self.higher_is_better else D, axis=1, kind="stable")[:, :k]
+            D, I = np.take_along_axis(D, order, axis=1), np.take_along_axis(I, order, axis=1)
+        return D, I
 
     def save(self):
+        """
+        Persists the store. In append-only mode only new chunks are written, as a segment,
+        and segments are merged once `compact_every` of them exist. Once a store has a
+        manifest, a regular save compacts into it so the manifest stays the source of truth.
+        """
+        if self.append_only:
+            self.flush()
+            if len(self.manifest.segments) >= self.compact_every and not self.awaiting_training:
+                self.compact()
+            return
+        if self.manifest.exists:
+            self.compact()
+            return
+
+        if self._untrained:
+            self.train()
         faiss.write_index(self.index, self.index_path)
-        with open(self.metadata_path, "wb") as f:
-            pickle.dump(self.metadata, f)
+        self.metadata.save(self.metadata_path)
+        self._unsaved = []
+
+    def flush(self) -> int:
+        """
+        Writes the chunks added since the last save as a new segment.
+        Returns the number of chunks written.
+        """
+        if not self._unsaved:
+            return 0
+        if not self.manifest.exists and not self.awaiting_training:
+            # The first flush writes everything loaded so far as the base generation
+            rows = self.ntotal - self.manifest.base_rows
+            self.compact()
+            return rows
+
+        names = self.manifest.new_segment_names()
+        vectors = np.concatenate(self._unsaved)
+        vectors_path = self.manifest.file_path(names["vectors"])
+        os.makedirs(self.manifest.directory, exist_ok=True)
+        with open(f"{vectors_path}.tmp", "wb") as f:
+            np.save(f, vectors)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(f"{vectors_path}.tmp", vectors_path)
+        rows = self.metadata.save_pending(self.manifest.file_path(names["metadata"]))
+
+        self.manifest.segments.append({**names, "rows": rows})
+        self.manifest.next_segment += 1
+        self.manifest.save()
+        self._unsaved = []
+        return rows
+
+    def compact(self):
+        """
+        Merges the base and all segments into a new base generation and drops the segments.
+        An index still waiting for `train_size` vectors cannot be compacted, since that would
+        train it on a small sample for good; its segments keep the buffered vectors instead.
+        """
+        if self.awaiting_training:
+            buffered = sum(len(v) for v in self._untrained)
+            raise RuntimeError(
+                f"Index is untrained and has {buffered} of the {self.train_size} vectors it trains on; "
+                f"add more chunks or call train() first."
+            )
+        stale_files = self.manifest.referenced_files()
+
+        names = self.manifest.new_base_names()
+        index_path = self.manifest.file_path(names["index"])
+        os.makedirs(self.manifest.directory, exist_ok=True)
+        faiss.write_index(self.index, f"{index_path}.tmp")
+        fsync_path(f"{index_path}.tmp")
+        os.replace(f"{index_path}.tmp", index_path)
+        self.metadata.save(self.manifest.file_path(names["metadata"]))
+
+        self.manifest.base_index = names["index"]
+        self.manifest.base_metadata = names["metadata"]
+        self.manifest.base_rows = self.ntotal
+        self.manifest.generation += 1
+        self.manifest.segments = []
+        self.manifest.save()
+        self._unsaved = []
+
+        for path in stale_files:
+            if os.path.exists(path):
+                os.remove(path)
 
     def _load(self):
+        if self.manifest.exists:
+            self._load_manifest()
+            return
+
         try:
             self.index = faiss.read_index(self.index_path)
-            with open(self.metadata_path, "rb") as f:
-                self.metadata = pickle.load(f)
         except Exception:
             print("No existing FAISS index found. Starting fresh.")
+            return
+
+        legacy_path = os.path.splitext(self.metadata_path)[0] + ".pkl"
+        if not len(self.metadata) and os.path.exists(legacy_path):
+            with open(legacy_path, "rb") as f:
+                self.metadata.append(pickle.load(f))
+            self._unsaved.append(np.empty((0, self.dim), np.float32))  # marks the store as dirty
+            print(f"Loaded legacy metadata from {legacy_path}; it will be converted on save().")
+
+    def _load_manifest(self):
+        manifest = self.manifest.load()
+        if manifest.base_index:
+            self.index = faiss.read_index(manifest.file_path(manifest.base_index))
+            self.metadata = ChunkMetadataTable(manifest.file_path(manifest.base_metadata))
+        else:
+            self.metadata = ChunkMetadataTable(manifest.file_path("empty.arrow"))
+        if self.index.ntotal != manifest.base_rows or len(self.metadata) != manifest.base_rows:
+            raise RuntimeError(
+                f"Base of {manifest.path} expects {manifest.base_rows} rows, found "
+                f"{self.index.ntotal} vectors and {len(self.metadata)} metadata rows"
+            )
+
+        for segment in manifest.segments:
+            vectors = np.load(manifest.file_path(segment["vectors"]), mmap_mode="r")
+            self._add_vectors(np.ascontiguousarray(vectors, dtype=np.float32))
+            self.metadata.attach(manifest.file_path(segment["metadata"]))
+        print(f"Loaded {self.ntotal} chunks from {manifest.path} ({len(manifest.segments)} segments)")
+
+    def get_rows(self, ids: List[int]) -> List[Dict]:
+        """Materializes metadata for the given row ids."""
+        return self.metadata.take(ids)
 
     def get_all_urls(self) -> list[str]:
-        return [meta['article_url'] for meta in self.metadata]
-    
-    def get_metadata(self):
-        return self.metadata
\ No newline at end of file
+        return self.metadata.column("article_url")
+
+    def get_metadata(self) -> List[Dict]:
+        """Materializes metadata of every chunk. Avoid on large stores."""
+        return self.metadata.to_list()
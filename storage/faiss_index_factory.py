@@ -0,0 +1,78 @@
+import faiss
+from typing import Optional
+
+
+# Named presets for FaissChunkStore(index_type=...). Any other string is passed to
+# faiss.index_factory unchanged, e.g. "IVF4096,PQ64x8" or "HNSW48,Flat".
+INDEX_PRESETS = {
+    "flat": "Flat",
+    "hnsw": "HNSW{hnsw_m}",
+    "ivf_flat": "IVF{nlist},Flat",
+    "ivf_pq": "IVF{nlist},PQ{pq_m}x{pq_bits}",
+}
+
+METRICS = {
+    "l2": faiss.METRIC_L2,
+    "ip": faiss.METRIC_INNER_PRODUCT,
+}
+
+
+def factory_string(index_type: str = "flat", nlist: int = 1024, pq_m: int = 48,
+                   pq_bits: int = 8, hnsw_m: int = 32) -> str:
+    """
+    Resolves a preset name (see INDEX_PRESETS) into a faiss.index_factory description.
+    """
+    template = INDEX_PRESETS.get(index_type, index_type)
+    return template.format(nlist=nlist, pq_m=pq_m, pq_bits=pq_bits, hnsw_m=hnsw_m)
+
+
+def build_index(dim: int, index_type: str = "flat", metric: str = "l2", **options) -> faiss.Index:
+    """
+    Builds an empty FAISS index.
+
+    :param dim: Vector dimensionality
+    :param index_type: Preset name ("flat", "hnsw", "ivf_flat", "ivf_pq") or a raw factory string
+    :param metric: "l2" for distances (lower is better) or "ip" for inner product (higher is better)
+    :param options: nlist, pq_m, pq_bits, hnsw_m overrides for the presets
+    """
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}', expected one of {sorted(METRICS)}")
+    return faiss.index_factory(dim, factory_string(index_type, **options), METRICS[metric])
+
+
+def metric_name(index: faiss.Index) -> str:
+    return "ip" if index.metric_type == faiss.METRIC_INNER_PRODUCT else "l2"
+
+
+def min_training_size(index: faiss.Index) -> int:
+    """
+    Smallest number of vectors FAISS accepts to train this index (0 if no training is needed).
+    """
+    if index.is_trained:
+        return 0
+    required = 1
+    try:
+        required = faiss.extract_index_ivf(index).nlist
+    except RuntimeError:
+        pass
+    pq = getattr(faiss.downcast_index(index), "pq", None)
+    if pq is not None:
+        required = max(required, 1 << pq.nbits)
+    return required
+
+
+def set_search_params(index: faiss.Index, nprobe: Optional[int] = None, ef_search: Optional[int] = None):
+    """
+    Applies query-time knobs. Parameters that do not apply to the index type are ignored.
+    """
+    params = faiss.ParameterSpace()
+    if nprobe is not None:
+        try:
+            params.set_index_parameter(index, "nprobe", nprobe)
+        except RuntimeError:
+            pass
+    if ef_search is not None:
+        try:
+            params.set_index_parameter(index, "efSearch", ef_search)
+        except RuntimeError:
+            pass
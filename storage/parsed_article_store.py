@@ -1,28 +1,95 @@
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, Iterator, List, Optional
 from pathlib import Path
 from utils.logger import setup_logger
 
 logger = setup_logger(__name__)
 
 class ParsedArticleStore:
-    def __init__(self, path: str = "data/parsed_articles.json"):
+    """
+    Parsed articles stored as JSON Lines, one article per line.
+
+    New articles and updates are appended to the end of the file; an in-memory
+    URL -> byte offset index points at the latest line for each URL, so adds are O(1)
+    and articles are read from disk only when requested. Updated articles leave their
+    old line behind until `compact` rewrites the file.
+    """
+
+    def __init__(self, path: str = "data/parsed_articles.jsonl", read_only: bool = False):
+        """
+        :param read_only: Open the file for reading only, for callers that never add
+                          articles; nothing is created or converted on disk
+        """
         self.path = Path(path)
-        self.articles: List[Dict[str, Any]] = []
+        self.read_only = read_only
+        self.offsets: Dict[str, int] = {}
+        self.stale_lines = 0
+
+        legacy_path = self.path.with_suffix(".json")
+        if not self.path.exists() and legacy_path != self.path and legacy_path.exists():
+            if read_only:
+                logger.warning(f"{legacy_path} has not been converted to {self.path} yet; open the store writable to convert it")
+            else:
+                self._convert_legacy(legacy_path)
 
-        if self.path.exists():
-            with open(self.path, "r") as f:
-                self.articles = json.load(f)
-            logger.info(f"Loaded {len(self.articles)} articles from {self.path}")
+        if read_only:
+            self._file = open(self.path, "rb") if self.path.exists() else None
+        else:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            self._file = open(self.path, "a+b")
+
+        if self._file is not None and self.path.stat().st_size:
+            self._build_index()
+            logger.info(f"Loaded {len(self.offsets)} articles from {self.path}")
         else:
             logger.info(f"No existing file at {self.path}, starting fresh.")
 
-    def find_index_by_url(self, url: str) -> int:
-        """Return index of article with matching URL, or -1 if not found."""
-        for i, item in enumerate(self.articles):
-            if item.get("url") == url:
-                return i
-        return -1
+    def _build_index(self):
+        self.offsets = {}
+        self.stale_lines = 0
+        self._file.seek(0)
+        offset = 0
+        for line in self._file:
+            if line.strip():
+                try:
+                    url = json.loads(line)["url"]
+                except (ValueError, KeyError):
+                    # A torn final line from an interrupted write; compact() drops it
+                    logger.warning(f"Skipping unreadable line at byte {offset} in {self.path}")
+                    self.stale_lines += 1
+                else:
+                    if url in self.offsets:
+                        self.stale_lines += 1
+                    self.offsets[url] = offset
+            offset += len(line)
+        if offset and not line.endswith(b"\n") and not self.read_only:
+            self._file.write(b"\n")
+
+    def _convert_legacy(self, legacy_path: Path):
+        with open(legacy_path, "r") as f:
+            articles = json.load(f)
+        with open(self.path, "w") as f:
+            for article in articles:
+                f.write(json.dumps(article) + "\n")
+        logger.info(f"Converted {len(articles)} articles from {legacy_path} to {self.path}")
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __contains__(self, url: str) -> bool:
+        return url in self.offsets
+
+    def urls(self) -> List[str]:
+        """URLs of all stored articles, in the order they were first added."""
+        return list(self.offsets)
+
+    def get(self, url: str) -> Optional[Dict[str, Any]]:
+        """Read one article from disk, or None if the URL is not stored."""
+        offset = self.offsets.get(url)
+        if offset is None:
+            return None
+        self._file.seek(offset)
+        return json.loads(self._file.readline())
 
     def add_article(self, article_data: Dict[str, Any], update: bool = False) -> bool:
         """
@@ -34,26 +101,60 @@ class ParsedArticleStore:
             logger.warning(f"Invalid article data, missing keys: {required_keys - set(article_data)}")
             return False
 
-        idx = self.find_index_by_url(article_data["url"])
-        if idx >= 0:
-            if update:
-                self.articles[idx] = article_data
-                logger.info(f"Updated article with URL: {article_data['url']}")
-                return True
-            logger.info(f"Skipped duplicate article with URL: {article_data['url']}")
+        if self.read_only:
+            raise RuntimeError(f"{self.path} was opened read-only")
+
+        url = article_data["url"]
+        exists = url in self.offsets
+        if exists and not update:
+            logger.info(f"Skipped duplicate article with URL: {url}")
             return False
 
-        self.articles.append(article_data)
-        logger.info(f"Added new article with URL: {article_data['url']}")
+        self._file.seek(0, 2)
+        self.offsets[url] = self._file.tell()
+        self._file.write((json.dumps(article_data) + "\n").encode("utf-8"))
+
+        if exists:
+            self.stale_lines += 1
+            logger.info(f"Updated article with URL: {url}")
+        else:
+            logger.info(f"Added new article with URL: {url}")
         return True
 
     def save(self) -> None:
-        """Save all stored articles to disk."""
-        self.path.parent.mkdir(parents=True, exist_ok=True)
-        with open(self.path, "w") as f:
-            json.dump(self.articles, f, indent=2)
-        logger.info(f"Saved {len(self.articles)} articles to {self.path}")
+        """Flush appended articles to disk."""
+        if not self.read_only:
+            self._file.flush()
+
+    def compact(self) -> None:
+        """Rewrite the file with only the latest line of every article."""
+        if self.read_only:
+            raise RuntimeError(f"{self.path} was opened read-only")
+        self.save()
+        tmp_path = self.path.with_suffix(self.path.suffix + ".tmp")
+        with open(tmp_path, "w") as f:
+            for article in self.load():
+                f.write(json.dumps(article) + "\n")
+        self._file.close()
+        tmp_path.replace(self.path)
+        self._file = open(self.path, "a+b")
+        self._build_index()
+        logger.info(f"Compacted {len(self.offsets)} articles in {self.path}")
+
+    def close(self) -> None:
+        """Flush appended articles and close the file handle."""
+        if self._file is not None:
+            self.save()
+            self._file.close()
+            self._file = None
+
+    def __enter__(self) -> "ParsedArticleStore":
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
 
-    def load(self) -> List[Dict[str, Any]]:
-        """Load parsed articles from memory."""
-        return self.articles
\ No newline at end of file
+    def load(self) -> Iterator[Dict[str, Any]]:
+        """Stream parsed articles from disk, one at a time."""
+        for url in list(self.offsets):
+            yield self.get(url)
@@ -0,0 +1,103 @@
+import json
+import os
+from typing import Any, Dict, List, Optional
+from storage.chunk_metadata_table import ChunkMetadataTable
+
+
+def fsync_path(path: str):
+    """Flushes a file that was written by a library without exposing its handle."""
+    with open(path, "rb+") as f:
+        os.fsync(f.fileno())
+
+
+def manifest_path_for(index_path: str) -> str:
+    """Manifest location of the append-only store whose legacy index lives at index_path."""
+    return os.path.join(os.path.splitext(index_path)[0] + "_segments", "manifest.json")
+
+
+class SegmentManifest:
+    """
+    Crash-safe description of an append-only FAISS store: a base index with its metadata
+    file, followed by segments of vectors and metadata rows appended since the base was written.
+
+    Data files are always written and synced before the manifest that references them, and
+    the manifest itself is replaced atomically, so after a crash the store reopens at the
+    last completed flush. Files not listed in the manifest are leftovers and can be deleted.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = path
+        self.directory = os.path.dirname(path) or "."
+        self.base_index: Optional[str] = None
+        self.base_metadata: Optional[str] = None
+        self.base_rows = 0
+        self.generation = 0
+        self.segments: List[Dict[str, Any]] = []
+        self.next_segment = 1
+
+    @property
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    @property
+    def total_rows(self) -> int:
+        return self.base_rows + sum(seg["rows"] for seg in self.segments)
+
+    def file_path(self, name: str) -> str:
+        return os.path.join(self.directory, name)
+
+    def new_segment_names(self) -> Dict[str, str]:
+        stem = f"seg-{self.next_segment:06d}"
+        return {"vectors": f"{stem}.npy", "metadata": f"{stem}.arrow"}
+
+    def new_base_names(self) -> Dict[str, str]:
+        stem = f"base-{self.generation + 1:06d}"
+        return {"index": f"{stem}.index", "metadata": f"{stem}.arrow"}
+
+    def load(self) -> "SegmentManifest":
+        with open(self.path, "r") as f:
+            data = json.load(f)
+        if data.get("version") != self.VERSION:
+            raise ValueError(f"Unsupported manifest version {data.get('version')} in {self.path}")
+        self.base_index = data["base_index"]
+        self.base_metadata = data["base_metadata"]
+        self.base_rows = data["base_rows"]
+        self.generation = data["generation"]
+        self.segments = data["segments"]
+        self.next_segment = data["next_segment"]
+        return self
+
+    def save(self):
+        os.makedirs(self.directory, exist_ok=True)
+        data = {
+            "version": self.VERSION,
+            "base_index": self.base_index,
+            "base_metadata": self.base_metadata,
+            "base_rows": self.base_rows,
+            "generation": self.generation,
+            "segments": self.segments,
+            "next_segment": self.next_segment,
+        }
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def open_metadata(self) -> ChunkMetadataTable:
+        """
+        Chunk metadata of the base and all segments, without reading any vectors.
+        Lets tools inspect a store without importing FAISS or loading the index.
+        """
+        metadata = ChunkMetadataTable(self.file_path(self.base_metadata or "empty.arrow"))
+        for segment in self.segments:
+            metadata.attach(self.file_path(segment["metadata"]))
+        return metadata
+
+    def referenced_files(self) -> List[str]:
+        names = [seg[kind] for seg in self.segments for kind in ("vectors", "metadata")]
+        names += [name for name in (self.base_index, self.base_metadata) if name]
+        return [self.file_path(name) for name in names]
@@ -0,0 +1,110 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import answer_generator
+from answer_generator import AnswerGenerator
+from processors.context_packer import ContextPacker
+from processors.token_counter import TokenCounter
+from utils.metrics import metrics
+
+
+PIECES = ["Nvidia ", "makes ", "chips."]
+
+
+class WordTokenizer:
+    def encode(self, text):
+        return text.split()
+
+
+class RecordingAnswerCache:
+    """SemanticAnswerCache stand-in that never hits and records what is stored."""
+
+    def __init__(self):
+        self.stored = []
+
+    def get(self, query, results, model):
+        return None
+
+    def put(self, query, results, model, answer):
+        self.stored.append(answer)
+
+
+def make_handler(release, sent):
+    """
+    Fake OpenAI-compatible streaming endpoint: sends the first piece, waits until `release`
+    is set, then sends the remaining pieces and a choice-less usage chunk. Every piece
+    written is appended to `sent`.
+    """
+    class FakeChatCompletions(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def send_chunk(self, payload):
+            base = {"id": "chatcmpl-test", "object": "chat.completion.chunk", "created": 0, "model": "gpt-4o"}
+            self.wfile.write(f"data: {json.dumps({**base, **payload})}\n\n".encode())
+            self.wfile.flush()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers["Content-Length"]))
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.end_headers()
+            for i, piece in enumerate(PIECES):
+                if i == 1:
+                    release.wait(timeout=5)
+                self.send_chunk({"choices": [{"index": 0, "finish_reason": None, "delta": {"content": piece}}]})
+                sent.append(piece)
+            self.send_chunk({"choices": [], "usage": {"prompt_tokens": 42, "completion_tokens": 3, "total_tokens": 45}})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+            self.close_connection = True
+
+    return FakeChatCompletions
+
+
+@pytest.fixture
+def release():
+    return threading.Event()
+
+
+@pytest.fixture
+def sent():
+    return []
+
+
+@pytest.fixture
+def generator(monkeypatch, release, sent):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(release, sent))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    # Count words instead of loading a tiktoken encoding, which needs network access
+    monkeypatch.setattr(answer_generator, "ContextPacker",
+                        lambda max_tokens, model: ContextPacker(max_tokens, model, TokenCounter.wrap(WordTokenizer())))
+    yield AnswerGenerator(base_url=f"http://127.0.0.1:{server.server_port}/v1", answer_cache=RecordingAnswerCache())
+    release.set()
+    server.shutdown()
+    server.server_close()
+
+
+def test_pieces_are_yielded_as_they_arrive(generator, release, sent):
+    stream = generator.generate_stream("Who makes chips?", [])
+    with metrics.collect() as breakdown:
+        # The server holds the rest of the answer back until the first piece has been received
+        assert next(stream) == PIECES[0]
+        assert sent == PIECES[:1]
+        assert generator.last_time_to_first_token is not None
+        assert "generator.time_to_first_token" in breakdown
+        assert generator.answer_cache.stored == []
+        release.set()
+        assert list(stream) == PIECES[1:]
+
+
+def test_usage_is_recorded_and_answer_cached_after_completion(generator, release):
+    release.set()
+    assert "".join(generator.generate_stream("Who makes chips?", [])) == "".join(PIECES)
+    assert generator.last_input_tokens == 42
+    assert generator.answer_cache.stored == ["".join(PIECES)]
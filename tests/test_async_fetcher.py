@@ -0,0 +1,149 @@
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from aiohttp import web
+
+from scrapers.async_fetcher import AsyncFetcher, BlockingFetcher
+
+
+class StandInServer:
+    """
+    Local HTTP server on its own event loop thread that records when every request started.
+
+    /page/{name}                  200 after `delay` seconds, counting requests in flight
+    /status/{code}/{fails}/{name} `code` for the first `fails` requests, then 200
+    /slow/{fails}/{name}          hangs for a second on the first `fails` requests, then 200
+    """
+
+    def __init__(self, delay: float = 0.05):
+        self.delay = delay
+        self.starts = defaultdict(list)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self._thread.start()
+        self.port = asyncio.run_coroutine_threadsafe(self._start(), self.loop).result()
+
+    async def _start(self) -> int:
+        app = web.Application()
+        app.router.add_get("/page/{name}", self.page)
+        app.router.add_get("/status/{code}/{fails}/{name}", self.status)
+        app.router.add_get("/slow/{fails}/{name}", self.slow)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, "127.0.0.1", 0)
+        await site.start()
+        return site._server.sockets[0].getsockname()[1]
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self.port}{path}"
+
+    def attempts(self, path: str) -> int:
+        return len(self.starts[path])
+
+    def _record(self, request: web.Request) -> int:
+        self.starts[request.path].append(time.monotonic())
+        return len(self.starts[request.path])
+
+    async def page(self, request: web.Request) -> web.Response:
+        self._record(request)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return web.Response(body=request.match_info["name"].encode())
+
+    async def status(self, request: web.Request) -> web.Response:
+        attempt = self._record(request)
+        if attempt <= int(request.match_info["fails"]):
+            return web.Response(status=int(request.match_info["code"]))
+        return web.Response(body=b"ok")
+
+    async def slow(self, request: web.Request) -> web.Response:
+        attempt = self._record(request)
+        if attempt <= int(request.match_info["fails"]):
+            await asyncio.sleep(1.0)
+        return web.Response(body=b"ok")
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self.runner.cleanup(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+
+
+@pytest.fixture
+def server():
+    server = StandInServer()
+    yield server
+    server.close()
+
+
+def gaps(starts):
+    return [b - a for a, b in zip(starts, starts[1:])]
+
+
+def test_requests_in_flight_are_capped(server):
+    fetcher = AsyncFetcher(concurrency=3, per_host_rate=0)
+    urls = [server.url(f"/page/{i}") for i in range(12)]
+    bodies = fetcher.fetch_all(urls)
+    assert bodies == {url: str(i).encode() for i, url in enumerate(urls)}
+    assert server.max_in_flight == 3
+
+
+def test_request_starts_to_one_host_are_spaced(server):
+    fetcher = AsyncFetcher(concurrency=10, per_host_rate=20)
+    fetcher.fetch_all([server.url(f"/page/{i}") for i in range(5)])
+    starts = sorted(t for path in server.starts for t in server.starts[path])
+    assert len(starts) == 5
+    assert min(gaps(starts)) >= 0.04
+
+
+@pytest.mark.parametrize("code", [429, 500, 503])
+def test_retryable_statuses_are_retried_with_backoff(server, code):
+    fetcher = AsyncFetcher(per_host_rate=0, max_retries=3, retry_backoff=0.05)
+    path = f"/status/{code}/2/a"
+    assert fetcher.fetch_all([server.url(path)]) == {server.url(path): b"ok"}
+    assert server.attempts(path) == 3
+    first, second = gaps(server.starts[path])
+    assert first >= 0.05 and second >= 0.1
+
+
+def test_gives_up_after_max_retries(server):
+    fetcher = AsyncFetcher(per_host_rate=0, max_retries=3, retry_backoff=0.01)
+    path = "/status/502/10/a"
+    assert fetcher.fetch_all([server.url(path)]) == {server.url(path): None}
+    assert server.attempts(path) == 3
+
+
+def test_timeouts_are_retried(server):
+    fetcher = AsyncFetcher(per_host_rate=0, max_retries=3, retry_backoff=0.01, timeout=0.2)
+    path = "/slow/1/a"
+    assert fetcher.fetch_all([server.url(path)]) == {server.url(path): b"ok"}
+    assert server.attempts(path) == 2
+
+
+@pytest.mark.parametrize("code", [403, 404, 410])
+def test_other_client_errors_are_not_retried(server, code):
+    fetcher = AsyncFetcher(per_host_rate=0, max_retries=3, retry_backoff=0.01)
+    path = f"/status/{code}/10/a"
+    assert fetcher.fetch_all([server.url(path)]) == {server.url(path): None}
+    assert server.attempts(path) == 1
+
+
+def test_blocking_fetcher_shares_limits_across_threads(server):
+    urls = [server.url(f"/page/{i}") for i in range(8)] + [server.url("/status/503/1/a")]
+    with BlockingFetcher(AsyncFetcher(concurrency=2, per_host_rate=0, retry_backoff=0.01)) as fetcher:
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            bodies = list(pool.map(fetcher.fetch, urls))
+    assert bodies == [str(i).encode() for i in range(8)] + [b"ok"]
+    assert server.max_in_flight == 2
+    assert server.attempts("/status/503/1/a") == 2
+    assert fetcher.loop.is_closed()
@@ -0,0 +1,76 @@
+import numpy as np
+import pytest
+
+from query_engine import QueryEngine
+from storage.entity_index import EntityIndex
+
+
+POOL = 50
+
+
+class RankedStore:
+    """FaissChunkStore stand-in whose dense search ranks rows 0, 1, 2, ... best first."""
+
+    version = 0
+    higher_is_better = True
+    ntotal = POOL
+
+    def search_ids(self, query_vectors, k=5):
+        ids = np.tile(np.arange(k, dtype=np.int64), (len(query_vectors), 1))
+        scores = np.tile(np.linspace(0.9, 0.5, k, dtype=np.float32), (len(query_vectors), 1))
+        return scores, ids
+
+    def get_rows(self, ids):
+        return [{"chunk_id": int(i), "text": f"chunk {i}"} for i in ids]
+
+
+class RankedBM25:
+    """BM25Index stand-in that agrees with the dense ranking."""
+
+    def search(self, query, k=10):
+        return np.linspace(12.0, 1.0, k, dtype=np.float32), np.arange(k, dtype=np.int64)
+
+
+class Embedder:
+    def embed_text(self, text):
+        return np.ones(4, dtype=np.float32)
+
+
+class Extractor:
+    nlp = None
+
+    def extract(self, text):
+        return ["Nvidia"]
+
+
+def make_engine(tmp_path, mentioning, fusion="rrf"):
+    entity_index = EntityIndex(str(tmp_path / "entities"))
+    entity_index.add_many(mentioning, [["Nvidia"]] * len(mentioning))
+    return QueryEngine(RankedStore(), Embedder(), entity_index=entity_index, rerank_pool=POOL,
+                       bm25_index=RankedBM25(), fusion=fusion, entity_extractor=Extractor())
+
+
+def ranked_ids(engine, top_k):
+    return [row["chunk_id"] for row, _ in engine.query("Nvidia chips", top_k=top_k)["results"]]
+
+
+@pytest.mark.parametrize("fusion", QueryEngine.FUSION_MODES)
+def test_low_ranked_entity_match_does_not_displace_top_hit(tmp_path, fusion):
+    engine = make_engine(tmp_path, mentioning=[POOL - 1], fusion=fusion)
+    assert ranked_ids(engine, top_k=1) == [0]
+
+
+def test_entity_match_lifts_a_close_candidate(tmp_path):
+    engine = make_engine(tmp_path, mentioning=[1])
+    assert ranked_ids(engine, top_k=2) == [1, 0]
+
+
+def test_changing_a_result_does_not_change_the_cache(tmp_path):
+    engine = make_engine(tmp_path, mentioning=[1])
+    first = engine.query("Nvidia chips", top_k=2)
+    first["results"][0][0]["text"] = "edited"
+    first["results"].clear()
+    first["entities"].append("AMD")
+    for again in (engine.query("Nvidia chips", top_k=2), engine.query_batch(["Nvidia chips"], top_k=2)[0]):
+        assert [row["text"] for row, _ in again["results"]] == ["chunk 1", "chunk 0"]
+        assert again["entities"] == ["Nvidia"]
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import tempfile
+from typing import Optional
+
+import requests
+
+
+class ImageCache:
+    """
+    Content-addressed on-disk cache of downloaded images.
+
+    Image bytes are stored once under their SHA-256 digest in `objects/`, and each URL
+    maps to the digest of its content through a small file in `urls/`. Images shared by
+    several URLs are stored once, and callers can key derived results (OCR text,
+    embeddings) by the content hash instead of the URL.
+    """
+
+    def __init__(self, cache_dir: str = "cache/images", timeout: int = 5):
+        """
+        :param timeout: Timeout for image download requests.
+        """
+        self.cache_dir = cache_dir
+        self.timeout = timeout
+
+    def _url_path(self, url: str) -> str:
+        return os.path.join(self.cache_dir, "urls", hashlib.sha1(url.encode("utf-8")).hexdigest())
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "objects", digest)
+
+    def cached_digest(self, url: str) -> Optional[str]:
+        """Content hash of a previously downloaded URL, without touching the network."""
+        try:
+            with open(self._url_path(url), "r") as f:
+                digest = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return digest if os.path.exists(self.object_path(digest)) else None
+
+    def digest(self, url: str) -> Optional[str]:
+        """Content hash of the image at `url`, downloading it on first use. None if it cannot be fetched."""
+        digest = self.cached_digest(url)
+        if digest:
+            return digest
+
+        try:
+            response = requests.get(url, timeout=self.timeout)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"[Image Error] Failed to download image from {url}: {e}")
+            return None
+
+        content = response.content
+        digest = hashlib.sha256(content).hexdigest()
+        self._write_atomic(self.object_path(digest), content)
+        self._write_atomic(self._url_path(url), digest.encode("ascii"))
+        return digest
+
+    def get_bytes(self, url: str) -> Optional[bytes]:
+        digest = self.digest(url)
+        if digest is None:
+            return None
+        with open(self.object_path(digest), "rb") as f:
+            return f.read()
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        # Directories are created on first write, so merely constructing a cache leaves nothing behind
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # A unique temp file per call: threads of one process may write the same object at once
+        with tempfile.NamedTemporaryFile(dir=os.path.dirname(path), suffix=".tmp", delete=False) as f:
+            f.write(data)
+        os.replace(f.name, path)
@@ -0,0 +1,167 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, Iterator, List
+
+
+class Histogram:
+    """
+    Latency histogram: exact count and sum, with p50/p95/p99 computed over the most
+    recent `window` observations.
+    """
+
+    QUANTILES = (0.5, 0.95, 0.99)
+
+    def __init__(self, window: int = 2048):
+        self.count = 0
+        self.total = 0.0
+        self._recent: deque = deque(maxlen=window)
+
+    def observe(self, value: float):
+        self.count += 1
+        self.total += value
+        self._recent.append(value)
+
+    def quantiles(self) -> Dict[float, float]:
+        if not self._recent:
+            return {q: 0.0 for q in self.QUANTILES}
+        ordered = sorted(self._recent)
+        return {q: ordered[min(len(ordered) - 1, int(q * len(ordered)))] for q in self.QUANTILES}
+
+    def snapshot(self) -> Dict[str, float]:
+        q = self.quantiles()
+        return {"count": self.count, "sum": self.total, "p50": q[0.5], "p95": q[0.95], "p99": q[0.99]}
+
+
+class Metrics:
+    """
+    In-process registry of counters and latency histograms.
+
+    `timer(name)` / `timed(name)` record durations in seconds into the histogram `name`;
+    `inc(name, n)` bumps a counter. Inside `collect()`, every timer finished on the same
+    thread is also added to the collected breakdown, which is how per-request stage
+    timings are captured. Export with `to_prometheus`, `write_json` or `serve`.
+    """
+
+    def __init__(self):
+        self.counters: Dict[str, float] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    def inc(self, name: str, value: float = 1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def observe(self, name: str, seconds: float):
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram()
+            histogram.observe(seconds)
+        for trace in getattr(self._local, "traces", ()):
+            trace[name] = trace.get(name, 0.0) + seconds
+
+    @contextmanager
+    def timer(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def timed(self, name: str) -> Callable:
+        """Decorator form of `timer`."""
+        def decorator(fn: Callable) -> Callable:
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    @contextmanager
+    def collect(self) -> Iterator[Dict[str, float]]:
+        """Collects {timer name: seconds} of all timers finished on this thread inside the block."""
+        traces: List[Dict[str, float]] = self._local.__dict__.setdefault("traces", [])
+        trace: Dict[str, float] = {}
+        traces.append(trace)
+        try:
+            yield trace
+        finally:
+            traces.remove(trace)
+
+    def reset(self):
+        with self._lock:
+            self.counters.clear()
+            self.histograms.clear()
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "counters": dict(self.counters),
+                "histograms": {name: h.snapshot() for name, h in self.histograms.items()},
+            }
+
+    @staticmethod
+    def _prometheus_name(name: str) -> str:
+        return "rag_" + "".join(c if c.isalnum() else "_" for c in name)
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition: counters as counters, histograms as summaries in seconds."""
+        snapshot = self.snapshot()
+        lines = []
+        for name, value in sorted(snapshot["counters"].items()):
+            metric = self._prometheus_name(name) + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, h in sorted(snapshot["histograms"].items()):
+            metric = self._prometheus_name(name) + "_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for q in Histogram.QUANTILES:
+                lines.append(f'{metric}{{quantile="{q}"}} {h[f"p{round(q * 100)}"]}')
+            lines += [f"{metric}_count {h['count']}", f"{metric}_sum {h['sum']}"]
+        return "\n".join(lines) + "\n"
+
+    def write_json(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+    def serve(self, port: int = 9100, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+        """
+        Serves /metrics (Prometheus text) and /metrics.json from a daemon thread.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path == "/metrics":
+                    body, content_type = metrics.to_prometheus().encode(), "text/plain; version=0.0.4"
+                elif self.path == "/metrics.json":
+                    body, content_type = json.dumps(metrics.snapshot()).encode(), "application/json"
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+
+# Process-wide registry used by the instrumented modules
+metrics = Metrics()
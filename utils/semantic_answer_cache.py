@@ -0,0 +1,111 @@
+import json
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from utils.lru_cache import LRUCache
+
+
+class SemanticAnswerCache:
+    """
+    Cache of generated answers, looked up by question similarity.
+
+    An answer is reused when it was generated by the same model from the same sources and
+    its question embedding has cosine similarity >= `threshold` with the new question.
+    Sources are compared as the ordered list of (article_url, chunk_id), since answers
+    cite them by position. Entries are evicted least recently used first and the cache is
+    persisted to `path` after every new answer.
+    """
+
+    def __init__(self, embed: Callable[[str], np.ndarray], path: str = "cache/answers.npz",
+                 threshold: float = 0.95, max_entries: int = 1000):
+        """
+        :param embed: Function returning the embedding of a question, e.g. ChunkEmbedder.embed_text
+        :param threshold: Minimum cosine similarity between questions to reuse an answer
+        :param max_entries: Answers kept before the least recently used ones are evicted
+        """
+        self.embed = embed
+        self.path = path
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.entries: List[Dict] = []
+        self.vectors: Optional[np.ndarray] = None
+        self._query_vectors = LRUCache(256)
+        self._lock = threading.Lock()
+        self._load()
+
+    @staticmethod
+    def sources_key(results: List[Tuple[Dict, float]]) -> List[List]:
+        return [[meta["article_url"], meta["chunk_id"]] for meta, _ in results]
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with np.load(self.path) as data:
+                self.entries = json.loads(str(data["entries"]))
+                self.vectors = data["vectors"] if self.entries else None
+        except (OSError, ValueError, KeyError) as e:
+            print(f"[AnswerCache] Ignoring unreadable cache at {self.path}: {e}")
+
+    def _save(self):
+        # Entries and vectors share one file, replaced atomically, so they always match
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez(f, entries=np.array(json.dumps(self.entries)), vectors=self.vectors)
+        os.replace(tmp_path, self.path)
+
+    def _query_vector(self, query: str) -> np.ndarray:
+        def compute():
+            vector = np.asarray(self.embed(query), dtype=np.float32)
+            return vector / (np.linalg.norm(vector) or 1.0)
+        return self._query_vectors.get_or_compute(query, compute)
+
+    def get(self, query: str, results: List[Tuple[Dict, float]], model: str) -> Optional[str]:
+        sources = self.sources_key(results)
+        vector = self._query_vector(query)
+        with self._lock:
+            candidates = [i for i, e in enumerate(self.entries) if e["model"] == model and e["sources"] == sources]
+            if candidates:
+                similarities = self.vectors[candidates] @ vector
+                best = int(np.argmax(similarities))
+                if similarities[best] >= self.threshold:
+                    entry = self.entries[candidates[best]]
+                    entry["last_used"] = time.time()
+                    self.hits += 1
+                    return entry["answer"]
+            self.misses += 1
+            return None
+
+    def put(self, query: str, results: List[Tuple[Dict, float]], model: str, answer: str):
+        vector = self._query_vector(query)
+        with self._lock:
+            self.entries.append({
+                "query": query,
+                "model": model,
+                "sources": self.sources_key(results),
+                "answer": answer,
+                "last_used": time.time(),
+            })
+            self.vectors = vector[None, :] if self.vectors is None else np.vstack([self.vectors, vector])
+            if len(self.entries) > self.max_entries:
+                keep = np.argsort([-e["last_used"] for e in self.entries], kind="stable")[:self.max_entries]
+                keep.sort()
+                self.entries = [self.entries[i] for i in keep]
+                self.vectors = self.vectors[keep]
+            self._save()
+
+    def stats(self) -> Dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
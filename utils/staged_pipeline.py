@@ -0,0 +1,210 @@
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from utils.logger import setup_logger
+
+
+_DONE = object()
+
+
+class PipelineError(RuntimeError):
+    """Raised by StagedPipeline.run when items were dropped; `stats` holds the final stats."""
+
+    def __init__(self, message: str, stats: Dict[str, Dict[str, Any]]):
+        super().__init__(message)
+        self.stats = stats
+
+
+class Stage:
+    """
+    One step of a StagedPipeline: `workers` threads take items from a bounded input queue,
+    call `fn` and pass every item it returns on to the next stage.
+
+    `fn(item)` returns an iterable of output items (or None). With `batch_size`, workers
+    collect up to that many items, waiting at most `batch_timeout` seconds for a batch to
+    fill, and call `fn(items)` on the list instead.
+    """
+
+    def __init__(self, name: str, fn: Callable[[Any], Optional[Iterable[Any]]], workers: int = 1,
+                 queue_size: int = 64, batch_size: Optional[int] = None, batch_timeout: float = 1.0):
+        """
+        :param workers: Threads running `fn`; CPU-heavy stages can hand work to a process pool from them
+        :param queue_size: Capacity of the input queue; a full queue blocks the previous stage (backpressure)
+        """
+        self.name = name
+        self.fn = fn
+        self.workers = workers
+        self.batch_size = batch_size
+        self.batch_timeout = batch_timeout
+        self.queue: "queue.Queue[Any]" = queue.Queue(queue_size)
+        self.items_in = 0
+        self.items_out = 0
+        self.errors = 0  # input items dropped because `fn` raised
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def put(self, item: Any):
+        self.queue.put(item)
+        depth = self.queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    def _next_batch(self) -> Optional[List[Any]]:
+        """Next list of items to process, or None once the stage is shut down."""
+        first = self.queue.get()
+        if first is _DONE:
+            self.queue.put(_DONE)  # leave the shutdown signal for the other workers
+            return None
+        if not self.batch_size:
+            return [first]
+
+        batch = [first]
+        deadline = time.monotonic() + self.batch_timeout
+        while len(batch) < self.batch_size:
+            try:
+                item = self.queue.get(timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Empty:
+                break
+            if item is _DONE:
+                self.queue.put(_DONE)  # finish this batch, stop on the next call
+                break
+            batch.append(item)
+        return batch
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "in": self.items_in,
+            "out": self.items_out,
+            "errors": self.errors,
+            "per_sec": self.items_in / elapsed if elapsed else 0.0,
+            "utilization": self.busy_seconds / (self.workers * elapsed) if elapsed else 0.0,
+            "queue": max(0, self.queue.qsize() - self.closed),  # minus the shutdown signal
+            "max_queue": self.max_depth,
+        }
+
+
+class StagedPipeline:
+    """
+    Runs stages concurrently, connected by bounded queues.
+
+    Items are fed by source functions, each running in its own thread and calling
+    `pipeline.put(stage_name, item)`; a source may feed any stage. When all sources are
+    done, stages are shut down in order, each after the previous one has drained.
+    A failing item or source does not stop the run; the failures are counted and
+    reported when it ends.
+    """
+
+    def __init__(self, stages: List[Stage]):
+        self.logger = setup_logger(self.__class__.__name__)
+        self.stages = stages
+        self._by_name = {stage.name: stage for stage in stages}
+        self._started = 0.0
+        self.source_errors = 0
+
+    def put(self, stage_name: str, item: Any):
+        """Feeds an item to a stage, blocking while its queue is full."""
+        self._by_name[stage_name].put(item)
+
+    def _work(self, index: int):
+        stage = self.stages[index]
+        next_stage = self.stages[index + 1] if index + 1 < len(self.stages) else None
+        while True:
+            batch = stage._next_batch()
+            if batch is None:
+                return
+
+            start = time.perf_counter()
+            try:
+                outputs = list(stage.fn(batch if stage.batch_size else batch[0]) or [])
+            except Exception as e:
+                outputs = []
+                with stage._lock:
+                    stage.errors += len(batch)
+                self.logger.warning(f"Stage '{stage.name}' failed, dropping {len(batch)} item(s): {e}")
+            with stage._lock:
+                stage.items_in += len(batch)
+                stage.items_out += len(outputs)
+                stage.busy_seconds += time.perf_counter() - start
+
+            if next_stage is not None:
+                for output in outputs:
+                    next_stage.put(output)
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        return {stage.name: stage.stats(elapsed) for stage in self.stages}
+
+    def format_stats(self) -> str:
+        return " | ".join(
+            f"{name}: {s['in']} in, {s['per_sec']:.1f}/s, {s['utilization']:.0%} busy, queue {s['queue']}/{s['max_queue']}"
+            for name, s in self.stats().items()
+        )
+
+    def run(self, sources: List[Callable[["StagedPipeline"], None]],
+            on_progress: Optional[Callable[["StagedPipeline"], None]] = None,
+            report_every: float = 5.0, raise_on_error: bool = True) -> Dict[str, Dict[str, Any]]:
+        """
+        Runs the sources and all stages to completion and returns the final stats.
+        `on_progress` is called on the calling thread every `report_every` seconds.
+        If any item or source failed, raises PipelineError once everything has drained,
+        or with `raise_on_error=False` only logs the failures.
+        """
+        self._started = time.perf_counter()
+        self.source_errors = 0
+        workers = {
+            i: [threading.Thread(target=self._work, args=(i,), name=f"{stage.name}-{w}", daemon=True)
+                for w in range(stage.workers)]
+            for i, stage in enumerate(self.stages)
+        }
+        for threads in workers.values():
+            for thread in threads:
+                thread.start()
+
+        def run_source(source):
+            try:
+                source(self)
+            except Exception as e:
+                self.source_errors += 1
+                self.logger.warning(f"Pipeline source failed: {e}")
+
+        source_threads = [threading.Thread(target=run_source, args=(source,), daemon=True) for source in sources]
+        for thread in source_threads:
+            thread.start()
+
+        last_report = time.monotonic()
+
+        def wait(threads: List[threading.Thread]):
+            nonlocal last_report
+            for thread in threads:
+                if on_progress is None:
+                    thread.join()
+                    continue
+                while thread.is_alive():
+                    thread.join(timeout=max(0.0, last_report + report_every - time.monotonic()))
+                    if time.monotonic() - last_report >= report_every:
+                        on_progress(self)
+                        last_report = time.monotonic()
+
+        wait(source_threads)
+        for i, stage in enumerate(self.stages):
+            stage.queue.put(_DONE)
+            stage.closed = True
+            wait(workers[i])
+
+        stats = self.stats()
+        if on_progress is not None:
+            on_progress(self)
+
+        failed = {name: s["errors"] for name, s in stats.items() if s["errors"]}
+        if failed or self.source_errors:
+            message = ", ".join(f"{name}: {count} item(s) dropped" for name, count in failed.items())
+            if self.source_errors:
+                message = ", ".join(filter(None, [message, f"{self.source_errors} source(s) failed"]))
+            if raise_on_error:
+                raise PipelineError(f"Pipeline finished with failures ({message})", stats)
+            self.logger.error(f"Pipeline finished with failures ({message})")
+        return stats